@@ -1,14 +1,23 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, make_response, Response, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import yfinance as yf
 from datetime import datetime, timedelta
-import time
-from dados_mock import FIIS_MOCK, get_fii_mock_details, get_dividendos_mock
+from collections import OrderedDict
+from functools import wraps
+from dados_mock import FIIS_MOCK, get_fii_mock_details, get_dividendos_mock, get_cotacoes_mock
 from dotenv import load_dotenv
+import json
 import os
-from openai import OpenAI
-from setores_fiis import get_setor_info, CARACTERISTICAS_SETORES
+import threading
+import time
+from setores_fiis import CARACTERISTICAS_SETORES
 from pesquisa_fiis import pesquisador, pesquisar_multiplos_fiis
+import fontes_dados
+from armazem_cotacoes import armazem, normalizar_base_100, PERIODOS_VALIDOS
+import metricas
+import perfilador
+import rastreamento
+from snapshot_estado import SnapshotEstado, SNAPSHOT_IDADE_MAXIMA
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -16,12 +25,68 @@ load_dotenv()
 # Modo de demonstração (use dados mock quando Yahoo Finance estiver indisponível)
 MODO_DEMO = False  # True = usa dados mock, False = busca Yahoo Finance real
 
+class ProvedorJSONMedido(DefaultJSONProvider):
+    """Serializador JSON padrão do Flask, contabilizando o tempo gasto por requisição"""
+
+    def dumps(self, obj, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            with rastreamento.iniciar_span('json.serializar'):
+                return super().dumps(obj, **kwargs)
+        finally:
+            metricas.acumular_tempo('json', time.perf_counter() - inicio)
+
 app = Flask(__name__)
+app.json = ProvedorJSONMedido(app)
 CORS(app)
 
-# Inicializa cliente OpenAI
-openai_api_key = os.getenv('OPENAI_API_KEY')
-client = OpenAI(api_key=openai_api_key) if openai_api_key else None
+def _rota_atual():
+    """Modelo da rota (ex.: /api/fii/<ticker>) para não criar um rótulo por ticker"""
+    return request.url_rule.rule if request.url_rule else 'desconhecida'
+
+@app.before_request
+def _iniciar_metricas():
+    request.inicio_metricas = time.perf_counter()
+    request.tempos_metricas = metricas.iniciar_requisicao()
+    metricas.http_em_andamento.inc()
+    request.span = rastreamento.iniciar_span(f'http {request.method} {_rota_atual()}', caminho=request.full_path)
+
+@app.before_request
+def _iniciar_perfil():
+    """Perfilamento opcional (PERFIL_HABILITADO + cabeçalho X-Perfil ou ?perfil=)"""
+    modo = perfilador.modo_solicitado(request.headers, request.args)
+    if modo:
+        request.perfil = perfilador.PerfilRequisicao(modo, f'{request.method} {request.path}')
+        request.perfil.iniciar()
+
+@app.after_request
+def _finalizar_perfil(resposta):
+    perfil = getattr(request, 'perfil', None)
+    if perfil:
+        request.perfil = None
+        nome = perfil.finalizar()
+        resposta.headers['X-Perfil'] = f'/api/perfis/{nome}'
+    return resposta
+
+@app.after_request
+def _registrar_metricas(resposta):
+    rota = _rota_atual()
+    tempos = request.tempos_metricas
+    metricas.http_duracao.observar(time.perf_counter() - request.inicio_metricas, rota=rota)
+    metricas.http_tempo_fontes.observar(tempos['fontes'], rota=rota)
+    metricas.http_tempo_json.observar(tempos['json'], rota=rota)
+    metricas.http_requisicoes.inc(rota=rota, metodo=request.method, status=resposta.status_code)
+    request.span.definir(status=resposta.status_code)
+    return resposta
+
+@app.teardown_request
+def _encerrar_metricas(erro=None):
+    if hasattr(request, 'inicio_metricas'):
+        metricas.http_em_andamento.dec()
+        request.span.finalizar(erro)
+    # Garante que o perfilador pare mesmo se a resposta não foi gerada
+    if getattr(request, 'perfil', None):
+        request.perfil.finalizar()
 
 # Lista de FIIs para análise no Painel Geral
 FIIS_POPULARES = [
@@ -31,12 +96,178 @@ FIIS_POPULARES = [
     'VILG11.SA', 'VRTA11.SA', 'HGRU11.SA', 'RBRP11.SA'
 ]
 
+# Última cotação de cada FII consultado em /api/fiis (rankings e filtros vetorizados) e
+# série intradiária gravada pelo monitor do Telegram (somente leitura aqui): criados no
+# primeiro uso, para que o numpy não seja carregado na inicialização
+_quadro = None
+_serie = None
+_lock_estruturas = threading.Lock()
+
+def obter_quadro():
+    """Quadro de cotações da API (criado no primeiro uso)"""
+    global _quadro
+    if _quadro is None:
+        with _lock_estruturas:
+            if _quadro is None:
+                from quadro_cotacoes import QuadroCotacoes
+                _quadro = QuadroCotacoes()
+    return _quadro
+
+def obter_serie():
+    """Série intradiária (aberta no primeiro uso)"""
+    global _serie
+    if _serie is None:
+        with _lock_estruturas:
+            if _serie is None:
+                from serie_intradiaria import SerieIntradiaria
+                _serie = SerieIntradiaria()
+    return _serie
+
+# Últimas respostas bem-sucedidas por URL, servidas em modo degradado
+MAX_RESPOSTAS_GUARDADAS = 500
+_ultimas_respostas = OrderedDict()  # URL -> (corpo JSON, timestamp em que foi guardado)
+_lock_respostas = threading.Lock()
+
+def _guardar_resposta(chave, corpo):
+    """Guarda o corpo JSON de uma resposta bem-sucedida (LRU limitado)"""
+    with _lock_respostas:
+        _ultimas_respostas[chave] = (corpo, time.time())
+        _ultimas_respostas.move_to_end(chave)
+        while len(_ultimas_respostas) > MAX_RESPOSTAS_GUARDADAS:
+            _ultimas_respostas.popitem(last=False)
+
+def _resposta_degradada(gerar_mock, kwargs):
+    """
+    Responde sem consultar o Yahoo Finance: usa a última resposta guardada
+    para a mesma URL ou, em último caso, os dados mock
+    """
+    with _lock_respostas:
+        corpo, guardado_em = _ultimas_respostas.get(request.full_path, (None, None))
+    metricas.cache_consultas.inc(cache='respostas_degradadas', resultado='acerto' if corpo is not None else 'falha')
+    
+    if corpo is not None:
+        payload = json.loads(corpo)
+        payload['origem_dados'] = 'cache'
+        payload['guardado_em'] = datetime.fromtimestamp(guardado_em).isoformat()
+    elif gerar_mock:
+        payload = gerar_mock(**kwargs)
+        payload['origem_dados'] = 'mock'
+    else:
+        return jsonify({
+            'erro': 'Fonte de dados indisponível no momento. Tente novamente em instantes.',
+            'degraded': True
+        }), 503
+    
+    print(f"⚠️  MODO DEGRADADO: respondendo {request.path} com dados de {payload['origem_dados']}")
+    payload['degraded'] = True
+    return jsonify(payload)
+
+def com_modo_degradado(gerar_mock=None):
+    """
+    Decorador para rotas que dependem do Yahoo Finance
+
+    Enquanto o disjuntor estiver aberto a rota responde na hora em modo
+    degradado (flag 'degraded'), sem esperar timeouts da fonte
+
+    Args:
+        gerar_mock (callable): Gera dados mock a partir dos parâmetros da rota
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if fontes_dados.disjuntor_yahoo.rejeitando():
+                return _resposta_degradada(gerar_mock, kwargs)
+            
+            resposta = make_response(view(*args, **kwargs))
+            
+            # Se o circuito abriu durante esta requisição a resposta pode estar
+            # incompleta: não é guardada e o cliente recebe a versão degradada
+            if fontes_dados.disjuntor_yahoo.rejeitando():
+                return _resposta_degradada(gerar_mock, kwargs)
+            
+            if resposta.status_code == 200 and resposta.is_json:
+                _guardar_resposta(request.full_path, resposta.get_data())
+            
+            return resposta
+        return wrapper
+    return decorador
+
+def limpar_caches():
+    """Descarta todos os dados guardados em memória (usado pelo benchmark para cenários a frio)"""
+    armazem.limpar()
+    fontes_dados.cache.limpar()
+    with _lock_respostas:
+        _ultimas_respostas.clear()
+
+def _exportar_respostas():
+    with _lock_respostas:
+        return list(_ultimas_respostas.items())
+
+def _importar_respostas(itens):
+    # Cada resposta mantém o horário original; as mais antigas que o limite do snapshot ficam de fora
+    limite = time.time() - SNAPSHOT_IDADE_MAXIMA
+    with _lock_respostas:
+        for chave, (corpo, guardado_em) in itens:
+            if guardado_em >= limite:
+                _ultimas_respostas.setdefault(chave, (corpo, guardado_em))
+        while len(_ultimas_respostas) > MAX_RESPOSTAS_GUARDADAS:
+            _ultimas_respostas.popitem(last=False)
+        return len(_ultimas_respostas)
+
+# Snapshot em disco dos dados de mercado em memória (restaurado ao iniciar o servidor)
+snapshot = SnapshotEstado('api')
+snapshot.registrar('fontes', fontes_dados.cache.exportar_estado, fontes_dados.cache.importar_estado)
+snapshot.registrar('armazem', armazem.exportar_estado, armazem.importar_estado)
+snapshot.registrar('respostas', _exportar_respostas, _importar_respostas)
+
+def _mock_fii(ticker):
+    ticker = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+    return {**get_fii_mock_details(ticker), 'ticker': ticker}
+
+def _mock_fiis():
+    return {'fiis': FIIS_MOCK, 'ultima_atualizacao': datetime.now().isoformat(), 'total': len(FIIS_MOCK)}
+
+def _mock_cotacoes(ticker):
+    ticker = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+    return get_cotacoes_mock(ticker, request.args.get('periodo', '1y'))
+
+def _mock_dividendos(ticker):
+    ticker = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+    return get_dividendos_mock(ticker)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde da API"""
-    return jsonify({'status': 'ok', 'message': 'API está funcionando'})
+    return jsonify({'status': 'ok', 'message': 'API está funcionando', 'snapshot': snapshot.metadados})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metricas():
+    """Métricas do processo no formato de texto do Prometheus"""
+    return Response(metricas.registro.exportar(), content_type=metricas.TIPO_CONTEUDO)
+
+@app.route('/api/perfis/<nome>', methods=['GET'])
+@app.route('/api/perfis/<nome>/<arquivo>', methods=['GET'])
+def get_perfil(nome, arquivo=None):
+    """Lista ou baixa os arquivos de um perfil gravado (requer PERFIL_HABILITADO)"""
+    if not perfilador.PERFIL_HABILITADO:
+        return jsonify({'erro': 'Perfilamento desabilitado (PERFIL_HABILITADO=false)'}), 404
+    
+    arquivos = perfilador.arquivos_do_perfil(nome)
+    if not arquivos:
+        return jsonify({'erro': f'Perfil {nome} não encontrado'}), 404
+    
+    if arquivo is None:
+        return jsonify({
+            'perfil': nome,
+            'arquivos': [{'nome': a, 'url': f'/api/perfis/{nome}/{a}'} for a in arquivos]
+        })
+    
+    if arquivo not in arquivos:
+        return jsonify({'erro': f'Arquivo {arquivo} não encontrado'}), 404
+    return send_from_directory(perfilador.PERFIS_DIR, arquivo, as_attachment=arquivo.endswith('.prof'))
 
 @app.route('/api/fii/<ticker>', methods=['GET'])
+@com_modo_degradado(_mock_fii)
 def get_fii_info(ticker):
     """Busca informações detalhadas de um FII específico"""
     try:
@@ -49,11 +280,9 @@ def get_fii_info(ticker):
             print(f"⚠️  MODO DEMO: Retornando dados de exemplo para {ticker}")
             return jsonify(get_fii_mock_details(ticker))
         
-        fii = yf.Ticker(ticker)
-        
         # Busca histórico dos últimos 3 meses para ter mais dados de volume
         try:
-            hist = fii.history(period='3mo')
+            hist = fontes_dados.historico(ticker, period='3mo')
             
             if hist.empty:
                 return jsonify({'erro': f'FII {ticker} não possui dados disponíveis'}), 404
@@ -61,7 +290,7 @@ def get_fii_info(ticker):
             print(f"Erro ao buscar histórico de {ticker}: {str(hist_error)}")
             return jsonify({'erro': f'Erro ao buscar dados de {ticker}'}), 500
         
-        info = fii.info if fii.info else {}
+        info = fontes_dados.info(ticker)
         
         # Busca preço do último fechamento se não houver currentPrice
         preco_atual = info.get('currentPrice') or info.get('regularMarketPrice')
@@ -148,6 +377,7 @@ def get_fii_info(ticker):
         return jsonify({'erro': f'Erro ao processar dados de {ticker}'}), 500
 
 @app.route('/api/fiis', methods=['GET'])
+@com_modo_degradado(_mock_fiis)
 def get_multiple_fiis():
     """Busca informações de múltiplos FIIs"""
     try:
@@ -166,22 +396,21 @@ def get_multiple_fiis():
             tickers = ','.join(FIIS_POPULARES)
         
         ticker_list = [t.strip() for t in tickers.split(',')]
-        results = []
+        quadro = obter_quadro()
+        coletados = []
         
         for ticker in ticker_list:
             if not ticker.endswith('.SA'):
                 ticker = f"{ticker}.SA"
             
             try:
-                fii = yf.Ticker(ticker)
-                
                 # Tenta buscar histórico para verificar se tem dados
-                hist = fii.history(period='5d')
+                hist = fontes_dados.historico(ticker, period='5d')
                 if hist.empty:
                     print(f"FII {ticker} sem dados disponíveis, pulando...")
                     continue
                 
-                info = fii.info if fii.info else {}
+                info = fontes_dados.info(ticker)
                 
                 # Busca preço do último fechamento se não houver currentPrice
                 preco_atual = info.get('currentPrice') or info.get('regularMarketPrice')
@@ -231,19 +460,25 @@ def get_multiple_fiis():
                     except:
                         variacao_dia = 0
                 
-                results.append({
-                    'ticker': ticker,
-                    'nome': info.get('longName', ticker.replace('.SA', '')),
-                    'preco_atual': preco_atual or 0,
-                    'variacao_dia': variacao_dia,
-                    'dividend_yield': dy,
-                    'volume': volume,
-                    'pvp': pvp if pvp else None
-                })
+                quadro.atualizar(ticker, preco_atual or 0, variacao_dia * 100, dy, pvp if pvp else None,
+                                 volume, info.get('longName'))
+                coletados.append(ticker)
             except Exception as e:
                 print(f"Erro ao buscar {ticker}: {str(e)}")
                 continue
         
+        # Outras requisições podem gravar (e despejar linhas) enquanto as linhas são lidas
+        retrato = quadro.retrato()
+        results = [{
+            'ticker': fii['ticker'],
+            'nome': fii['nome'],
+            'preco_atual': fii['preco'],
+            'variacao_dia': fii['variacao'] / 100,
+            'dividend_yield': fii['dy'],
+            'volume': fii['volume'],
+            'pvp': fii['pvp']
+        } for fii in retrato.registros(retrato.linhas(coletados))]
+        
         # Retorna dados com timestamp
         return jsonify({
             'fiis': results,
@@ -253,7 +488,80 @@ def get_multiple_fiis():
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+@app.route('/api/fiis/ranking', methods=['GET'])
+def get_ranking_fiis():
+    """
+    Ranking e triagem sobre o quadro de cotações em memória (sem consultar o Yahoo)
+
+    Parâmetros: ordenar (variacao, dy, pvp, preco, volume), n, ordem (asc/desc) e
+    filtros <coluna>_min/<coluna>_max (ex.: ?ordenar=dy&pvp_max=0.95&dy_min=8)
+    """
+    quadro = obter_quadro().retrato()
+    from quadro_cotacoes import COLUNAS as COLUNAS_QUADRO
+    coluna = request.args.get('ordenar', 'variacao')
+    if coluna not in COLUNAS_QUADRO:
+        return jsonify({'erro': f'Coluna inválida: {coluna}'}), 400
+    
+    try:
+        n = int(request.args.get('n', 10))
+        if not 0 < n <= quadro.max_tickers:
+            raise ValueError(f'n deve estar entre 1 e {quadro.max_tickers}')
+        limites = {chave: float(valor) for chave, valor in request.args.items()
+                   if chave.endswith(('_min', '_max'))}
+        mascara = quadro.mascara(**limites)
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {str(e)}'}), 400
+    
+    linhas = quadro.ranking(coluna, n, crescente=request.args.get('ordem') == 'asc', mascara=mascara)
+    return jsonify({
+        'fiis': quadro.registros(linhas),
+        'estatisticas': quadro.estatisticas(coluna, mascara),
+        'total_no_quadro': len(quadro)
+    })
+
+@app.route('/api/intradiario', methods=['GET'])
+def get_intradiario():
+    """
+    Movimentos do dia a partir da série intradiária gravada pelo monitor (sem consultar o Yahoo)
+
+    Parâmetros: janela (minutos; padrão: desde o primeiro ponto do dia), n, pontos (das
+    sparklines), tickers (separados por vírgula; padrão: as maiores altas e baixas) e
+    dia (AAAA-MM-DD; padrão: hoje)
+    """
+    try:
+        janela = request.args.get('janela')
+        janela = float(janela) * 60 if janela else None
+        n = int(request.args.get('n', 10))
+        pontos = int(request.args.get('pontos', 24))
+        if not 0 < n <= 100 or not 2 <= pontos <= 500:
+            raise ValueError('n deve estar entre 1 e 100 e pontos entre 2 e 500')
+        if janela is not None and janela <= 0:
+            raise ValueError('janela deve ser positiva')
+        dia = request.args.get('dia')
+        dia = datetime.strptime(dia, '%Y-%m-%d').date() if dia else None
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetro inválido: {str(e)}'}), 400
+    
+    intradiario = obter_serie().dia(dia)
+    if not len(intradiario):
+        return jsonify({'erro': f'Sem série intradiária para {intradiario.dia.isoformat()}'}), 404
+    
+    altas, baixas = intradiario.maiores_movimentos(janela, n)
+    tickers = [t.strip().upper() for t in request.args.get('tickers', '').split(',') if t.strip()]
+    tickers = [t if t.endswith('.SA') else f'{t}.SA' for t in tickers] or \
+        [fii['ticker'] for fii in altas + baixas]
+    return jsonify({
+        'dia': intradiario.dia.isoformat(),
+        'ultima_cotacao': datetime.fromtimestamp(intradiario.ultimo_momento()).isoformat(),
+        'pontos_gravados': len(intradiario),
+        'janela_minutos': janela / 60 if janela else None,
+        'maiores_altas': altas,
+        'maiores_baixas': baixas,
+        'sparklines': intradiario.sparklines(tickers, pontos)
+    })
+
 @app.route('/api/search', methods=['GET'])
+@com_modo_degradado()
 def search_fii():
     """Busca um FII pelo ticker"""
     query = request.args.get('q', '')
@@ -282,21 +590,19 @@ def search_fii():
         # Modo real - busca no Yahoo Finance
         print(f"🔍 Buscando dados reais para {ticker} no Yahoo Finance...")
         
-        fii = yf.Ticker(ticker)
-        
         # Tenta buscar dados históricos para verificar se existe
         # Usa período menor primeiro (mais rápido)
         try:
             print(f"  → Tentando período de 5 dias...")
-            hist = fii.history(period='5d', timeout=10)
+            hist = fontes_dados.historico(ticker, period='5d', timeout=10)
             
             if hist.empty:
                 print(f"  → Sem dados em 5d, tentando 1 mês...")
-                hist = fii.history(period='1mo', timeout=10)
+                hist = fontes_dados.historico(ticker, period='1mo', timeout=10)
                 
                 if hist.empty:
                     print(f"  → Sem dados em 1mo, tentando 3 meses...")
-                    hist = fii.history(period='3mo', timeout=10)
+                    hist = fontes_dados.historico(ticker, period='3mo', timeout=10)
                     
                     if hist.empty:
                         print(f"  ❌ Nenhum dado encontrado para {ticker}")
@@ -308,7 +614,7 @@ def search_fii():
             # Tenta buscar info (pode falhar, mas não é crítico)
             info = {}
             try:
-                info = fii.info if hasattr(fii, 'info') and fii.info else {}
+                info = fontes_dados.info(ticker)
             except:
                 print(f"  ⚠️  Info não disponível para {ticker}, usando dados do histórico")
             
@@ -326,14 +632,13 @@ def search_fii():
             # Última tentativa com período máximo e timeout maior
             try:
                 print(f"  → Última tentativa com período máximo...")
-                time.sleep(0.5)  # Pequena pausa
-                hist = fii.history(period='max', timeout=15)
+                hist = fontes_dados.historico(ticker, period='max', timeout=15)
                 
                 if not hist.empty:
                     print(f"  ✅ Dados encontrados no período máximo!")
                     info = {}
                     try:
-                        info = fii.info if hasattr(fii, 'info') and fii.info else {}
+                        info = fontes_dados.info(ticker)
                     except:
                         pass
                     
@@ -357,6 +662,7 @@ def search_fii():
         }), 500
 
 @app.route('/api/fii/<ticker>/cotacoes', methods=['GET'])
+@com_modo_degradado(_mock_cotacoes)
 def get_fii_cotacoes(ticker):
     """Busca cotações históricas de um FII (diária, mensal, anual)"""
     try:
@@ -368,43 +674,32 @@ def get_fii_cotacoes(ticker):
         
         print(f"📊 Buscando cotações de {ticker} para período: {periodo}")
         
-        fii = yf.Ticker(ticker)
-        
         # Para período de 1 dia, busca dados intradiários
         if periodo == '1d':
-            print(f"  📈 Buscando dados intradiários (5 minutos)...")
+            print(f"  📈 Buscando dados intradiários (5 minutos, com fallbacks especulativos)...")
+            # Em ordem de preferência: 5m, 1m e diário de hoje; os últimos 5 dias são só
+            # reserva (nunca especulativa), para o gráfico do dia não virar um de 5 dias.
+            # prepost=False evita dados pré/pós mercado que podem confundir
+            tentativas = [
+                {'period': '1d', 'interval': '5m', 'timeout': 15, 'prepost': False},
+                {'period': '1d', 'interval': '1m', 'timeout': 15, 'prepost': False},
+                {'period': '1d', 'interval': '1d', 'timeout': 15},
+            ]
+            reserva = {'period': '5d', 'timeout': 15}
             try:
-                # Busca dados de 1 dia com intervalo de 5 minutos
-                # Usa prepost=False para evitar dados pré/pós mercado que podem confundir
-                hist = fii.history(period='1d', interval='5m', timeout=15, prepost=False)
-                
-                # Se não tiver dados com 5m, tenta com 1m para ter dados mais recentes
-                if hist.empty:
-                    print(f"  ⚠️  Sem dados em 5m, tentando intervalo de 1 minuto...")
-                    hist = fii.history(period='1d', interval='1m', timeout=15, prepost=False)
+                hist, usada = fontes_dados.historico_com_hedge(ticker, tentativas, reserva)
             except Exception as e:
                 print(f"  ❌ Erro ao buscar intradiário: {str(e)}")
                 return jsonify({'erro': f'Timeout ao buscar dados intradiários. Tente novamente.'}), 500
             
-            if hist.empty:
-                print(f"  ❌ Nenhum dado intradiário disponível, tentando diário...")
-                try:
-                    hist = fii.history(period='1d', interval='1d', timeout=15)
-                except Exception as e:
-                    print(f"  ❌ Erro ao buscar diário: {str(e)}")
-                    return jsonify({'erro': f'Timeout ao buscar dados. Tente novamente.'}), 500
-            
             if hist.empty:
                 print(f"  ❌ Nenhum dado disponível para {ticker}")
-                # Tenta buscar pelo menos dados de 5 dias para mostrar algo
-                try:
-                    print(f"  → Tentando buscar últimos 5 dias como fallback...")
-                    hist = fii.history(period='5d', timeout=15)
-                    if hist.empty:
-                        return jsonify({'erro': f'Nenhum dado disponível para {ticker}'}), 404
-                    print(f"  ✅ Mostrando últimos 5 dias como fallback")
-                except:
-                    return jsonify({'erro': f'Nenhum dado disponível para {ticker}'}), 404
+                return jsonify({'erro': f'Nenhum dado disponível para {ticker}'}), 404
+            
+            if usada == len(tentativas):
+                print(f"  ✅ Mostrando últimos 5 dias como fallback")
+            elif usada > 0:
+                print(f"  ⚠️  Usando fallback {tentativas[usada]}")
             
             print(f"  ✅ {len(hist)} registros encontrados (última atualização: {hist.index[-1].strftime('%Y-%m-%d %H:%M') if len(hist) > 0 else 'N/A'})")
             
@@ -447,7 +742,7 @@ def get_fii_cotacoes(ticker):
         # Busca histórico com timeout e forçando prepost=True para incluir dados mais recentes
         try:
             # Usa prepost=True para incluir dados pré-mercado e pós-mercado quando disponíveis
-            hist = fii.history(period=periodo, timeout=15, prepost=False)
+            hist = fontes_dados.historico(ticker, period=periodo, timeout=15, prepost=False)
             
             # Se o período for curto (5d, 1mo), tenta buscar dados de hoje também
             if periodo in ['5d', '1mo', '3mo'] and not hist.empty:
@@ -460,7 +755,7 @@ def get_fii_cotacoes(ticker):
                 if ultima_data < hoje:
                     print(f"  📅 Último registro é de {ultima_data}, tentando buscar dados de hoje...")
                     try:
-                        hist_hoje = fii.history(period='1d', interval='1d', timeout=10)
+                        hist_hoje = fontes_dados.historico(ticker, period='1d', interval='1d', timeout=10)
                         if not hist_hoje.empty:
                             # Combina os dados
                             hist = hist.combine_first(hist_hoje)
@@ -528,7 +823,63 @@ def get_fii_cotacoes(ticker):
         print(f"❌ Erro ao buscar cotações de {ticker}: {str(e)}")
         return jsonify({'erro': f'Erro ao buscar cotações: {str(e)}'}), 500
 
+@app.route('/api/cotacoes', methods=['GET'])
+@com_modo_degradado()
+def get_cotacoes_multiplos():
+    """Busca séries históricas de vários FIIs alinhadas em um único índice de datas"""
+    try:
+        tickers = request.args.get('tickers', '')
+        periodo = request.args.get('periodo', '1y')
+        normalizar = request.args.get('normalizar', 'false').lower() in ('1', 'true', 'sim')
+
+        if not tickers:
+            return jsonify({'erro': 'Parâmetro tickers é obrigatório'}), 400
+
+        if periodo not in PERIODOS_VALIDOS:
+            return jsonify({'erro': f'Período inválido. Use: {", ".join(PERIODOS_VALIDOS)}'}), 400
+
+        # Normaliza tickers mantendo a ordem e removendo duplicados
+        ticker_list = []
+        for ticker in tickers.split(','):
+            ticker = ticker.strip().upper()
+            if not ticker:
+                continue
+            if not ticker.endswith('.SA'):
+                ticker = f"{ticker}.SA"
+            if ticker not in ticker_list:
+                ticker_list.append(ticker)
+
+        print(f"📊 Buscando cotações comparativas de {len(ticker_list)} FIIs para período: {periodo}")
+
+        tabela = armazem.obter(ticker_list, periodo)
+
+        if tabela.empty:
+            return jsonify({'erro': f'Nenhum dado disponível para os FIIs no período {periodo}'}), 404
+
+        if normalizar:
+            tabela = normalizar_base_100(tabela)
+
+        # Serialização colunar: um vetor por ticker, None onde não houve pregão
+        series = {
+            ticker: tabela[ticker].astype(object).where(tabela[ticker].notna(), None).tolist()
+            for ticker in tabela.columns
+        }
+
+        return jsonify({
+            'periodo': periodo,
+            'normalizado': normalizar,
+            'tickers': list(tabela.columns),
+            'ausentes': [t for t in ticker_list if t not in tabela.columns],
+            'datas': tabela.index.strftime('%Y-%m-%d').tolist(),
+            'series': series,
+            'total_registros': len(tabela)
+        })
+    except Exception as e:
+        print(f"❌ Erro ao buscar cotações comparativas: {str(e)}")
+        return jsonify({'erro': f'Erro ao buscar cotações: {str(e)}'}), 500
+
 @app.route('/api/fii/<ticker>/analise-horarios', methods=['GET'])
+@com_modo_degradado()
 def get_analise_horarios(ticker):
     """Analisa os melhores e piores horários para negociação nos últimos 30 dias"""
     try:
@@ -538,13 +889,11 @@ def get_analise_horarios(ticker):
         
         print(f"⏰ Analisando horários de negociação para {ticker} (últimos 30 dias)...")
         
-        fii = yf.Ticker(ticker)
-        
         # Busca dados intradiários dos últimos 30 dias
         # Yahoo Finance tem limitação: máximo 7 dias para intervalo de 5m
         # Para 30 dias, usamos intervalo de 1 hora
         try:
-            hist = fii.history(period='1mo', interval='1h', timeout=20)
+            hist = fontes_dados.historico(ticker, period='1mo', interval='1h', timeout=20)
         except Exception as e:
             print(f"  ❌ Erro ao buscar dados horários: {str(e)}")
             return jsonify({'erro': f'Erro ao buscar dados horários: {str(e)}'}), 500
@@ -624,6 +973,7 @@ def get_analise_horarios(ticker):
         return jsonify({'erro': f'Erro ao analisar horários: {str(e)}'}), 500
 
 @app.route('/api/fii/<ticker>/dividendos', methods=['GET'])
+@com_modo_degradado(_mock_dividendos)
 def get_fii_dividendos(ticker):
     """Busca histórico de dividendos de um FII"""
     try:
@@ -638,11 +988,9 @@ def get_fii_dividendos(ticker):
         
         print(f"💰 Buscando dividendos de {ticker}...")
         
-        fii = yf.Ticker(ticker)
-        
         # Busca dividendos
         try:
-            dividendos = fii.dividends
+            dividendos = fontes_dados.dividendos(ticker)
         except Exception as e:
             print(f"  ❌ Erro ao buscar dividendos: {str(e)}")
             return jsonify({'erro': f'Erro ao buscar dividendos de {ticker}'}), 500
@@ -677,22 +1025,20 @@ def get_fii_dividendos(ticker):
         dividendo_maximo = float(dividendos.max())
         dividendo_minimo = float(dividendos.min())
         
-        # Dividendos dos últimos 12 meses
-        # Usa pd.Timestamp para garantir compatibilidade de timezone
-        import pandas as pd
-        data_limite = pd.Timestamp.now(tz=dividendos.index.tz) - pd.Timedelta(days=365)
+        # Dividendos dos últimos 12 meses (no fuso do índice, para comparar com as datas)
+        data_limite = datetime.now(dividendos.index.tz) - timedelta(days=365)
         dividendos_12m = dividendos[dividendos.index >= data_limite]
         total_12m = float(dividendos_12m.sum()) if not dividendos_12m.empty else 0
         
         # Busca preço atual para calcular dividend yield
         preco_atual = 0
         try:
-            info = fii.info
+            info = fontes_dados.info(ticker)
             preco_atual = info.get('currentPrice', info.get('regularMarketPrice', 0))
             
             # Se não conseguir do info, tenta do histórico
             if not preco_atual or preco_atual == 0:
-                hist = fii.history(period='5d', timeout=10)
+                hist = fontes_dados.historico(ticker, period='5d', timeout=10)
                 if not hist.empty:
                     preco_atual = float(hist['Close'].iloc[-1])
         except Exception as e:
@@ -723,6 +1069,7 @@ def get_fii_dividendos(ticker):
         return jsonify({'erro': f'Erro ao buscar dividendos: {str(e)}'}), 500
 
 @app.route('/api/fii/<ticker>/resumo', methods=['GET'])
+@com_modo_degradado()
 def get_fii_resumo(ticker):
     """Busca resumo completo de um FII (cotações + dividendos)"""
     try:
@@ -730,18 +1077,20 @@ def get_fii_resumo(ticker):
         if not ticker.endswith('.SA'):
             ticker = f"{ticker}.SA"
         
-        fii = yf.Ticker(ticker)
-        info = fii.info
+        info = fontes_dados.info(ticker)
         
         # Histórico de preços
-        hist_1y = fii.history(period='1y')
-        hist_1mo = fii.history(period='1mo')
-        hist_1d = fii.history(period='1d')
+        hist_1y = fontes_dados.historico(ticker, period='1y')
+        hist_1mo = fontes_dados.historico(ticker, period='1mo')
+        hist_1d = fontes_dados.historico(ticker, period='1d')
         
         # Dividendos
-        dividendos = fii.dividends
-        data_limite = datetime.now() - timedelta(days=365)
-        dividendos_12m = dividendos[dividendos.index >= data_limite] if not dividendos.empty else []
+        dividendos = fontes_dados.dividendos(ticker)
+        dividendos_12m = []
+        if not dividendos.empty:
+            # Sem dividendos o índice pode nem ser de datas (sem .tz)
+            data_limite = datetime.now(dividendos.index.tz) - timedelta(days=365)
+            dividendos_12m = dividendos[dividendos.index >= data_limite]
         
         # Preço atual
         preco_atual = info.get('currentPrice', info.get('regularMarketPrice', 0))
@@ -790,7 +1139,7 @@ def get_fii_resumo(ticker):
 def gerar_analise_ia():
     """Gera análise de IA para oportunidades de FIIs"""
     try:
-        if not client:
+        if not fontes_dados.llm_disponivel():
             return jsonify({'erro': 'OpenAI API não configurada'}), 500
         
         data = request.json
@@ -815,106 +1164,108 @@ def gerar_analise_ia():
         informacoes_web = {}
         if tickers_pesquisa:
             try:
-                informacoes_web = pesquisar_multiplos_fiis(tickers_pesquisa)
+                with rastreamento.iniciar_span('analise_ia.pesquisa_web', tickers=len(tickers_pesquisa)):
+                    informacoes_web = pesquisar_multiplos_fiis(tickers_pesquisa)
                 print(f"  ✅ Pesquisa concluída para {len(informacoes_web)} FIIs")
             except Exception as e:
                 print(f"  ⚠️  Erro na pesquisa web: {str(e)}")
                 informacoes_web = {}
         
-        # Monta contexto enriquecido com informações setoriais
-        # NOTA: dividend_yield do Yahoo já vem em percentual (12.45 = 12.45%)
-        def formatar_fii_contexto(fii):
-            setor_info = get_setor_info(fii['ticker'])
-            return (f"- {fii['ticker']} ({setor_info['setor']} - {setor_info['tipo']}): "
-                   f"Preço R$ {fii['preco']:.2f}, Variação {fii['variacao']:+.2f}%, "
-                   f"P/VP {fii.get('pvp', 'N/A')}, DY {fii.get('dy', 0):.2f}%")
-        
-        contexto_altas = "\n".join([formatar_fii_contexto(fii) for fii in maiores_altas])
-        contexto_baixas = "\n".join([formatar_fii_contexto(fii) for fii in maiores_baixas])
-        
-        # Separa descontos: em BAIXA (oportunidade tática) vs em ALTA/ESTÁVEL
-        contexto_descontos = ""
-        descontos_em_baixa = []
-        descontos_outros = []
-        
-        if maiores_descontos and len(maiores_descontos) > 0:
-            for fii in maiores_descontos:
-                if fii.get('emBaixa', False):
-                    descontos_em_baixa.append(fii)
-                else:
-                    descontos_outros.append(fii)
+        with rastreamento.iniciar_span('analise_ia.montar_prompt') as span_prompt:
+            # Monta contexto enriquecido com informações setoriais
+            # NOTA: dividend_yield do Yahoo já vem em percentual (12.45 = 12.45%)
+            def formatar_fii_contexto(fii):
+                setor_info = fontes_dados.setor_info(fii['ticker'])
+                return (f"- {fii['ticker']} ({setor_info['setor']} - {setor_info['tipo']}): "
+                       f"Preço R$ {fii['preco']:.2f}, Variação {fii['variacao']:+.2f}%, "
+                       f"P/VP {fii.get('pvp', 'N/A')}, DY {fii.get('dy', 0):.2f}%")
+        
+            contexto_altas = "\n".join([formatar_fii_contexto(fii) for fii in maiores_altas])
+            contexto_baixas = "\n".join([formatar_fii_contexto(fii) for fii in maiores_baixas])
+        
+            # Separa descontos: em BAIXA (oportunidade tática) vs em ALTA/ESTÁVEL
+            contexto_descontos = ""
+            descontos_em_baixa = []
+            descontos_outros = []
+        
+            if maiores_descontos and len(maiores_descontos) > 0:
+                for fii in maiores_descontos:
+                    if fii.get('emBaixa', False):
+                        descontos_em_baixa.append(fii)
+                    else:
+                        descontos_outros.append(fii)
             
-            if descontos_em_baixa:
-                contexto_descontos += "\n🔥 DESCONTOS AUMENTANDO (Em Baixa Hoje - Oportunidade Tática):\n"
-                contexto_descontos += "\n".join([
-                    f"- {fii['ticker']} ({get_setor_info(fii['ticker'])['setor']}): "
-                    f"P/VP {fii.get('pvp', 0):.2f} (Desconto {fii.get('desconto', 0):.1f}%), "
-                    f"Variação {fii.get('variacao', 0):+.2f}%, "
-                    f"DY {fii.get('dy', 0):.2f}%"
-                    for fii in descontos_em_baixa
-                ])
+                if descontos_em_baixa:
+                    contexto_descontos += "\n🔥 DESCONTOS AUMENTANDO (Em Baixa Hoje - Oportunidade Tática):\n"
+                    contexto_descontos += "\n".join([
+                        f"- {fii['ticker']} ({fontes_dados.setor_info(fii['ticker'])['setor']}): "
+                        f"P/VP {fii.get('pvp', 0):.2f} (Desconto {fii.get('desconto', 0):.1f}%), "
+                        f"Variação {fii.get('variacao', 0):+.2f}%, "
+                        f"DY {fii.get('dy', 0):.2f}%"
+                        for fii in descontos_em_baixa
+                    ])
             
-            if descontos_outros:
-                contexto_descontos += "\n\n💎 Outros Descontos (Estáveis ou em Alta):\n"
-                contexto_descontos += "\n".join([
-                    f"- {fii['ticker']} ({get_setor_info(fii['ticker'])['setor']}): "
-                    f"P/VP {fii.get('pvp', 0):.2f} (Desconto {fii.get('desconto', 0):.1f}%), "
-                    f"DY {fii.get('dy', 0):.2f}%"
-                    for fii in descontos_outros
-                ])
-        
-        # Análise setorial detalhada
-        from collections import Counter
-        
-        # Conta setores nas altas e baixas
-        setores_altas = [get_setor_info(fii['ticker'])['setor'] for fii in maiores_altas]
-        setores_baixas = [get_setor_info(fii['ticker'])['setor'] for fii in maiores_baixas]
-        
-        contagem_altas = Counter(setores_altas)
-        contagem_baixas = Counter(setores_baixas)
-        
-        # Monta resumo estatístico por setor
-        setores_unicos = list(set(setores_altas + setores_baixas))
-        
-        resumo_setorial = "DISTRIBUIÇÃO SETORIAL:\n"
-        resumo_setorial += "─────────────────────\n"
-        for setor in setores_unicos:
-            altas = contagem_altas.get(setor, 0)
-            baixas = contagem_baixas.get(setor, 0)
-            resumo_setorial += f"• {setor}: {altas} em alta, {baixas} em baixa\n"
-        
-        # Características detalhadas dos setores
-        info_setorial = "\n\n".join([
-            f"**{setor}**:\n" + 
-            f"• Valoriza com: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('valoriza_com', [])[:3])}\n" +
-            f"• Desvaloriza com: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('desvaloriza_com', [])[:3])}\n" +
-            f"• Índices correlacionados: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('indices_correlacionados', []))}"
-            for setor in setores_unicos if setor in CARACTERISTICAS_SETORES
-        ])
-        
-        # Monta contexto adicional da pesquisa web
-        contexto_web = ""
-        if informacoes_web:
-            contexto_web = "\n═══════════════════════════════════════════════\n"
-            contexto_web += "INFORMAÇÕES ADICIONAIS DA WEB:\n"
-            contexto_web += "═══════════════════════════════════════════════\n"
+                if descontos_outros:
+                    contexto_descontos += "\n\n💎 Outros Descontos (Estáveis ou em Alta):\n"
+                    contexto_descontos += "\n".join([
+                        f"- {fii['ticker']} ({fontes_dados.setor_info(fii['ticker'])['setor']}): "
+                        f"P/VP {fii.get('pvp', 0):.2f} (Desconto {fii.get('desconto', 0):.1f}%), "
+                        f"DY {fii.get('dy', 0):.2f}%"
+                        for fii in descontos_outros
+                    ])
+        
+            # Análise setorial detalhada
+            from collections import Counter
+        
+            # Conta setores nas altas e baixas
+            setores_altas = [fontes_dados.setor_info(fii['ticker'])['setor'] for fii in maiores_altas]
+            setores_baixas = [fontes_dados.setor_info(fii['ticker'])['setor'] for fii in maiores_baixas]
+        
+            contagem_altas = Counter(setores_altas)
+            contagem_baixas = Counter(setores_baixas)
+        
+            # Monta resumo estatístico por setor
+            setores_unicos = list(set(setores_altas + setores_baixas))
+        
+            resumo_setorial = "DISTRIBUIÇÃO SETORIAL:\n"
+            resumo_setorial += "─────────────────────\n"
+            for setor in setores_unicos:
+                altas = contagem_altas.get(setor, 0)
+                baixas = contagem_baixas.get(setor, 0)
+                resumo_setorial += f"• {setor}: {altas} em alta, {baixas} em baixa\n"
+        
+            # Características detalhadas dos setores
+            info_setorial = "\n\n".join([
+                f"**{setor}**:\n" + 
+                f"• Valoriza com: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('valoriza_com', [])[:3])}\n" +
+                f"• Desvaloriza com: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('desvaloriza_com', [])[:3])}\n" +
+                f"• Índices correlacionados: {', '.join(CARACTERISTICAS_SETORES.get(setor, {}).get('indices_correlacionados', []))}"
+                for setor in setores_unicos if setor in CARACTERISTICAS_SETORES
+            ])
+        
+            # Monta contexto adicional da pesquisa web
+            contexto_web = ""
+            if informacoes_web:
+                contexto_web = "\n═══════════════════════════════════════════════\n"
+                contexto_web += "INFORMAÇÕES ADICIONAIS DA WEB:\n"
+                contexto_web += "═══════════════════════════════════════════════\n"
             
-            for ticker, info in informacoes_web.items():
-                if info.get('fontes_consultadas'):
-                    contexto_web += f"\n**{ticker}**:\n"
-                    contexto_web += f"Fontes: {', '.join(info['fontes_consultadas'])}\n"
+                for ticker, info in informacoes_web.items():
+                    if info.get('fontes_consultadas'):
+                        contexto_web += f"\n**{ticker}**:\n"
+                        contexto_web += f"Fontes: {', '.join(info['fontes_consultadas'])}\n"
                     
-                    if info.get('resumo_geral'):
-                        contexto_web += f"• {info['resumo_geral'][:200]}...\n"
+                        if info.get('resumo_geral'):
+                            contexto_web += f"• {info['resumo_geral'][:200]}...\n"
                     
-                    if info.get('dados_setor'):
-                        contexto_web += f"• {info['dados_setor']}\n"
+                        if info.get('dados_setor'):
+                            contexto_web += f"• {info['dados_setor']}\n"
                     
-                    if info.get('noticias_recentes'):
-                        contexto_web += f"• Notícias: {info['noticias_recentes'][0][:100]}...\n"
+                        if info.get('noticias_recentes'):
+                            contexto_web += f"• Notícias: {info['noticias_recentes'][0][:100]}...\n"
         
-        # Prompt focado em análise de mercado e movimentos setoriais
-        prompt = f"""Você é um analista EXPERIENTE de FIIs focado em interpretar movimentos de mercado.
+            # Prompt focado em análise de mercado e movimentos setoriais
+            prompt = f"""Você é um analista EXPERIENTE de FIIs focado em interpretar movimentos de mercado.
 
 OBJETIVO: Analisar os dados e explicar O QUE ESTÁ ACONTECENDO no mercado de FIIs HOJE.
 
@@ -1001,9 +1352,10 @@ REGRAS FINAIS:
 ✅ Tom: Analítico, objetivo, educativo
 
 Sua análise:"""
+            span_prompt.definir(caracteres=len(prompt))
 
         # Chama API da OpenAI
-        response = client.chat.completions.create(
+        analise = fontes_dados.completar(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -1038,8 +1390,6 @@ SEMPRE FAÇA:
             max_tokens=650  # Mais espaço para análise completa com descontos
         )
         
-        analise = response.choices[0].message.content
-        
         print(f"  ✅ Análise gerada com sucesso!")
         
         return jsonify({
@@ -1055,5 +1405,8 @@ SEMPRE FAÇA:
 if __name__ == '__main__':
     # Permite porta dinâmica via variável de ambiente
     port = int(os.getenv('FLASK_RUN_PORT', 5001))
+    # Com debug o reloader roda este arquivo em dois processos: só o filho atende requisições
+    if os.getenv('WERKZEUG_RUN_MAIN') == 'true':
+        snapshot.iniciar()
     app.run(debug=True, port=port, host='127.0.0.1')
 
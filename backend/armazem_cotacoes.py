@@ -0,0 +1,183 @@
+"""
+Armazém colunar de cotações de fechamento para comparação entre FIIs
+Mantém, por período, um DataFrame com um índice de datas único e uma
+coluna por ticker, preenchido com um único download em lote no Yahoo Finance
+"""
+import threading
+import time
+
+import fontes_dados
+from metricas import cache_consultas
+
+# Períodos aceitos para séries comparativas (sempre com intervalo diário)
+PERIODOS_VALIDOS = ['5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
+
+# Tempo (segundos) que uma coluna é considerada atualizada
+TTL_COTACOES = 15 * 60
+
+# Tempo (segundos) que um ticker sem cotações no download deixa de ser rebaixado
+TTL_FALHAS = 60
+
+
+class ArmazemCotacoes:
+    """Guarda séries de fechamento em formato colunar (datas x tickers)"""
+
+    def __init__(self, ttl=TTL_COTACOES, ttl_falhas=TTL_FALHAS):
+        self.ttl = ttl
+        self.ttl_falhas = ttl_falhas
+        self._tabelas = {}        # periodo -> DataFrame (índice: datas, colunas: tickers)
+        self._atualizado_em = {}  # (periodo, ticker) -> timestamp da última carga
+        self._falhas = {}         # (periodo, ticker) -> timestamp do último download sem cotações
+        self._lock = threading.Lock()
+
+    def _colunas_desatualizadas(self, periodo, tickers):
+        """Retorna os tickers que não estão no armazém ou já expiraram (exceto falhas recentes)"""
+        agora = time.time()
+        return [
+            t for t in tickers
+            if agora - self._atualizado_em.get((periodo, t), 0) > self.ttl
+            and agora - self._falhas.get((periodo, t), 0) > self.ttl_falhas
+        ]
+
+    def _baixar_em_lote(self, tickers, periodo):
+        """
+        Faz um único download em lote no Yahoo Finance
+
+        Args:
+            tickers (list): Tickers com sufixo .SA
+            periodo (str): Período do histórico
+
+        Returns:
+            DataFrame: Fechamentos com uma coluna por ticker
+        """
+        import pandas as pd
+
+        print(f"  📥 Download em lote de {len(tickers)} ticker(s) para período {periodo}...")
+        dados = fontes_dados.download(
+            tickers,
+            period=periodo,
+            interval='1d',
+            group_by='column',
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            timeout=15
+        )
+
+        if dados is None or dados.empty:
+            return pd.DataFrame()
+
+        fechamentos = dados['Close']
+        # Com um único ticker o yfinance pode devolver uma Series
+        if isinstance(fechamentos, pd.Series):
+            fechamentos = fechamentos.to_frame(name=tickers[0])
+
+        # Remove o fuso e o horário: o alinhamento é feito por data de pregão
+        indice = pd.DatetimeIndex(fechamentos.index)
+        if indice.tz is not None:
+            indice = indice.tz_localize(None)
+        fechamentos.index = indice.normalize()
+
+        fechamentos = fechamentos[~fechamentos.index.duplicated(keep='last')]
+        return fechamentos.astype('float64')
+
+    def obter(self, tickers, periodo):
+        """
+        Retorna as séries de fechamento alinhadas por data
+
+        Args:
+            tickers (list): Tickers com sufixo .SA
+            periodo (str): Período do histórico
+
+        Returns:
+            DataFrame: Índice de datas único e uma coluna por ticker
+        """
+        import pandas as pd
+
+        with self._lock:
+            faltantes = self._colunas_desatualizadas(periodo, tickers)
+        cache_consultas.inc(len(tickers) - len(faltantes), cache='cotacoes', resultado='acerto')
+        cache_consultas.inc(len(faltantes), cache='cotacoes', resultado='falha')
+
+        if faltantes:
+            # O download roda fora do lock: outras consultas seguem servidas do armazém
+            novos = self._baixar_em_lote(faltantes, periodo)
+            novos = novos.loc[:, novos.notna().any()]
+            agora = time.time()
+
+            with self._lock:
+                tabela = self._tabelas.get(periodo, pd.DataFrame())
+
+                # Substitui as colunas baixadas agora e mantém as demais
+                tabela = tabela.drop(columns=[c for c in novos.columns if c in tabela.columns])
+                tabela = pd.concat([tabela, novos], axis=1).sort_index()
+                self._tabelas[periodo] = tabela
+
+                for ticker in novos.columns:
+                    self._atualizado_em[(periodo, ticker)] = agora
+                    self._falhas.pop((periodo, ticker), None)
+                # Sem cotações (ticker inválido, deslistado): não rebaixa a cada consulta
+                sem_cotacoes = set(faltantes) - set(novos.columns)
+                if sem_cotacoes:
+                    self._falhas = {c: t for c, t in self._falhas.items() if agora - t <= self.ttl_falhas}
+                for ticker in sem_cotacoes:
+                    self._falhas[(periodo, ticker)] = agora
+        else:
+            print(f"  ⚡ Cotações de {len(tickers)} ticker(s) servidas do armazém")
+
+        with self._lock:
+            tabela = self._tabelas.get(periodo, pd.DataFrame())
+            presentes = [t for t in tickers if t in tabela.columns]
+            return tabela[presentes].dropna(how='all').copy()
+
+    def limpar(self):
+        """Descarta todas as séries armazenadas"""
+        with self._lock:
+            self._tabelas.clear()
+            self._atualizado_em.clear()
+            self._falhas.clear()
+
+    def exportar_estado(self):
+        """Tabelas e horários de carga de cada coluna (para o snapshot)"""
+        with self._lock:
+            return {'tabelas': dict(self._tabelas), 'atualizado_em': dict(self._atualizado_em)}
+
+    def importar_estado(self, estado):
+        """
+        Restaura as tabelas de um snapshot (períodos já carregados neste processo são mantidos)
+
+        Returns:
+            int: Quantidade de colunas (período, ticker) restauradas
+        """
+        restauradas = 0
+        with self._lock:
+            for periodo, tabela in estado['tabelas'].items():
+                if periodo in self._tabelas:
+                    continue
+                self._tabelas[periodo] = tabela
+                for ticker in tabela.columns:
+                    # A idade original é mantida: colunas vencidas são rebaixadas no próximo uso
+                    self._atualizado_em[(periodo, ticker)] = estado['atualizado_em'].get((periodo, ticker), 0)
+                    restauradas += 1
+        return restauradas
+
+
+def normalizar_base_100(tabela):
+    """
+    Normaliza cada coluna para base 100 a partir do primeiro valor disponível
+
+    Args:
+        tabela (DataFrame): Fechamentos com uma coluna por ticker
+
+    Returns:
+        DataFrame: Séries normalizadas
+    """
+    if tabela.empty:
+        return tabela
+
+    primeiros = tabela.bfill().iloc[0]
+    return tabela.div(primeiros) * 100
+
+
+# Instância global do armazém
+armazem = ArmazemCotacoes()
@@ -0,0 +1,345 @@
+"""
+Assinantes do monitor: watchlist e regras de alerta por chat do Telegram
+Cada chat assinante segue seus próprios FIIs e define regras como
+"variacao >= 2" ou "pvp <= 0.9", para um ticker ou para toda a watchlist.
+
+As regras ficam num índice por (ticker, campo, direção) com os limites
+ordenados: a cotação nova de um ticker encontra as regras disparadas por
+busca binária, sem percorrer todos os pares assinante x ticker. O custo de
+um ciclo depende dos tickers atualizados e dos alertas disparados, não do
+número de assinantes.
+
+Cadastro pela linha de comando:
+    python assinantes.py assinar 123456789 --nome "Grupo FIIs"
+    python assinantes.py seguir 123456789 HGLG11 XPLG11
+    python assinantes.py regra 123456789 variacao ">=" 2
+    python assinantes.py regra 123456789 pvp "<=" 0.9 --ticker HGLG11
+    python assinantes.py listar
+"""
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from dotenv import load_dotenv
+
+from estado_alertas import ACIMA, ABAIXO, NOVO, REPETIDO
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+ASSINANTES_ARQUIVO = os.getenv(
+    'ASSINANTES_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assinantes.sqlite3')
+)
+
+# Campos do quadro de cotações que aceitam regras
+CAMPOS_REGRA = ('preco', 'variacao', 'dy', 'pvp', 'volume')
+OPERADORES = {'>=': ACIMA, '<=': ABAIXO}
+
+# Regra que vale para todos os tickers da watchlist do chat
+TODA_WATCHLIST = '*'
+
+Regra = namedtuple('Regra', 'id chat_id ticker campo direcao limite')
+
+
+def _chave_regra(regra):
+    """Nome da regra no EstadoAlertas (um estado por ticker)"""
+    return f'regra:{regra.id}'
+
+
+def _normalizar_ticker(ticker):
+    ticker = ticker.strip().upper()
+    return ticker if ticker == TODA_WATCHLIST or ticker.endswith('.SA') else f'{ticker}.SA'
+
+
+class IndiceRegras:
+    """Regras agrupadas por (ticker, campo, direção), com limites ordenados para busca binária"""
+
+    def __init__(self, regras, watchlists):
+        """
+        Args:
+            regras (list): Regras cadastradas (ticker '*' = toda a watchlist do chat)
+            watchlists (dict): chat_id -> conjunto de tickers seguidos
+        """
+        grupos = {}
+        for regra in regras:
+            tickers = watchlists.get(regra.chat_id, ()) if regra.ticker == TODA_WATCHLIST else (regra.ticker,)
+            for ticker in tickers:
+                grupos.setdefault((ticker, regra.campo, regra.direcao), []).append(regra)
+
+        self._entradas = {}   # (ticker, campo, direção) -> (limites ordenados, regras alinhadas)
+        self._por_ticker = {}  # ticker -> [(campo, direção)]
+        for (ticker, campo, direcao), lista in grupos.items():
+            lista.sort(key=lambda r: r.limite)
+            self._entradas[(ticker, campo, direcao)] = ([r.limite for r in lista], lista)
+            self._por_ticker.setdefault(ticker, []).append((campo, direcao))
+        self.total = sum(len(lista) for lista in grupos.values())
+
+    def __contains__(self, ticker):
+        return ticker in self._por_ticker
+
+    def disparadas(self, ticker, fii):
+        """
+        Regras cuja condição vale para a cotação do FII
+
+        Returns:
+            list: Regras disparadas (ACIMA: limite <= valor; ABAIXO: limite >= valor)
+        """
+        resultado = []
+        for campo, direcao in self._por_ticker.get(ticker, ()):
+            valor = fii.get(campo)
+            if valor is None or valor != valor:  # NaN cairia no fim da busca binária
+                continue
+            limites, regras = self._entradas[(ticker, campo, direcao)]
+            if direcao == ACIMA:
+                resultado.extend(regras[:bisect_right(limites, valor)])
+            else:
+                resultado.extend(regras[bisect_left(limites, valor):])
+        return resultado
+
+
+class RegistroAssinantes:
+    """Assinantes, watchlists e regras persistidos em SQLite, com o índice de regras em memória"""
+
+    def __init__(self, caminho=ASSINANTES_ARQUIVO):
+        """
+        Args:
+            caminho (str): Arquivo SQLite (':memory:' para não persistir)
+        """
+        self._lock = threading.RLock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.executescript(
+            'CREATE TABLE IF NOT EXISTS assinantes (chat_id TEXT PRIMARY KEY, nome TEXT, criado_em REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS watchlist (chat_id TEXT NOT NULL, ticker TEXT NOT NULL, '
+            'PRIMARY KEY (chat_id, ticker));'
+            'CREATE TABLE IF NOT EXISTS regras (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id TEXT NOT NULL, '
+            'ticker TEXT NOT NULL, campo TEXT NOT NULL, direcao TEXT NOT NULL, limite REAL NOT NULL);'
+        )
+        self._indice = None
+        self._regras = {}
+        self._watchlists = {}
+        self._versao = None
+
+    def _alterar(self, sql, parametros=()):
+        with self._lock:
+            cursor = self._conexao.execute(sql, parametros)
+            self._indice = None
+            return cursor
+
+    def assinar(self, chat_id, nome=None):
+        """Cadastra um chat (ou atualiza o nome)"""
+        self._alterar('INSERT INTO assinantes (chat_id, nome, criado_em) VALUES (?, ?, ?) '
+                      'ON CONFLICT(chat_id) DO UPDATE SET nome = excluded.nome',
+                      (str(chat_id), nome, time.time()))
+
+    def cancelar(self, chat_id):
+        """Remove o chat com sua watchlist e suas regras"""
+        with self._lock:
+            for tabela in ('regras', 'watchlist', 'assinantes'):
+                self._alterar(f'DELETE FROM {tabela} WHERE chat_id = ?', (str(chat_id),))
+
+    def _exigir_assinante(self, chat_id):
+        if not self._conexao.execute('SELECT 1 FROM assinantes WHERE chat_id = ?', (str(chat_id),)).fetchone():
+            raise ValueError(f"❌ Chat {chat_id} não é assinante (use: assinar {chat_id})")
+
+    def seguir(self, chat_id, tickers):
+        """Adiciona tickers à watchlist do chat"""
+        with self._lock:
+            self._exigir_assinante(chat_id)
+            for ticker in tickers:
+                self._alterar('INSERT OR IGNORE INTO watchlist (chat_id, ticker) VALUES (?, ?)',
+                              (str(chat_id), _normalizar_ticker(ticker)))
+
+    def deixar_de_seguir(self, chat_id, tickers):
+        """Remove tickers da watchlist do chat"""
+        for ticker in tickers:
+            self._alterar('DELETE FROM watchlist WHERE chat_id = ? AND ticker = ?',
+                          (str(chat_id), _normalizar_ticker(ticker)))
+
+    def adicionar_regra(self, chat_id, campo, operador, limite, ticker=TODA_WATCHLIST):
+        """
+        Cadastra uma regra de alerta
+
+        Args:
+            chat_id (str): Chat assinante
+            campo (str): Campo da cotação (ver CAMPOS_REGRA)
+            operador (str): '>=' ou '<='
+            limite (float): Valor que dispara o alerta
+            ticker (str): Ticker da regra ou '*' para toda a watchlist
+
+        Returns:
+            int: Id da regra
+        """
+        if campo not in CAMPOS_REGRA:
+            raise ValueError(f"❌ Campo inválido: {campo} (use {', '.join(CAMPOS_REGRA)})")
+        if operador not in OPERADORES:
+            raise ValueError(f"❌ Operador inválido: {operador} (use >= ou <=)")
+        with self._lock:
+            self._exigir_assinante(chat_id)
+            ticker = _normalizar_ticker(ticker)
+            if ticker != TODA_WATCHLIST:
+                self.seguir(chat_id, [ticker])
+            cursor = self._alterar(
+                'INSERT INTO regras (chat_id, ticker, campo, direcao, limite) VALUES (?, ?, ?, ?, ?)',
+                (str(chat_id), ticker, campo, OPERADORES[operador], float(limite))
+            )
+            return cursor.lastrowid
+
+    def remover_regra(self, regra_id):
+        self._alterar('DELETE FROM regras WHERE id = ?', (int(regra_id),))
+
+    def listar(self):
+        """
+        Returns:
+            list: [{'chat_id', 'nome', 'watchlist', 'regras'}]
+        """
+        with self._lock:
+            assinantes = []
+            for chat_id, nome in self._conexao.execute('SELECT chat_id, nome FROM assinantes ORDER BY criado_em'):
+                assinantes.append({
+                    'chat_id': chat_id,
+                    'nome': nome,
+                    'watchlist': [t for (t,) in self._conexao.execute(
+                        'SELECT ticker FROM watchlist WHERE chat_id = ? ORDER BY ticker', (chat_id,))],
+                    'regras': [Regra(*linha)._asdict() for linha in self._conexao.execute(
+                        'SELECT * FROM regras WHERE chat_id = ? ORDER BY id', (chat_id,))],
+                })
+            return assinantes
+
+    def indice(self):
+        """
+        Índice de regras, reconstruído só quando o cadastro muda (inclusive por outro processo)
+
+        Returns:
+            IndiceRegras: Índice atual
+        """
+        with self._lock:
+            # data_version muda quando outra conexão (ex.: a linha de comando) grava no arquivo
+            versao = self._conexao.execute('PRAGMA data_version').fetchone()[0]
+            if self._indice is None or versao != self._versao:
+                self._regras = {r.id: r for r in map(Regra._make, self._conexao.execute('SELECT * FROM regras'))}
+                self._watchlists = {}
+                for chat_id, ticker in self._conexao.execute('SELECT chat_id, ticker FROM watchlist'):
+                    self._watchlists.setdefault(chat_id, set()).add(ticker)
+                self._indice = IndiceRegras(self._regras.values(), self._watchlists)
+                self._versao = versao
+            return self._indice
+
+    def tickers_seguidos(self):
+        """Tickers de todas as watchlists (prioritários no rodízio do universo)"""
+        self.indice()
+        return set().union(*self._watchlists.values())
+
+    def avaliar(self, fiis, estado, histereses=None):
+        """
+        Avalia as regras dos assinantes para as cotações novas
+
+        Só os tickers recebidos são consultados: cada um dispara as regras
+        encontradas no índice e rearma as que estavam ativas e saíram da condição
+
+        Args:
+            fiis (iterable): Cotações atualizadas no ciclo (dicts com 'ticker' e os campos)
+            estado (EstadoAlertas): Estado dos alertas já enviados
+            histereses (dict): Campo -> banda de histerese para rearmar
+
+        Returns:
+            tuple: (lista de (regra, fii) a enviar, quantidade de repetidos suprimidos)
+        """
+        histereses = histereses or {}
+        indice = self.indice()
+        novos = []
+        repetidos = 0
+
+        for fii in fiis:
+            ticker = fii['ticker']
+            disparadas = indice.disparadas(ticker, fii) if ticker in indice else []
+            for regra in disparadas:
+                resultado = estado.avaliar(ticker, _chave_regra(regra), fii[regra.campo], regra.limite,
+                                           regra.direcao, histereses.get(regra.campo, 0.0))
+                if resultado == NOVO:
+                    novos.append((regra, fii))
+                elif resultado == REPETIDO:
+                    repetidos += 1
+
+            # Alertas ativos que não dispararam agora: rearma se o valor voltou além da banda
+            avaliadas = {_chave_regra(r) for r in disparadas}
+            for chave in estado.regras_ativas(ticker):
+                if not chave.startswith('regra:') or chave in avaliadas:
+                    continue
+                regra = self._regras.get(int(chave.split(':', 1)[1]))
+                if regra is None:
+                    estado.remover(ticker, chave)
+                elif fii.get(regra.campo) is not None:
+                    estado.avaliar(ticker, chave, fii[regra.campo], regra.limite, regra.direcao,
+                                   histereses.get(regra.campo, 0.0))
+
+        return novos, repetidos
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Assinantes do monitor de FIIs (watchlists e regras por chat)')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    assinar = comandos.add_parser('assinar', help='Cadastra um chat do Telegram')
+    assinar.add_argument('chat_id')
+    assinar.add_argument('--nome')
+
+    cancelar = comandos.add_parser('cancelar', help='Remove um chat, sua watchlist e suas regras')
+    cancelar.add_argument('chat_id')
+
+    seguir = comandos.add_parser('seguir', help='Adiciona FIIs à watchlist do chat')
+    seguir.add_argument('chat_id')
+    seguir.add_argument('tickers', nargs='+')
+
+    deixar = comandos.add_parser('deixar', help='Remove FIIs da watchlist do chat')
+    deixar.add_argument('chat_id')
+    deixar.add_argument('tickers', nargs='+')
+
+    regra = comandos.add_parser('regra', help='Cadastra uma regra (ex.: variacao ">=" 2)')
+    regra.add_argument('chat_id')
+    regra.add_argument('campo', choices=CAMPOS_REGRA)
+    regra.add_argument('operador', choices=list(OPERADORES))
+    regra.add_argument('limite', type=float)
+    regra.add_argument('--ticker', default=TODA_WATCHLIST, help='Ticker da regra (padrão: toda a watchlist)')
+
+    remover = comandos.add_parser('remover-regra', help='Remove uma regra pelo id')
+    remover.add_argument('regra_id', type=int)
+
+    comandos.add_parser('listar', help='Lista assinantes, watchlists e regras')
+
+    args = parser.parse_args()
+    registro = RegistroAssinantes()
+
+    try:
+        if args.comando == 'assinar':
+            registro.assinar(args.chat_id, args.nome)
+            print(f"✅ Chat {args.chat_id} cadastrado")
+        elif args.comando == 'cancelar':
+            registro.cancelar(args.chat_id)
+            print(f"✅ Chat {args.chat_id} removido")
+        elif args.comando == 'seguir':
+            registro.seguir(args.chat_id, args.tickers)
+            print(f"✅ Watchlist de {args.chat_id}: +{', '.join(args.tickers)}")
+        elif args.comando == 'deixar':
+            registro.deixar_de_seguir(args.chat_id, args.tickers)
+            print(f"✅ Watchlist de {args.chat_id}: -{', '.join(args.tickers)}")
+        elif args.comando == 'regra':
+            regra_id = registro.adicionar_regra(args.chat_id, args.campo, args.operador, args.limite, args.ticker)
+            print(f"✅ Regra {regra_id}: {args.ticker} {args.campo} {args.operador} {args.limite:g}")
+        elif args.comando == 'remover-regra':
+            registro.remover_regra(args.regra_id)
+            print(f"✅ Regra {args.regra_id} removida")
+        else:
+            for assinante in registro.listar():
+                print(f"\n👤 {assinante['chat_id']} {assinante['nome'] or ''}")
+                print(f"  • Watchlist: {', '.join(t.replace('.SA', '') for t in assinante['watchlist']) or '-'}")
+                for r in assinante['regras']:
+                    operador = '>=' if r['direcao'] == ACIMA else '<='
+                    print(f"  • Regra {r['id']}: {r['ticker'].replace('.SA', '')} {r['campo']} {operador} {r['limite']:g}")
+    except ValueError as e:
+        print(str(e))
+        raise SystemExit(1)
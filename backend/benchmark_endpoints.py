@@ -0,0 +1,325 @@
+"""
+Benchmark das rotas da API contra uma fonte de mercado simulada
+
+Cada rota do app.py é chamada pelo test client do Flask, sem rede, sobre a
+FonteSintetica de mercado_sintetico, com latência configurável por chamada à
+fonte e universos de 16/100/400 FIIs.
+Mede latência (p50/p95/p99), chamadas à fonte por requisição e pico de
+memória, com cenários de cache frio e quente, e compara com um baseline salvo.
+
+Uso:
+    python benchmark_endpoints.py
+    python benchmark_endpoints.py --universos 16 100 --latencia-ms 20 --repeticoes 30
+    python benchmark_endpoints.py --salvar-baseline baseline.json
+    python benchmark_endpoints.py --baseline baseline.json --tolerancia 15
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+import fontes_dados
+from mercado_sintetico import FonteSintetica
+
+UNIVERSOS_PADRAO = [16, 100, 400]
+CENARIOS_CACHE = ['frio', 'quente']
+
+# Módulos pesados que não deveriam ser carregados só para subir a API
+MODULOS_PESADOS = ['pandas', 'numpy', 'yfinance', 'openai', 'bs4', 'requests']
+
+# Processo novo: importa a API e atende o primeiro /api/health
+SCRIPT_PARTIDA = '''
+import json, sys, time
+inicio = time.perf_counter()
+import app
+resposta = app.app.test_client().get('/api/health')
+print(json.dumps({
+    'ms': (time.perf_counter() - inicio) * 1000,
+    'status': resposta.status_code,
+    'carregados': [m for m in %r if m in sys.modules],
+}))
+''' % (MODULOS_PESADOS,)
+
+
+def medir_inicializacao(repeticoes=5):
+    """
+    Mede a partida a frio (import do app.py até a primeira resposta de /api/health)
+    em processos novos e gera o relatório de importação (python -X importtime)
+
+    Returns:
+        tuple: (estatísticas da partida, módulos mais caros, módulos pesados carregados)
+    """
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    ambiente = {**os.environ, 'FONTE_DADOS': 'ao_vivo'}
+
+    tempos = []
+    carregados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', SCRIPT_PARTIDA], cwd=diretorio, env=ambiente,
+                               capture_output=True, text=True, check=True)
+        medida = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos.append(medida['ms'])
+        carregados = medida['carregados']
+
+    # Relatório de importação: tempo acumulado de cada import feito diretamente pelo app
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=diretorio,
+                           env=ambiente, capture_output=True, text=True, check=True)
+    linhas = []
+    for linha in saida.stderr.splitlines():
+        if linha.startswith('import time:') and 'cumulative' not in linha:
+            _, acumulado, nome = linha[len('import time:'):].split('|')
+            linhas.append((len(nome) - len(nome.lstrip()), nome.strip(), int(acumulado) / 1000))
+
+    # A saída vem em pós-ordem: os imports diretos do app aparecem logo antes dele
+    importacoes = []
+    fim = next(i for i, (_, nome, _) in enumerate(linhas) if nome == 'app')
+    importacoes.append({'modulo': 'app', 'acumulado_ms': linhas[fim][2]})
+    for recuo, nome, acumulado in reversed(linhas[:fim]):
+        if recuo <= linhas[fim][0]:
+            break
+        if recuo == linhas[fim][0] + 2:
+            importacoes.append({'modulo': nome, 'acumulado_ms': acumulado})
+    importacoes.sort(key=lambda i: i['acumulado_ms'], reverse=True)
+
+    estatisticas = {
+        'rota': 'health_a_frio',
+        'p50_ms': percentil(tempos, 50),
+        'p95_ms': percentil(tempos, 95),
+        'p99_ms': percentil(tempos, 99),
+        'chamadas_fonte_por_req': 0,
+        'pico_memoria_kb': 0,
+        'status': {200: repeticoes},
+    }
+    return estatisticas, importacoes[:15], carregados
+
+
+def imprimir_inicializacao(estatisticas, importacoes, carregados):
+    print(f"  partida a frio até /api/health: p50 {estatisticas['p50_ms']:.0f} ms  p95 {estatisticas['p95_ms']:.0f} ms")
+    print(f"  módulos pesados carregados na partida: {', '.join(carregados) or 'nenhum'}")
+    print("  importações mais caras (tempo acumulado):")
+    for item in importacoes:
+        print(f"    {item['acumulado_ms']:9.1f} ms  {item['modulo']}")
+    print()
+
+
+def rotas(universo):
+    """
+    Requisições de cada rota; funções do índice da repetição para variar o ticker
+
+    Returns:
+        list: (nome, método, url(i), corpo)
+    """
+    def t(i):
+        return universo[i % len(universo)].replace('.SA', '')
+
+    corpo_ia = {
+        'maioresAltas': [{'ticker': x, 'preco': 10.0, 'variacao': 1.2, 'pvp': 0.95, 'dy': 11.0} for x in universo[:5]],
+        'maioresBaixas': [{'ticker': x, 'preco': 10.0, 'variacao': -1.1, 'pvp': 0.9, 'dy': 12.0} for x in universo[5:10]],
+        'maioresDescontos': [{'ticker': x, 'preco': 10.0, 'variacao': -0.5, 'pvp': 0.85, 'desconto': 15.0,
+                              'dy': 12.0, 'emBaixa': True} for x in universo[10:12]],
+        'estatisticas': {'total': len(universo), 'emAlta': len(universo) // 2, 'emBaixa': len(universo) // 3,
+                         'variacaoMedia': 0.1},
+    }
+    todos = ','.join(x.replace('.SA', '') for x in universo)
+    comparacao = ','.join(x.replace('.SA', '') for x in universo[:10])
+
+    return [
+        ('health', 'GET', lambda i: '/api/health', None),
+        ('fiis', 'GET', lambda i: f'/api/fiis?tickers={todos}', None),
+        ('fii', 'GET', lambda i: f'/api/fii/{t(i)}', None),
+        ('cotacoes_1y', 'GET', lambda i: f'/api/fii/{t(i)}/cotacoes?periodo=1y', None),
+        ('cotacoes_1d', 'GET', lambda i: f'/api/fii/{t(i)}/cotacoes?periodo=1d', None),
+        ('cotacoes_max', 'GET', lambda i: f'/api/fii/{t(i)}/cotacoes?periodo=max', None),
+        ('cotacoes_lote', 'GET', lambda i: f'/api/cotacoes?tickers={comparacao}&periodo=1y&normalizar=true', None),
+        ('analise_horarios', 'GET', lambda i: f'/api/fii/{t(i)}/analise-horarios', None),
+        ('dividendos', 'GET', lambda i: f'/api/fii/{t(i)}/dividendos', None),
+        ('resumo', 'GET', lambda i: f'/api/fii/{t(i)}/resumo', None),
+        ('search', 'GET', lambda i: f'/api/search?q={t(i)}', None),
+        ('analise_ia', 'POST', lambda i: '/api/analise-ia', corpo_ia),
+    ]
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+def executar_requisicao(cliente, metodo, url, corpo):
+    # Silencia os prints das rotas para não distorcer a saída do benchmark
+    with contextlib.redirect_stdout(io.StringIO()):
+        if metodo == 'POST':
+            return cliente.post(url, json=corpo)
+        return cliente.get(url)
+
+
+def medir_rota(cliente, fonte, limpar_caches, nome, metodo, url, corpo, repeticoes, cache):
+    """
+    Mede uma rota em um cenário de cache
+
+    Returns:
+        dict: Estatísticas da rota
+    """
+    # Aquecimento: no cenário quente deixa os caches populados
+    if cache == 'quente':
+        for i in range(min(repeticoes, 3)):
+            executar_requisicao(cliente, metodo, url(0), corpo)
+
+    latencias = []
+    chamadas_antes = sum(fonte.chamadas.values())
+    status = Counter()
+
+    for i in range(repeticoes):
+        if cache == 'frio':
+            limpar_caches()
+        indice = i if cache == 'frio' else 0
+        inicio = time.perf_counter()
+        resposta = executar_requisicao(cliente, metodo, url(indice), corpo)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        status[resposta.status_code] += 1
+
+    chamadas = sum(fonte.chamadas.values()) - chamadas_antes
+
+    # Pico de memória medido em uma execução separada (tracemalloc distorce o tempo)
+    if cache == 'frio':
+        limpar_caches()
+    tracemalloc.start()
+    executar_requisicao(cliente, metodo, url(0), corpo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'rota': nome,
+        'p50_ms': percentil(latencias, 50),
+        'p95_ms': percentil(latencias, 95),
+        'p99_ms': percentil(latencias, 99),
+        'chamadas_fonte_por_req': chamadas / repeticoes,
+        'pico_memoria_kb': pico / 1024,
+        'status': dict(status),
+    }
+
+
+def executar_benchmark(universos, latencia_ms, repeticoes, filtro_rotas=None):
+    """
+    Executa todos os cenários
+
+    Returns:
+        dict: Resultados por cenário ('universo/cache') e rota
+    """
+    fonte = FonteSintetica(quantidade=max(universos), latencia_ms=latencia_ms)
+    fontes_dados.definir_fonte(fonte)
+
+    import app
+    cliente = app.app.test_client()
+
+    resultados = {}
+    for tamanho in universos:
+        universo = fonte.universo[:tamanho]
+        for cache in CENARIOS_CACHE:
+            cenario = f'{tamanho}/{cache}'
+            resultados[cenario] = {}
+            for nome, metodo, url, corpo in rotas(universo):
+                if filtro_rotas and nome not in filtro_rotas:
+                    continue
+                # A rota /api/fiis percorre o universo inteiro: menos repetições
+                n = max(1, repeticoes // 5) if nome == 'fiis' else repeticoes
+                resultado = medir_rota(cliente, fonte, app.limpar_caches, nome, metodo, url, corpo, n, cache)
+                resultados[cenario][nome] = resultado
+                print(f"  {cenario:<12} {nome:<18} p50 {resultado['p50_ms']:9.2f} ms  "
+                      f"p95 {resultado['p95_ms']:9.2f} ms  p99 {resultado['p99_ms']:9.2f} ms  "
+                      f"fonte/req {resultado['chamadas_fonte_por_req']:7.1f}  "
+                      f"mem {resultado['pico_memoria_kb']:9.0f} KB  {resultado['status']}")
+
+    return resultados
+
+
+def comparar_com_baseline(resultados, baseline, tolerancia):
+    """
+    Compara p50/p95 e chamadas à fonte com um baseline
+
+    Returns:
+        list: Regressões encontradas (acima da tolerância em %)
+    """
+    regressoes = []
+    print(f"\n{'='*60}")
+    print(f"📏 Comparação com baseline (tolerância {tolerancia:.0f}%)")
+    print(f"{'='*60}")
+
+    for cenario, rotas_cenario in resultados.items():
+        for nome, atual in rotas_cenario.items():
+            anterior = baseline.get(cenario, {}).get(nome)
+            if not anterior:
+                continue
+            for metrica in ('p50_ms', 'p95_ms', 'chamadas_fonte_por_req'):
+                antes, depois = anterior[metrica], atual[metrica]
+                if antes <= 0:
+                    continue
+                delta = (depois - antes) / antes * 100
+                marcador = '🔺' if delta > tolerancia else ('🟢' if delta < -tolerancia else '  ')
+                if delta > tolerancia or delta < -tolerancia:
+                    print(f"  {marcador} {cenario:<12} {nome:<18} {metrica:<24} {antes:10.2f} → {depois:10.2f} ({delta:+.1f}%)")
+                if delta > tolerancia:
+                    regressoes.append((cenario, nome, metrica, delta))
+
+    if not regressoes:
+        print("  ✅ Nenhuma regressão acima da tolerância")
+    return regressoes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark das rotas da API com fonte simulada')
+    parser.add_argument('--universos', type=int, nargs='+', default=UNIVERSOS_PADRAO,
+                        help='Tamanhos de universo (padrão: 16 100 400)')
+    parser.add_argument('--latencia-ms', type=float, default=5,
+                        help='Latência injetada por chamada à fonte (padrão: 5 ms)')
+    parser.add_argument('--repeticoes', type=int, default=20, help='Requisições por rota e cenário')
+    parser.add_argument('--rotas', nargs='+', help='Mede apenas estas rotas (ex: fii cotacoes_max)')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar os resultados')
+    parser.add_argument('--salvar-baseline', help='Grava os resultados como baseline neste arquivo')
+    parser.add_argument('--baseline', help='Compara os resultados com este baseline')
+    parser.add_argument('--tolerancia', type=float, default=10, help='Tolerância de regressão em %% (padrão: 10)')
+    parser.add_argument('--sem-inicializacao', action='store_true',
+                        help='Não mede a partida a frio nem o relatório de importação')
+
+    args = parser.parse_args()
+
+    print(f"\n🏁 Benchmark da API - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    print(f"  • Universos: {args.universos} | Latência simulada: {args.latencia_ms:.0f} ms | "
+          f"Repetições: {args.repeticoes}\n")
+
+    resultados = {}
+    relatorio_importacao = []
+    if not args.sem_inicializacao:
+        partida, relatorio_importacao, carregados = medir_inicializacao()
+        imprimir_inicializacao(partida, relatorio_importacao, carregados)
+        resultados['inicializacao'] = {'health_a_frio': partida}
+
+    resultados.update(executar_benchmark(args.universos, args.latencia_ms, args.repeticoes, args.rotas))
+
+    documento = {
+        'gerado_em': datetime.now().isoformat(),
+        'parametros': {'latencia_ms': args.latencia_ms, 'repeticoes': args.repeticoes},
+        'importacoes': relatorio_importacao,
+        'resultados': resultados,
+    }
+
+    for destino in filter(None, [args.saida, args.salvar_baseline]):
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            json.dump(documento, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {destino}")
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            print(f"❌ Baseline não encontrado: {args.baseline}")
+            sys.exit(1)
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)['resultados']
+        if comparar_com_baseline(resultados, baseline, args.tolerancia):
+            sys.exit(1)
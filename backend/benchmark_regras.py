@@ -0,0 +1,150 @@
+"""
+Benchmark do motor de regras de alerta (regras_alerta.py)
+
+Monta um quadro de cotações sintético, compila um conjunto de regras variado
+(limites numéricos, setores, negações, 'in', comparações encadeadas) e mede a
+avaliação vetorizada (condição exata + versão mantida pela histerese) contra
+o laço Python equivalente, FII a FII e regra a regra.
+
+Uso:
+    python benchmark_regras.py
+    python benchmark_regras.py --universos 400 2000 --regras 50 --repeticoes 500
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from quadro_cotacoes import QuadroCotacoes
+from regras_alerta import RegraAlerta, MotorRegras, ContextoColunar
+from setores_fiis import SETORES_FIIS, get_setor_info
+
+UNIVERSOS_PADRAO = [400, 2000]
+
+# Modelos de regra; {a}, {b}, {c} e {setor} variam para gerar regras distintas
+MODELOS_REGRAS = [
+    'variacao >= {a}',
+    'variacao <= -{a}',
+    'pvp <= {b}',
+    "variacao >= {a} and pvp < {b} and setor == '{setor}'",
+    "setor in ('Shopping Centers', 'Lajes Corporativas') and dy >= {c}",
+    "not setor == '{setor}' and 0.8 <= pvp < {b}",
+    "variacao <= -{a} or (dy > 12 and pvp < {b})",
+    "tipo == 'CRI/CRA' and variacao >= {a}",
+]
+
+
+def montar_regras(quantidade):
+    """Regras sintéticas variando limites e setores"""
+    setores = sorted({v['setor'] for v in SETORES_FIIS.values()})
+    regras = []
+    for i in range(quantidade):
+        modelo = MODELOS_REGRAS[i % len(MODELOS_REGRAS)]
+        a = round(0.5 + (i % 7) * 0.5, 1)
+        b = round(0.85 + (i % 5) * 0.03, 2)
+        expressao = modelo.format(a=a, b=b, c=round(a * 4, 1), setor=setores[i % len(setores)])
+        regras.append(RegraAlerta(f'regra_{i}', expressao))
+    return regras
+
+
+def montar_quadro(quantidade, semente=42):
+    """Quadro com tickers reais de SETORES_FIIS e sintéticos, cotações aleatórias"""
+    rng = np.random.default_rng(semente)
+    reais = [f'{t}.SA' for t in SETORES_FIIS]
+    tickers = (reais + [f'S{i:04d}11.SA' for i in range(quantidade)])[:quantidade]
+    quadro = QuadroCotacoes()
+    for ticker in tickers:
+        pvp = rng.uniform(0.6, 1.3) if rng.random() > 0.05 else None
+        quadro.atualizar(ticker, rng.uniform(5, 150), rng.normal(0, 1.2), rng.uniform(4, 16), pvp,
+                         int(rng.integers(1_000, 1_000_000)))
+    return quadro, tickers
+
+
+def avaliar_em_laco(regras, registros):
+    """Mesma avaliação feita FII a FII com eval das expressões (baseline sem vetorização)"""
+    funcoes = [compile(r.expressao, r.nome, 'eval') for r in regras]
+    disparadas = {}
+    for regra, funcao in zip(regras, funcoes):
+        linhas = []
+        for linha, fii in enumerate(registros):
+            if eval(funcao, {}, fii):
+                linhas.append(linha)
+        disparadas[regra.nome] = linhas
+    return disparadas
+
+
+def medir(funcao, repeticoes):
+    """Tempos (µs) de `repeticoes` chamadas"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1e6)
+    return np.array(tempos)
+
+
+def formatar(tempos):
+    return f"p50 {np.percentile(tempos, 50):9.1f} µs | p95 {np.percentile(tempos, 95):9.1f} µs"
+
+
+def executar_benchmark(universos, quantidade_regras, repeticoes, laco=True):
+    """
+    Returns:
+        dict: Universo -> tempos medidos (µs) por etapa
+    """
+    inicio = time.perf_counter()
+    regras = montar_regras(quantidade_regras)
+    compilacao = (time.perf_counter() - inicio) * 1e6
+    print(f"🧩 {quantidade_regras} regras compiladas em {compilacao / 1000:.2f} ms")
+
+    motor = MotorRegras(regras, histereses={'variacao': 0.5, 'pvp': 0.02})
+    resultados = {}
+    for universo in universos:
+        quadro, tickers = montar_quadro(universo)
+        contexto = ContextoColunar.do_quadro(quadro, tickers)
+
+        montagem = medir(lambda: ContextoColunar.do_quadro(quadro, tickers), max(10, repeticoes // 10))
+        exata = medir(lambda: motor.mascaras(contexto), repeticoes)
+        completa = medir(lambda: motor.avaliar(contexto), repeticoes)
+        disparos = sum(len(linhas) for linhas, _ in motor.avaliar(contexto).values())
+
+        print(f"\n📊 {universo} FIIs x {quantidade_regras} regras ({disparos} disparos)")
+        print(f"  • Montagem do contexto:        {formatar(montagem)}")
+        print(f"  • Condição exata (vetorizada): {formatar(exata)}")
+        print(f"  • Exata + mantida + ordenação: {formatar(completa)}")
+        resultados[universo] = {
+            'montagem_p50_us': float(np.percentile(montagem, 50)),
+            'exata_p50_us': float(np.percentile(exata, 50)),
+            'completa_p50_us': float(np.percentile(completa, 50)),
+        }
+
+        if laco:
+            # Registros com setor/tipo, como a avaliação linha a linha enxergaria
+            registros = []
+            for registro in quadro.registros():
+                info = get_setor_info(registro['ticker'])
+                registro['pvp'] = float('nan') if registro['pvp'] is None else registro['pvp']
+                registros.append({**registro, 'setor': info['setor'], 'tipo': info['tipo']})
+            vetorizadas = {nome: sorted(np.flatnonzero(m).tolist()) for nome, m in motor.mascaras(contexto).items()}
+            if avaliar_em_laco(regras, registros) != vetorizadas:
+                print("  ❌ Resultado vetorizado difere do laço Python!")
+            baseline = medir(lambda: avaliar_em_laco(regras, registros), max(3, repeticoes // 100))
+            print(f"  • Laço Python (baseline):      {formatar(baseline)} "
+                  f"({np.percentile(baseline, 50) / np.percentile(exata, 50):.0f}x mais lento)")
+            resultados[universo]['laco_p50_us'] = float(np.percentile(baseline, 50))
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark do motor de regras de alerta vetorizado')
+    parser.add_argument('--universos', type=int, nargs='+', default=UNIVERSOS_PADRAO,
+                        help='Quantidades de FIIs (padrão: 400 2000)')
+    parser.add_argument('--regras', type=int, default=40, help='Quantidade de regras (padrão: 40)')
+    parser.add_argument('--repeticoes', type=int, default=300, help='Avaliações por medição')
+    parser.add_argument('--sem-laco', action='store_true', help='Não mede o baseline em laço Python')
+
+    args = parser.parse_args()
+
+    print(f"\n🏁 Benchmark do motor de regras - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    executar_benchmark(args.universos, args.regras, args.repeticoes, laco=not args.sem_laco)
@@ -0,0 +1,318 @@
+"""
+Cache de dados de mercado compartilhado entre processos
+Com vários workers (gunicorn) cada processo tem sua própria memória; este cache
+guarda as respostas das fontes externas num armazenamento comum para que um
+worker reaproveite o que outro já buscou.
+
+Backends (CACHE_BACKEND):
+    local   Memória do processo, limitada por CACHE_MEMORIA_MB (padrão, desenvolvimento)
+    sqlite  Arquivo SQLite em modo WAL (CACHE_SQLITE_ARQUIVO), compartilhado
+            pelos workers da mesma máquina, sem serviço extra
+    redis   Servidor Redis (CACHE_REDIS_URL), requer o pacote redis
+"""
+import os
+import pickle
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from metricas import cache_memoria, cache_memoria_limite, cache_entradas, cache_despejos
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+PREFIXO_REDIS = 'fii:'
+
+# Orçamento de memória do cache local (MB)
+CACHE_MEMORIA_MB = float(os.getenv('CACHE_MEMORIA_MB', '256'))
+# Fração do orçamento reservada às entradas lidas mais de uma vez
+FRACAO_PROTEGIDA = 0.8
+# Entradas maiores que esta fração do orçamento não são guardadas
+FRACAO_MAXIMA_ENTRADA = 0.25
+# Sobrecarga aproximada de cada entrada (tupla e nós do dicionário)
+SOBRECARGA_ENTRADA = 200
+
+
+class CacheLocal:
+    """
+    Cache em memória do próprio processo, limitado por um orçamento de bytes
+
+    O tamanho de cada entrada é o do valor serializado (pickle) guardado, mais a
+    chave e uma sobrecarga fixa: um histórico 'max' pesa o que realmente ocupa,
+    não "uma entrada". A política é um LRU segmentado (híbrido LRU/LFU):
+    entradas novas ficam em experiência e só passam ao segmento protegido
+    quando lidas de novo. O despejo começa pelas menos recentes da experiência,
+    então uma varredura por centenas de tickers consultados uma única vez não
+    expulsa os dados usados com frequência.
+    """
+
+    nome = 'local'
+
+    def __init__(self, limite_bytes=None, rotulo='fontes'):
+        """
+        Args:
+            limite_bytes (int): Orçamento de memória (padrão: CACHE_MEMORIA_MB)
+            rotulo (str): Nome do cache nas métricas
+        """
+        self.limite_bytes = int(limite_bytes or CACHE_MEMORIA_MB * 1024 * 1024)
+        self.limite_protegido = int(self.limite_bytes * FRACAO_PROTEGIDA)
+        self.rotulo = rotulo
+        self._experiencia = OrderedDict()  # chave -> (valor, expira, tamanho)
+        self._protegido = OrderedDict()
+        self._bytes_experiencia = 0
+        self._bytes_protegido = 0
+        self._lock = threading.Lock()
+        cache_memoria_limite.definir(self.limite_bytes, cache=rotulo)
+
+    @property
+    def bytes_usados(self):
+        return self._bytes_experiencia + self._bytes_protegido
+
+    def __len__(self):
+        return len(self._experiencia) + len(self._protegido)
+
+    @staticmethod
+    def _tamanho(chave, valor):
+        return sys.getsizeof(valor) + sys.getsizeof(chave) + SOBRECARGA_ENTRADA
+
+    def _remover(self, chave):
+        if chave in self._protegido:
+            item = self._protegido.pop(chave)
+            self._bytes_protegido -= item[2]
+            return item
+        if chave in self._experiencia:
+            item = self._experiencia.pop(chave)
+            self._bytes_experiencia -= item[2]
+            return item
+        return None
+
+    def _promover(self, chave, item):
+        """Move uma entrada lida de novo para o segmento protegido"""
+        del self._experiencia[chave]
+        self._bytes_experiencia -= item[2]
+        self._protegido[chave] = item
+        self._bytes_protegido += item[2]
+
+        # Protegido cheio: as menos recentes voltam para a experiência (como as mais novas)
+        while self._bytes_protegido > self.limite_protegido and len(self._protegido) > 1:
+            antiga, rebaixada = self._protegido.popitem(last=False)
+            self._bytes_protegido -= rebaixada[2]
+            self._experiencia[antiga] = rebaixada
+            self._bytes_experiencia += rebaixada[2]
+
+    def _liberar(self):
+        """Despeja entradas até caber no orçamento (experiência primeiro, depois protegido)"""
+        while self.bytes_usados > self.limite_bytes:
+            segmento = self._experiencia or self._protegido
+            _, (_, _, tamanho) = segmento.popitem(last=False)
+            if segmento is self._experiencia:
+                self._bytes_experiencia -= tamanho
+            else:
+                self._bytes_protegido -= tamanho
+            cache_despejos.inc(cache=self.rotulo, motivo='memoria')
+
+    def _atualizar_metricas(self):
+        cache_memoria.definir(self.bytes_usados, cache=self.rotulo)
+        cache_entradas.definir(len(self), cache=self.rotulo)
+
+    def _inserir(self, chave, valor, expira):
+        """Insere na experiência; retorna False se a entrada não cabe no cache"""
+        tamanho = self._tamanho(chave, valor)
+        self._remover(chave)
+        if tamanho > self.limite_bytes * FRACAO_MAXIMA_ENTRADA:
+            cache_despejos.inc(cache=self.rotulo, motivo='tamanho')
+            return False
+        self._experiencia[chave] = (valor, expira, tamanho)
+        self._bytes_experiencia += tamanho
+        self._liberar()
+        return True
+
+    def obter(self, chave):
+        with self._lock:
+            if chave in self._protegido:
+                item = self._protegido[chave]
+                protegido = True
+            elif chave in self._experiencia:
+                item = self._experiencia[chave]
+                protegido = False
+            else:
+                return None
+
+            if item[1] < time.time():
+                self._remover(chave)
+                cache_despejos.inc(cache=self.rotulo, motivo='expirado')
+                self._atualizar_metricas()
+                return None
+
+            if protegido:
+                self._protegido.move_to_end(chave)
+            else:
+                self._promover(chave, item)
+            return item[0]
+
+    def guardar(self, chave, valor, ttl):
+        with self._lock:
+            self._inserir(chave, valor, time.time() + ttl)
+            self._atualizar_metricas()
+
+    def limpar(self):
+        with self._lock:
+            self._experiencia.clear()
+            self._protegido.clear()
+            self._bytes_experiencia = 0
+            self._bytes_protegido = 0
+            self._atualizar_metricas()
+
+    def exportar_estado(self):
+        """Entradas ainda válidas, com a expiração original (para o snapshot)"""
+        agora = time.time()
+        with self._lock:
+            # Protegidas por último: ao restaurar, são as mais recentes
+            itens = list(self._experiencia.items()) + list(self._protegido.items())
+            return {chave: (valor, expira) for chave, (valor, expira, _) in itens if expira >= agora}
+
+    def importar_estado(self, itens):
+        """Restaura entradas de um snapshot, descartando as que já expiraram"""
+        agora = time.time()
+        restauradas = 0
+        with self._lock:
+            for chave, (valor, expira) in itens.items():
+                if expira >= agora and chave not in self._experiencia and chave not in self._protegido:
+                    restauradas += self._inserir(chave, valor, expira)
+            self._atualizar_metricas()
+        return restauradas
+
+
+class CacheSQLite:
+    """Cache em um arquivo SQLite (WAL), seguro para vários processos"""
+
+    nome = 'sqlite'
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        with self._conexao() as conexao:
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)'
+            )
+
+    def _conexao(self):
+        # Uma conexão por thread (e por processo: criada depois do fork do worker)
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or getattr(self._local, 'pid', None) != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            'SELECT valor FROM cache WHERE chave = ? AND expira >= ?', (chave, time.time())
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def guardar(self, chave, valor, ttl):
+        conexao = self._conexao()
+        agora = time.time()
+        conexao.execute('INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)',
+                        (chave, valor, agora + ttl))
+        # Limpeza ocasional das entradas vencidas
+        if random.random() < 0.01:
+            conexao.execute('DELETE FROM cache WHERE expira < ?', (agora,))
+
+    def limpar(self):
+        self._conexao().execute('DELETE FROM cache')
+
+
+class CacheRedis:
+    """Cache em um servidor Redis (ou compatível com o protocolo)"""
+
+    nome = 'redis'
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("❌ CACHE_BACKEND=redis requer o pacote redis (pip install redis)")
+        self.cliente = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        return self.cliente.get(PREFIXO_REDIS + chave)
+
+    def guardar(self, chave, valor, ttl):
+        self.cliente.set(PREFIXO_REDIS + chave, valor, ex=max(1, int(ttl)))
+
+    def limpar(self):
+        for chave in self.cliente.scan_iter(match=PREFIXO_REDIS + '*'):
+            self.cliente.delete(chave)
+
+
+class CacheCompartilhado:
+    """Serializa os valores (pickle) e delega o armazenamento ao backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def obter(self, chave):
+        """
+        Returns:
+            Valor guardado ou None se ausente/expirado (ou se o backend falhar)
+        """
+        try:
+            dados = self.backend.obter(chave)
+        except Exception as e:
+            print(f"⚠️  Cache {self.backend.nome} indisponível: {str(e)}")
+            return None
+        return pickle.loads(dados) if dados is not None else None
+
+    def guardar(self, chave, valor, ttl):
+        try:
+            self.backend.guardar(chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as e:
+            print(f"⚠️  Falha ao gravar no cache {self.backend.nome}: {str(e)}")
+
+    def limpar(self):
+        self.backend.limpar()
+
+    def exportar_estado(self):
+        """
+        Returns:
+            Estado para o snapshot; None nos backends que já persistem fora do processo
+        """
+        exportar = getattr(self.backend, 'exportar_estado', None)
+        return exportar() if exportar else None
+
+    def importar_estado(self, estado):
+        importar = getattr(self.backend, 'importar_estado', None)
+        return importar(estado) if importar else 0
+
+
+def criar_cache_configurado():
+    """
+    Cria o cache conforme CACHE_BACKEND (local, sqlite ou redis)
+
+    Returns:
+        CacheCompartilhado: Cache do processo
+    """
+    tipo = os.getenv('CACHE_BACKEND', 'local')
+    if tipo == 'local':
+        return CacheCompartilhado(CacheLocal())
+    if tipo == 'sqlite':
+        caminho = os.getenv('CACHE_SQLITE_ARQUIVO',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_mercado.sqlite3'))
+        return CacheCompartilhado(CacheSQLite(caminho))
+    if tipo == 'redis':
+        return CacheCompartilhado(CacheRedis(os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')))
+
+    raise ValueError(f"❌ CACHE_BACKEND inválido: {tipo} (use local, sqlite ou redis)")
+
+
+# Cache ativo no processo
+cache = criar_cache_configurado()
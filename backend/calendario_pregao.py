@@ -0,0 +1,229 @@
+"""
+Calendário de pregões da B3 e agendador do monitor
+O calendário conhece fins de semana, feriados nacionais (fixos e móveis, a
+partir da Páscoa), os dias sem pregão de fim de ano e a abertura às 13h da
+quarta-feira de cinzas. O agendador calcula o próximo horário de execução a
+partir dele e dorme até lá: nada acorda à noite, no fim de semana ou em feriado.
+
+Cadências (minutos, aceitam frações para rodar a cada poucos segundos):
+    abertura    nos primeiros MONITOR_JANELA_ABERTURA minutos do pregão
+    sessão      no meio do pregão
+    fechamento  nos últimos MONITOR_JANELA_FECHAMENTO minutos (e uma vez no fechamento)
+"""
+import os
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+try:
+    from zoneinfo import ZoneInfo
+    FUSO_B3 = ZoneInfo('America/Sao_Paulo')
+except Exception as e:
+    # Sem a base de fusos o horário local da máquina deslocaria o pregão inteiro
+    raise RuntimeError(
+        "❌ Fuso America/Sao_Paulo indisponível: instale o pacote tzdata (pip install -r requirements.txt)"
+    ) from e
+
+PREGAO_ABERTURA = dt_time.fromisoformat(os.getenv('PREGAO_ABERTURA', '10:00'))
+PREGAO_FECHAMENTO = dt_time.fromisoformat(os.getenv('PREGAO_FECHAMENTO', '17:00'))
+# Quarta-feira de cinzas: pregão só à tarde
+ABERTURA_CINZAS = dt_time(13, 0)
+
+# Datas extras sem pregão (AAAA-MM-DD separadas por vírgula)
+FERIADOS_EXTRAS = {
+    date.fromisoformat(d.strip()) for d in os.getenv('FERIADOS_EXTRAS', '').split(',') if d.strip()
+}
+
+MONITOR_CADENCIA_ABERTURA = float(os.getenv('MONITOR_CADENCIA_ABERTURA', '30'))
+MONITOR_CADENCIA_SESSAO = float(os.getenv('MONITOR_CADENCIA_SESSAO', '30'))
+MONITOR_CADENCIA_FECHAMENTO = float(os.getenv('MONITOR_CADENCIA_FECHAMENTO', '30'))
+MONITOR_JANELA_ABERTURA = float(os.getenv('MONITOR_JANELA_ABERTURA', '30'))
+MONITOR_JANELA_FECHAMENTO = float(os.getenv('MONITOR_JANELA_FECHAMENTO', '30'))
+
+
+def domingo_de_pascoa(ano):
+    """Data da Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_b3(ano):
+    """
+    Dias sem pregão na B3 em um ano (além dos fins de semana)
+
+    Returns:
+        dict: data -> nome do feriado
+    """
+    pascoa = domingo_de_pascoa(ano)
+    feriados = {
+        date(ano, 1, 1): 'Confraternização Universal',
+        pascoa - timedelta(days=48): 'Carnaval',
+        pascoa - timedelta(days=47): 'Carnaval',
+        pascoa - timedelta(days=2): 'Sexta-feira Santa',
+        date(ano, 4, 21): 'Tiradentes',
+        date(ano, 5, 1): 'Dia do Trabalho',
+        pascoa + timedelta(days=60): 'Corpus Christi',
+        date(ano, 9, 7): 'Independência',
+        date(ano, 10, 12): 'Nossa Senhora Aparecida',
+        date(ano, 11, 2): 'Finados',
+        date(ano, 11, 15): 'Proclamação da República',
+        date(ano, 12, 24): 'Véspera de Natal',
+        date(ano, 12, 25): 'Natal',
+        date(ano, 12, 31): 'Último dia do ano',
+    }
+    if ano >= 2024:
+        feriados[date(ano, 11, 20)] = 'Dia da Consciência Negra'
+    for extra in FERIADOS_EXTRAS:
+        if extra.year == ano:
+            feriados[extra] = 'Feriado extra (FERIADOS_EXTRAS)'
+    return feriados
+
+
+class CalendarioB3:
+    """Dias e horários de pregão"""
+
+    def __init__(self, abertura=PREGAO_ABERTURA, fechamento=PREGAO_FECHAMENTO, fuso=FUSO_B3):
+        self.abertura = abertura
+        self.fechamento = fechamento
+        self.fuso = fuso
+        self._feriados = {}  # ano -> {data: nome}
+
+    def agora(self):
+        return datetime.now(self.fuso)
+
+    def feriado(self, dia):
+        """Nome do feriado da data (ou None)"""
+        if dia.year not in self._feriados:
+            self._feriados[dia.year] = feriados_b3(dia.year)
+        return self._feriados[dia.year].get(dia)
+
+    def eh_dia_de_pregao(self, dia):
+        return dia.weekday() < 5 and self.feriado(dia) is None
+
+    def sessao(self, dia):
+        """
+        Horários de abertura e fechamento de um dia
+
+        Returns:
+            tuple: (abertura, fechamento) como datetime no fuso da B3, ou None sem pregão
+        """
+        if not self.eh_dia_de_pregao(dia):
+            return None
+        abertura = self.abertura
+        if dia == domingo_de_pascoa(dia.year) - timedelta(days=46):
+            abertura = max(abertura, ABERTURA_CINZAS)
+        return (datetime.combine(dia, abertura, self.fuso), datetime.combine(dia, self.fechamento, self.fuso))
+
+    def em_pregao(self, momento=None):
+        """True se o momento (padrão: agora) está dentro de um pregão"""
+        momento = momento or self.agora()
+        sessao = self.sessao(momento.date())
+        return sessao is not None and sessao[0] <= momento < sessao[1]
+
+    def proximo_pregao(self, momento=None):
+        """
+        Próxima sessão que ainda não terminou a partir do momento
+
+        Returns:
+            tuple: (abertura, fechamento)
+        """
+        momento = momento or self.agora()
+        dia = momento.date()
+        while True:
+            sessao = self.sessao(dia)
+            if sessao and momento < sessao[1]:
+                return sessao
+            dia += timedelta(days=1)
+
+
+class AgendadorPregao:
+    """
+    Executa uma tarefa nos horários calculados pelo calendário, dormindo entre eles
+
+    A grade do dia começa na abertura e avança pela cadência da fase (abertura,
+    sessão, fechamento), com uma execução final no horário de fechamento
+    """
+
+    def __init__(self, tarefa, calendario=None, cadencia_abertura=MONITOR_CADENCIA_ABERTURA,
+                 cadencia_sessao=MONITOR_CADENCIA_SESSAO, cadencia_fechamento=MONITOR_CADENCIA_FECHAMENTO,
+                 janela_abertura=MONITOR_JANELA_ABERTURA, janela_fechamento=MONITOR_JANELA_FECHAMENTO):
+        """
+        Args:
+            tarefa (callable): Função executada em cada horário
+            calendario (CalendarioB3): Calendário de pregões
+            cadencia_* (float): Minutos entre execuções em cada fase
+            janela_abertura/janela_fechamento (float): Duração (minutos) das fases de abertura e fechamento
+        """
+        self.tarefa = tarefa
+        self.calendario = calendario or CalendarioB3()
+        self.cadencias = tuple(timedelta(minutes=c) for c in
+                               (cadencia_abertura, cadencia_sessao, cadencia_fechamento))
+        if min(self.cadencias) <= timedelta(0):
+            raise ValueError("❌ As cadências do monitor precisam ser maiores que zero")
+        self.janela_abertura = timedelta(minutes=janela_abertura)
+        self.janela_fechamento = timedelta(minutes=janela_fechamento)
+        self._parar = threading.Event()
+
+    def horarios(self, abertura, fechamento):
+        """Grade de execuções de uma sessão"""
+        fim_abertura = abertura + self.janela_abertura
+        inicio_fechamento = fechamento - self.janela_fechamento
+        horario = abertura
+        while horario < fechamento:
+            yield horario
+            if horario < fim_abertura:
+                proximo = min(horario + self.cadencias[0], max(fim_abertura, abertura + self.cadencias[0]))
+            elif horario < inicio_fechamento:
+                # Não atravessa a fase de fechamento: entra nela no horário exato
+                proximo = min(horario + self.cadencias[1], inicio_fechamento)
+            else:
+                proximo = horario + self.cadencias[2]
+            horario = proximo
+        yield fechamento
+
+    def proxima_execucao(self, momento=None):
+        """
+        Próximo horário da grade depois do momento
+
+        Returns:
+            datetime: Horário no fuso da B3
+        """
+        momento = momento or self.calendario.agora()
+        while True:
+            abertura, fechamento = self.calendario.proximo_pregao(momento)
+            for horario in self.horarios(abertura, fechamento):
+                if horario > momento:
+                    return horario
+            momento = fechamento + timedelta(microseconds=1)
+
+    def parar(self):
+        self._parar.set()
+
+    def executar(self):
+        """Laço principal: dorme até o próximo horário e executa a tarefa (até parar())"""
+        while not self._parar.is_set():
+            proxima = self.proxima_execucao()
+            print(f"⏰ Próxima execução: {proxima.strftime('%d/%m/%Y %H:%M:%S')}")
+
+            # Dorme em trechos de no máximo 1h para acompanhar ajustes de relógio/suspensão
+            while not self._parar.is_set():
+                restante = (proxima - self.calendario.agora()).total_seconds()
+                if restante <= 0:
+                    break
+                self._parar.wait(min(restante, 3600))
+
+            if not self._parar.is_set():
+                self.tarefa()
@@ -95,3 +95,35 @@ def get_dividendos_mock(ticker):
         }
     }
 
+
+def get_cotacoes_mock(ticker, periodo='1y'):
+    """Retorna cotações mock no mesmo formato de /api/fii/<ticker>/cotacoes"""
+    historico = get_fii_mock_details(ticker)['historico']
+    dados = [
+        {
+            'data': registro['data'],
+            'abertura': registro['fechamento'],
+            'fechamento': registro['fechamento'],
+            'maxima': registro['fechamento'],
+            'minima': registro['fechamento'],
+            'volume': registro['volume']
+        }
+        for registro in historico
+    ]
+    precos = [d['fechamento'] for d in dados]
+    
+    return {
+        'ticker': ticker,
+        'periodo': periodo,
+        'intradiario': False,
+        'dados': dados,
+        'estatisticas': {
+            'preco_inicial': precos[0],
+            'preco_final': precos[-1],
+            'preco_maximo': max(precos),
+            'preco_minimo': min(precos),
+            'variacao_percentual': (precos[-1] - precos[0]) / precos[0] * 100,
+            'volume_medio': sum(d['volume'] for d in dados) / len(dados),
+            'total_registros': len(dados)
+        }
+    }
@@ -0,0 +1,118 @@
+"""
+Disjuntor (circuit breaker) para chamadas às fontes externas
+Abre após falhas ou lentidões consecutivas e passa a rejeitar chamadas
+imediatamente, liberando uma chamada de sondagem de tempos em tempos
+"""
+import threading
+import time
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+
+class CircuitoAberto(Exception):
+    """Chamada rejeitada porque o disjuntor está aberto"""
+
+
+class Disjuntor:
+    """
+    Disjuntor com três estados
+
+    - fechado: chamadas passam normalmente
+    - aberto: chamadas são rejeitadas na hora, sem esperar timeouts
+    - meio_aberto: uma única chamada de sondagem decide se fecha ou reabre
+    """
+
+    def __init__(self, nome, falhas_para_abrir=5, limite_lento=8.0, tempo_aberto=30.0):
+        """
+        Args:
+            nome (str): Nome da fonte protegida (para logs)
+            falhas_para_abrir (int): Falhas/lentidões consecutivas que abrem o circuito
+            limite_lento (float): Duração (s) a partir da qual uma chamada conta como falha
+            tempo_aberto (float): Tempo (s) aberto antes de liberar a sondagem
+        """
+        self.nome = nome
+        self.falhas_para_abrir = falhas_para_abrir
+        self.limite_lento = limite_lento
+        self.tempo_aberto = tempo_aberto
+        self.estado = FECHADO
+        self.falhas_consecutivas = 0
+        self.aberto_ate = 0.0
+        self._sondando = False
+        self._lock = threading.Lock()
+
+    def rejeitando(self):
+        """
+        Indica se uma chamada feita agora seria rejeitada (sem alterar o estado)
+
+        Returns:
+            bool: True enquanto o circuito estiver aberto ou sondando
+        """
+        with self._lock:
+            if self.estado == ABERTO:
+                return time.monotonic() < self.aberto_ate
+            return self.estado == MEIO_ABERTO and self._sondando
+
+    def _liberar(self):
+        """Decide se a chamada pode seguir; libera uma sondagem quando o tempo aberto expira"""
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+
+            if self.estado == ABERTO and time.monotonic() >= self.aberto_ate:
+                self.estado = MEIO_ABERTO
+                self._sondando = False
+
+            if self.estado == MEIO_ABERTO and not self._sondando:
+                self._sondando = True
+                print(f"  🔌 Disjuntor {self.nome}: sondando a fonte...")
+                return True
+
+            return False
+
+    def registrar_sucesso(self, duracao):
+        """Registra uma chamada concluída; chamadas lentas contam como falha"""
+        if duracao > self.limite_lento:
+            self.registrar_falha(motivo=f'lenta ({duracao:.1f}s)')
+            return
+
+        with self._lock:
+            if self.estado != FECHADO:
+                print(f"  🟢 Disjuntor {self.nome}: fonte recuperada, circuito fechado")
+            self.estado = FECHADO
+            self.falhas_consecutivas = 0
+            self._sondando = False
+
+    def registrar_falha(self, motivo='erro'):
+        """Registra uma falha e abre o circuito se necessário"""
+        with self._lock:
+            self.falhas_consecutivas += 1
+            self._sondando = False
+
+            if self.estado == MEIO_ABERTO or self.falhas_consecutivas >= self.falhas_para_abrir:
+                if self.estado != ABERTO:
+                    print(f"  🔴 Disjuntor {self.nome}: circuito aberto por {self.tempo_aberto:.0f}s "
+                          f"({self.falhas_consecutivas} falha(s), última {motivo})")
+                self.estado = ABERTO
+                self.aberto_ate = time.monotonic() + self.tempo_aberto
+
+    def chamar(self, funcao, *args, **kwargs):
+        """
+        Executa a função protegida pelo disjuntor
+
+        Raises:
+            CircuitoAberto: Se o circuito estiver aberto
+        """
+        if not self._liberar():
+            raise CircuitoAberto(f'Fonte {self.nome} indisponível (circuito aberto)')
+
+        inicio = time.monotonic()
+        try:
+            resultado = funcao(*args, **kwargs)
+        except Exception as e:
+            self.registrar_falha(motivo=type(e).__name__)
+            raise
+
+        self.registrar_sucesso(time.monotonic() - inicio)
+        return resultado
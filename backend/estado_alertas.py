@@ -0,0 +1,148 @@
+"""
+Estado persistente dos alertas enviados pelo monitor
+Lembra, por ticker e regra, se o alerta já foi enviado: enquanto a condição
+continua valendo o alerta não se repete. Ele só é rearmado quando o valor volta
+além de uma banda de histerese (ex.: P/VP sobe de 0.95 para acima de 0.97) ou
+quando passa o tempo de resfriamento desde o último envio.
+
+O estado fica num arquivo SQLite (ALERTAS_ESTADO_ARQUIVO) e sobrevive a reinícios.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+ALERTAS_ESTADO_ARQUIVO = os.getenv(
+    'ALERTAS_ESTADO_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'estado_alertas.sqlite3')
+)
+# Horas até um alerta ainda ativo poder ser enviado de novo
+ALERTA_RESFRIAMENTO_HORAS = float(os.getenv('ALERTA_RESFRIAMENTO_HORAS', '12'))
+
+ACIMA = 'acima'
+ABAIXO = 'abaixo'
+
+NOVO = 'novo'
+REPETIDO = 'repetido'
+
+
+class EstadoAlertas:
+    """Alertas ativos por (ticker, regra), com escrita imediata no SQLite"""
+
+    def __init__(self, caminho=ALERTAS_ESTADO_ARQUIVO, resfriamento_horas=ALERTA_RESFRIAMENTO_HORAS):
+        """
+        Args:
+            caminho (str): Arquivo SQLite (':memory:' para não persistir)
+            resfriamento_horas (float): Horas até repetir um alerta que continua ativo
+        """
+        self.resfriamento = resfriamento_horas * 60 * 60
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute(
+            'CREATE TABLE IF NOT EXISTS alertas (ticker TEXT NOT NULL, regra TEXT NOT NULL, '
+            'valor REAL NOT NULL, enviado_em REAL NOT NULL, PRIMARY KEY (ticker, regra))'
+        )
+        # (ticker, regra) -> (valor no disparo, horário do envio)
+        self._ativos = {
+            (ticker, regra): (valor, enviado_em)
+            for ticker, regra, valor, enviado_em in self._conexao.execute('SELECT * FROM alertas')
+        }
+        # ticker -> regras ativas (para rearmar sem percorrer todos os alertas)
+        self._por_ticker = {}
+        for ticker, regra in self._ativos:
+            self._por_ticker.setdefault(ticker, set()).add(regra)
+
+    def __len__(self):
+        return len(self._ativos)
+
+    def avaliar(self, ticker, regra, valor, limite, direcao, histerese=0.0):
+        """
+        Avalia uma regra para um ticker e atualiza o estado
+
+        Args:
+            ticker (str): Ticker do FII
+            regra (str): Nome da regra (ex.: 'desconto')
+            valor (float): Valor atual (ex.: P/VP)
+            limite (float): Limite que dispara o alerta
+            direcao (str): ACIMA (valor >= limite) ou ABAIXO (valor <= limite)
+            histerese (float): Quanto o valor precisa voltar além do limite para rearmar
+
+        Returns:
+            str: NOVO (enviar), REPETIDO (condição vale, alerta já enviado) ou None
+        """
+        if direcao == ACIMA:
+            disparado = valor >= limite
+            rearmado = valor < limite - histerese
+        else:
+            disparado = valor <= limite
+            rearmado = valor > limite + histerese
+        return self.registrar(ticker, regra, valor, disparado, rearmado)
+
+    def registrar(self, ticker, regra, valor, disparado, rearmado):
+        """
+        Atualiza o estado a partir de uma condição já avaliada (ex.: regras vetorizadas)
+
+        Args:
+            ticker (str): Ticker do FII
+            regra (str): Nome da regra
+            valor (float): Valor guardado com o alerta
+            disparado (bool): A condição vale agora
+            rearmado (bool): O valor saiu da condição além da banda de histerese
+
+        Returns:
+            str: NOVO (enviar), REPETIDO (condição vale, alerta já enviado) ou None
+        """
+        chave = (ticker, regra)
+        with self._lock:
+            ativo = self._ativos.get(chave)
+
+            if ativo and rearmado:
+                self._remover(chave)
+                return None
+
+            if not disparado:
+                return None
+
+            agora = time.time()
+            if ativo and agora - ativo[1] < self.resfriamento:
+                return REPETIDO
+
+            self._ativos[chave] = (valor, agora)
+            self._por_ticker.setdefault(ticker, set()).add(regra)
+            self._conexao.execute(
+                'INSERT OR REPLACE INTO alertas (ticker, regra, valor, enviado_em) VALUES (?, ?, ?, ?)',
+                (ticker, regra, valor, agora)
+            )
+            return NOVO
+
+    def _remover(self, chave):
+        del self._ativos[chave]
+        self._por_ticker[chave[0]].discard(chave[1])
+        self._conexao.execute('DELETE FROM alertas WHERE ticker = ? AND regra = ?', chave)
+
+    def regras_ativas(self, ticker):
+        """Regras com alerta ativo para o ticker"""
+        with self._lock:
+            return list(self._por_ticker.get(ticker, ()))
+
+    def tickers_ativos(self, regra):
+        """Tickers com alerta ativo para a regra"""
+        with self._lock:
+            return [ticker for ticker, nome in self._ativos if nome == regra]
+
+    def remover(self, ticker, regra):
+        """Rearma um alerta (ex.: regra removida do cadastro)"""
+        with self._lock:
+            if (ticker, regra) in self._ativos:
+                self._remover((ticker, regra))
+
+    def limpar(self):
+        """Rearma todos os alertas"""
+        with self._lock:
+            self._ativos.clear()
+            self._por_ticker.clear()
+            self._conexao.execute('DELETE FROM alertas')
@@ -0,0 +1,164 @@
+"""
+Gravação e reprodução das respostas das fontes externas (fixtures)
+Permite rodar a API e o monitor do Telegram sem rede, de forma determinística,
+com latência injetada configurável - base para medir desempenho offline
+
+Uso (variáveis de ambiente):
+    FONTE_DADOS=gravar       # consulta as fontes reais e grava as respostas
+    FONTE_DADOS=reproduzir   # responde apenas com as respostas gravadas
+    FIXTURES_DIR=fixtures    # diretório das fixtures
+    FIXTURES_LATENCIA_MS=0   # latência injetada em cada resposta reproduzida
+"""
+import hashlib
+import json
+import os
+import pickle
+import random
+import threading
+import time
+
+
+class FixtureAusente(Exception):
+    """Não há resposta gravada para a chamada solicitada"""
+
+
+class RespostaGravada:
+    """Resposta HTTP gravada (mesma interface usada do requests.Response)"""
+
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+def chave_fixture(tipo, *args, **kwargs):
+    """
+    Gera a chave estável de uma chamada
+
+    O timeout não faz parte da chave: não muda a resposta esperada
+    """
+    kwargs = {k: v for k, v in kwargs.items() if k != 'timeout'}
+    descricao = json.dumps([tipo, list(args), kwargs], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(descricao.encode('utf-8')).hexdigest(), descricao
+
+
+class ArmazemFixtures:
+    """Lê e grava fixtures em disco: <diretorio>/<tipo>/<chave>.pkl"""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+
+    def _caminho(self, tipo, chave):
+        return os.path.join(self.diretorio, tipo, f'{chave}.pkl')
+
+    def gravar(self, tipo, chave, descricao, valor):
+        caminho = self._caminho(tipo, chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as arquivo:
+            pickle.dump(valor, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Índice legível para saber o que cada arquivo contém
+        with self._lock:
+            with open(os.path.join(self.diretorio, 'indice.jsonl'), 'a', encoding='utf-8') as indice:
+                indice.write(json.dumps({'tipo': tipo, 'chave': chave, 'chamada': descricao}, ensure_ascii=False) + '\n')
+
+    def ler(self, tipo, chave, descricao):
+        caminho = self._caminho(tipo, chave)
+        if not os.path.exists(caminho):
+            raise FixtureAusente(f'Sem fixture gravada para {descricao}')
+        with open(caminho, 'rb') as arquivo:
+            return pickle.load(arquivo)
+
+
+class FonteGravacao:
+    """Repassa as chamadas para a fonte real e grava cada resposta"""
+
+    offline = False
+
+    def __init__(self, interna, diretorio):
+        self.interna = interna
+        self.armazem = ArmazemFixtures(diretorio)
+
+    def _gravando(self, tipo, funcao, *args, **kwargs):
+        chave, descricao = chave_fixture(tipo, *args, **kwargs)
+        valor = funcao(*args, **kwargs)
+        self.armazem.gravar(tipo, chave, descricao, valor)
+        return valor
+
+    def historico(self, ticker, **kwargs):
+        return self._gravando('historico', self.interna.historico, ticker, **kwargs)
+
+    def info(self, ticker):
+        return self._gravando('info', self.interna.info, ticker)
+
+    def dividendos(self, ticker):
+        return self._gravando('dividendos', self.interna.dividendos, ticker)
+
+    def download(self, tickers, **kwargs):
+        return self._gravando('download', self.interna.download, tickers, **kwargs)
+
+    def pagina(self, url, headers=None, timeout=10):
+        chave, descricao = chave_fixture('pagina', url)
+        resposta = self.interna.pagina(url, headers=headers, timeout=timeout)
+        gravada = RespostaGravada(resposta.status_code, resposta.text, dict(resposta.headers))
+        self.armazem.gravar('pagina', chave, descricao, gravada)
+        return gravada
+
+    def completar(self, **kwargs):
+        return self._gravando('completar', self.interna.completar, **kwargs)
+
+    def llm_disponivel(self):
+        return self.interna.llm_disponivel()
+
+
+class FonteReproducao:
+    """Responde apenas com fixtures gravadas, sem acessar a rede"""
+
+    offline = True
+
+    def __init__(self, diretorio, latencia_ms=0, variacao_ms=0, semente=None):
+        """
+        Args:
+            diretorio (str): Diretório das fixtures
+            latencia_ms (float): Latência injetada em cada resposta
+            variacao_ms (float): Variação aleatória somada à latência (0 a variacao_ms)
+            semente (int): Semente para tornar a variação reprodutível
+        """
+        self.armazem = ArmazemFixtures(diretorio)
+        self.latencia_ms = latencia_ms
+        self.variacao_ms = variacao_ms
+        self._aleatorio = random.Random(semente)
+
+    def _reproduzindo(self, tipo, *args, **kwargs):
+        chave, descricao = chave_fixture(tipo, *args, **kwargs)
+        valor = self.armazem.ler(tipo, chave, descricao)
+
+        latencia = self.latencia_ms
+        if self.variacao_ms:
+            latencia += self._aleatorio.uniform(0, self.variacao_ms)
+        if latencia > 0:
+            time.sleep(latencia / 1000)
+
+        return valor
+
+    def historico(self, ticker, **kwargs):
+        return self._reproduzindo('historico', ticker, **kwargs)
+
+    def info(self, ticker):
+        return self._reproduzindo('info', ticker)
+
+    def dividendos(self, ticker):
+        return self._reproduzindo('dividendos', ticker)
+
+    def download(self, tickers, **kwargs):
+        return self._reproduzindo('download', tickers, **kwargs)
+
+    def pagina(self, url, headers=None, timeout=10):
+        return self._reproduzindo('pagina', url)
+
+    def completar(self, **kwargs):
+        return self._reproduzindo('completar', **kwargs)
+
+    def llm_disponivel(self):
+        return True
@@ -0,0 +1,469 @@
+"""
+Acesso centralizado às fontes externas de dados (Yahoo Finance, páginas web e OpenAI)
+Todas as chamadas passam pelo limitador de taxa compartilhado do processo e,
+no caso do Yahoo, pelo disjuntor que evita esperar timeouts durante quedas
+
+yfinance, pandas, requests e openai são importados só na primeira chamada
+real, para a API subir rápido (ex.: /api/health não carrega nenhum deles)
+
+A fonte ativa pode ser trocada (FONTE_DADOS=ao_vivo|gravar|reproduzir|sintetico)
+para gravar as respostas reais em fixtures e reproduzi-las sem rede, ou para
+usar um mercado sintético de milhares de FIIs em testes de carga
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+from disjuntor import Disjuntor, CircuitoAberto
+from limitador import limitador, host_da_url
+from cache_compartilhado import cache
+from fixtures_upstream import chave_fixture
+from metricas import registrar_chamada_fonte, cache_consultas
+from rastreamento import iniciar_span
+from setores_fiis import get_setor_info
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+HOST_YAHOO = 'yahoo'
+
+# Atraso de hedge usado enquanto não há amostras suficientes de latência
+ATRASO_HEDGE_PADRAO = 1.5
+ATRASO_HEDGE_MINIMO = 0.2
+ATRASO_HEDGE_MAXIMO = 5.0
+AMOSTRAS_MINIMAS_HEDGE = 20
+
+# Validade das respostas no cache compartilhado (segundos)
+INTERVALOS_INTRADIARIOS = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h')
+TTL_INTRADIARIO = 60
+TTL_HISTORICO_CURTO = 5 * 60
+TTL_HISTORICO_LONGO = 30 * 60
+TTL_POR_TIPO = {
+    'info': 5 * 60,
+    'dividendos': 6 * 60 * 60,
+    'download': 15 * 60,
+    'pagina': 60 * 60,
+    'completar': 0,
+}
+
+# Disjuntor das chamadas de dados de mercado
+disjuntor_yahoo = Disjuntor(
+    'Yahoo Finance',
+    falhas_para_abrir=int(os.getenv('DISJUNTOR_FALHAS', '3')),
+    limite_lento=float(os.getenv('DISJUNTOR_LIMITE_LENTO', '8')),
+    tempo_aberto=float(os.getenv('DISJUNTOR_TEMPO_ABERTO', '30'))
+)
+
+
+class FonteAoVivo:
+    """Fontes reais: Yahoo Finance via yfinance, páginas web e OpenAI"""
+
+    offline = False
+
+    def __init__(self):
+        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        self._cliente_openai = None
+        self._lock_cliente = threading.Lock()
+
+    @property
+    def cliente_openai(self):
+        """Cliente da OpenAI, criado no primeiro uso (None sem OPENAI_API_KEY)"""
+        if self._cliente_openai is None and self.openai_api_key:
+            with self._lock_cliente:
+                if self._cliente_openai is None:
+                    from openai import OpenAI
+                    self._cliente_openai = OpenAI(api_key=self.openai_api_key)
+        return self._cliente_openai
+
+    def _chamar(self, funcao, *args, custo=1, **kwargs):
+        """Executa uma chamada ao Yahoo respeitando o disjuntor e o limitador de taxa"""
+        from yfinance.exceptions import YFRateLimitError
+
+        # Rejeita antes de consumir tokens; a espera no limitador não conta como lentidão
+        if disjuntor_yahoo.rejeitando():
+            raise CircuitoAberto('Yahoo Finance indisponível (circuito aberto)')
+
+        limitador.aguardar(HOST_YAHOO, custo, cancelado=_cancelamento.get())
+        try:
+            resultado = disjuntor_yahoo.chamar(funcao, *args, **kwargs)
+        except YFRateLimitError:
+            limitador.registrar_limite_excedido(HOST_YAHOO)
+            raise
+        limitador.registrar_sucesso(HOST_YAHOO)
+        return resultado
+
+    def historico(self, ticker, **kwargs):
+        """Histórico de preços (mesmos parâmetros de yf.Ticker.history)"""
+        import pandas as pd
+        import yfinance as yf
+        from yfinance.exceptions import YFInvalidPeriodError, YFPricesMissingError, YFTickerMissingError
+
+        def buscar():
+            # raise_errors=True faz falhas de rede chegarem ao disjuntor; ausência
+            # de dados continua sendo um DataFrame vazio, como antes
+            try:
+                return yf.Ticker(ticker).history(raise_errors=True, **kwargs)
+            except (YFPricesMissingError, YFTickerMissingError, YFInvalidPeriodError):
+                return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+        return self._chamar(buscar)
+
+    def info(self, ticker):
+        """Dicionário de informações do ticker (vazio se não houver)"""
+        import yfinance as yf
+        return self._chamar(lambda: yf.Ticker(ticker).info or {})
+
+    def dividendos(self, ticker):
+        """Série de dividendos pagos"""
+        import yfinance as yf
+        return self._chamar(lambda: yf.Ticker(ticker).dividends)
+
+    def download(self, tickers, **kwargs):
+        """Download em lote de vários tickers (mesmos parâmetros de yf.download)"""
+        import yfinance as yf
+        return self._chamar(yf.download, tickers=tickers, custo=custo_download(len(tickers)), **kwargs)
+
+    def pagina(self, url, headers=None, timeout=10):
+        """
+        Busca uma página web respeitando o limite do host
+
+        Returns:
+            Response: Resposta do requests
+        """
+        import requests
+
+        host = host_da_url(url)
+        limitador.aguardar(host)
+        resposta = requests.get(url, headers=headers, timeout=timeout)
+
+        if resposta.status_code == 429:
+            retry_after = resposta.headers.get('Retry-After')
+            limitador.registrar_limite_excedido(
+                host, float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        else:
+            limitador.registrar_sucesso(host)
+
+        return resposta
+
+    def completar(self, **kwargs):
+        """
+        Gera uma resposta do modelo de linguagem (mesmos parâmetros de chat.completions.create)
+
+        Returns:
+            str: Conteúdo da primeira escolha
+        """
+        resposta = self.cliente_openai.chat.completions.create(**kwargs)
+        return resposta.choices[0].message.content
+
+    def llm_disponivel(self):
+        return bool(self.openai_api_key)
+
+
+def custo_download(quantidade):
+    """
+    Tokens consumidos por um download em lote
+
+    É uma única chamada ao Yahoo: o custo cresce com o log do lote (1 ticker = 1,
+    até 10 = 2, até 100 = 3), sem que um lote grande bloqueie a requisição por
+    dezenas de segundos no limitador
+    """
+    return 1 + math.ceil(math.log10(max(1, quantidade)))
+
+
+def criar_fonte_configurada():
+    """
+    Cria a fonte de dados conforme FONTE_DADOS (ao_vivo, gravar, reproduzir ou sintetico)
+
+    Returns:
+        Fonte de dados ativa
+    """
+    modo = os.getenv('FONTE_DADOS', 'ao_vivo')
+    if modo == 'ao_vivo':
+        return FonteAoVivo()
+    if modo == 'sintetico':
+        from mercado_sintetico import FonteSintetica
+        quantidade = int(os.getenv('SINTETICO_TICKERS', '2000'))
+        semente = int(os.getenv('SINTETICO_SEMENTE', '42'))
+        latencia = float(os.getenv('SINTETICO_LATENCIA_MS', '0'))
+        print(f"🧪 Mercado sintético: {quantidade} FIIs (semente {semente}, latência {latencia:.0f} ms)")
+        return FonteSintetica(quantidade=quantidade, semente=semente, latencia_ms=latencia)
+
+    from fixtures_upstream import FonteGravacao, FonteReproducao
+
+    diretorio = os.getenv('FIXTURES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    if modo == 'gravar':
+        print(f"🎙️  Gravando respostas das fontes externas em {diretorio}")
+        return FonteGravacao(FonteAoVivo(), diretorio)
+    if modo == 'reproduzir':
+        latencia = float(os.getenv('FIXTURES_LATENCIA_MS', '0'))
+        print(f"📼 Reproduzindo fixtures de {diretorio} (latência injetada: {latencia:.0f} ms)")
+        return FonteReproducao(diretorio, latencia_ms=latencia)
+
+    raise ValueError(f"❌ FONTE_DADOS inválida: {modo} (use ao_vivo, gravar, reproduzir ou sintetico)")
+
+
+# Fonte de dados ativa no processo
+fonte = criar_fonte_configurada()
+
+
+def definir_fonte(nova_fonte):
+    """Troca a fonte de dados ativa (ex.: fixtures ou simulação)"""
+    global fonte
+    fonte = nova_fonte
+
+
+def ttl_cache(tipo, kwargs):
+    """
+    Tempo (segundos) que a resposta de uma chamada pode ser reaproveitada
+
+    Returns:
+        int: TTL, ou 0 para não guardar
+    """
+    if tipo == 'historico':
+        if kwargs.get('interval', '1d') in INTERVALOS_INTRADIARIOS:
+            return TTL_INTRADIARIO
+        return TTL_HISTORICO_CURTO if kwargs.get('period') in ('1d', '5d') else TTL_HISTORICO_LONGO
+    return TTL_POR_TIPO.get(tipo, 0)
+
+
+def _chamar_fonte(tipo, atributos, funcao, *args, **kwargs):
+    """
+    Chamada à fonte ativa dentro de um span, com métricas de latência e resultado
+
+    Respostas são reaproveitadas pelo cache compartilhado entre processos
+    (CACHE_BACKEND), então workers diferentes não repetem a mesma busca
+    """
+    ttl = ttl_cache(tipo, kwargs)
+    with iniciar_span(f'fonte.{tipo}', **atributos) as span:
+        if ttl:
+            chave, _ = chave_fixture(tipo, *args, **{k: v for k, v in kwargs.items() if k != 'headers'})
+            valor = cache.obter(chave)
+            cache_consultas.inc(cache='fontes', resultado='acerto' if valor is not None else 'falha')
+            if valor is not None:
+                span.definir(cache=True)
+                return valor
+
+        valor = registrar_chamada_fonte(tipo, funcao, *args, **kwargs)
+
+        # Respostas vazias ou com erro HTTP não são guardadas: podem ser uma falha momentânea
+        if ttl and valor is not None and not getattr(valor, 'empty', False) \
+                and getattr(valor, 'status_code', 200) == 200:
+            cache.guardar(chave, valor, ttl)
+        return valor
+
+
+def historico(ticker, **kwargs):
+    atributos = {'ticker': ticker, 'periodo': kwargs.get('period'), 'intervalo': kwargs.get('interval', '1d')}
+    return _chamar_fonte('historico', atributos, fonte.historico, ticker, **kwargs)
+
+
+def info(ticker):
+    return _chamar_fonte('info', {'ticker': ticker}, fonte.info, ticker)
+
+
+def dividendos(ticker):
+    return _chamar_fonte('dividendos', {'ticker': ticker}, fonte.dividendos, ticker)
+
+
+def download(tickers, **kwargs):
+    atributos = {'tickers': len(tickers), 'periodo': kwargs.get('period')}
+    return _chamar_fonte('download', atributos, fonte.download, tickers, **kwargs)
+
+
+def pagina(url, headers=None, timeout=10):
+    return _chamar_fonte('pagina', {'host': host_da_url(url), 'url': url},
+                         fonte.pagina, url, headers=headers, timeout=timeout)
+
+
+def completar(**kwargs):
+    return _chamar_fonte('completar', {'modelo': kwargs.get('model')}, fonte.completar, **kwargs)
+
+
+def llm_disponivel():
+    return fonte.llm_disponivel()
+
+
+def setor_info(ticker):
+    """Setor do ticker (get_setor_info), completado pelo setor que a fonte ativa conhecer"""
+    setor = getattr(fonte, 'setor', None)
+    return get_setor_info(ticker, setor(ticker) if setor else None)
+
+
+def offline():
+    """Indica se a fonte ativa responde sem acessar a rede"""
+    return fonte.offline
+
+
+class LatenciasRecentes:
+    """Janela deslizante de latências por tipo de chamada, para estimar o p95"""
+
+    def __init__(self, tamanho=200):
+        self.tamanho = tamanho
+        self._amostras = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, chave, duracao):
+        with self._lock:
+            self._amostras.setdefault(chave, deque(maxlen=self.tamanho)).append(duracao)
+
+    def p95(self, chave):
+        """
+        Retorna o percentil 95 das latências recentes
+
+        Returns:
+            float: p95 em segundos ou None se houver poucas amostras
+        """
+        with self._lock:
+            amostras = sorted(self._amostras.get(chave, ()))
+        if len(amostras) < AMOSTRAS_MINIMAS_HEDGE:
+            return None
+        return amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))]
+
+
+latencias = LatenciasRecentes()
+
+# Pool compartilhado para as requisições especulativas (hedge)
+_executor_hedge = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+
+# Sinalizado quando quem pediu abandona a chamada (ela desiste de esperar no limitador)
+_cancelamento = contextvars.ContextVar('cancelamento_hedge', default=None)
+
+
+def executar_cancelavel(cancelado, funcao, *args):
+    """
+    Executa `funcao` (ex.: numa thread de um pool) de forma que as chamadas às
+    fontes ainda na fila do limitador desistam, devolvendo os tokens, quando
+    `cancelado` (threading.Event) for sinalizado
+    """
+    def executar():
+        _cancelamento.set(cancelado)
+        return funcao(*args)
+    # Contexto próprio: a thread do pool não herda o cancelamento para a próxima tarefa
+    return contextvars.copy_context().run(executar)
+
+
+def _atraso_hedge(kwargs):
+    """Tempo a esperar pela tentativa atual antes de lançar a próxima"""
+    p95 = latencias.p95(f"historico:{kwargs.get('interval', '1d')}")
+    if p95 is None:
+        return ATRASO_HEDGE_PADRAO
+    return min(ATRASO_HEDGE_MAXIMO, max(ATRASO_HEDGE_MINIMO, p95))
+
+
+def _historico_medido(ticker, kwargs):
+    inicio = time.monotonic()
+    hist = historico(ticker, **kwargs)
+    latencias.registrar(f"historico:{kwargs.get('interval', '1d')}", time.monotonic() - inicio)
+    return hist
+
+
+def historico_com_hedge(ticker, tentativas, reserva=None):
+    """
+    Busca o histórico com fallbacks especulativos (hedged requests)
+
+    A primeira tentativa é lançada na hora; se não responder dentro do p95
+    observado para o seu intervalo, a próxima é lançada em paralelo, com no
+    máximo uma tentativa especulativa em voo por vez. Uma tentativa que volta
+    vazia ou com erro libera a seguinte na hora. Vence a tentativa de maior
+    prioridade com dados; um resultado de prioridade menor só é devolvido
+    depois que as anteriores falham ou ficam mais um atraso de hedge sem
+    resposta. As tentativas abandonadas que ainda aguardam o limitador
+    desistem e devolvem os tokens.
+
+    Args:
+        ticker (str): Ticker do FII
+        tentativas (list): kwargs de historico() em ordem de preferência
+        reserva (dict): kwargs de um último recurso (ex.: outro período), nunca
+                        lançado especulativamente: só depois que todas as tentativas
+                        terminam sem dados
+
+    Returns:
+        tuple: (DataFrame, índice da tentativa usada; len(tentativas) = reserva) ou
+               (DataFrame vazio, None)
+
+    Raises:
+        Exception: O último erro, se todas as tentativas falharem com exceção
+    """
+    indices = {}      # futuro -> índice da tentativa
+    cancelamentos = {}  # futuro -> Event que faz a tentativa desistir do limitador
+    resultados = {}   # índice -> DataFrame com dados ou None (vazio/erro)
+    pendentes = set()
+    erros = []
+    melhor_anterior, melhor_desde = None, None
+    todas = list(tentativas) + ([reserva] if reserva is not None else [])
+
+    def lancar():
+        indice = len(indices)
+        if indice > 0:
+            print(f"  🏁 Lançando tentativa {'de reserva' if indice == len(tentativas) else 'especulativa'} "
+                  f"{todas[indice]}")
+        # Copia o contexto para as métricas contarem o tempo na requisição de origem
+        contexto = contextvars.copy_context()
+        cancelado = threading.Event()
+        contexto.run(_cancelamento.set, cancelado)
+        futuro = _executor_hedge.submit(contexto.run, _historico_medido, ticker, todas[indice])
+        indices[futuro] = indice
+        cancelamentos[futuro] = cancelado
+        pendentes.add(futuro)
+
+    def encerrar(resultado):
+        for futuro in pendentes:
+            cancelamentos[futuro].set()
+        return resultado
+
+    lancar()
+
+    while True:
+        melhor = next((i for i in sorted(resultados) if resultados[i] is not None), None)
+        if melhor is not None:
+            # Nenhuma tentativa mais prioritária em aberto: devolve na hora
+            if all(i in resultados for i in range(melhor)):
+                return encerrar((resultados[melhor], melhor))
+            if melhor != melhor_anterior:
+                melhor_anterior, melhor_desde = melhor, time.monotonic()
+            if time.monotonic() - melhor_desde >= _atraso_hedge(todas[melhor]):
+                return encerrar((resultados[melhor], melhor))
+
+        # A reserva só entra quando todas as tentativas terminaram
+        terminadas = all(i in resultados for i in range(len(tentativas)))
+        ha_proxima = len(indices) < len(tentativas) or (len(indices) < len(todas) and terminadas)
+
+        if not pendentes:
+            if ha_proxima:
+                lancar()
+                continue
+            if len(erros) == len(indices):
+                raise erros[-1]
+            import pandas as pd
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume']), None
+
+        concluidos, _ = wait(
+            pendentes, timeout=_atraso_hedge(todas[len(indices) - 1]), return_when=FIRST_COMPLETED
+        )
+
+        houve_falha = False
+        for futuro in concluidos:
+            pendentes.discard(futuro)
+            indice = indices[futuro]
+            try:
+                hist = futuro.result()
+                resultados[indice] = hist if not hist.empty else None
+            except Exception as e:
+                print(f"  ⚠️  Tentativa {todas[indice]} falhou: {str(e)}")
+                erros.append(e)
+                resultados[indice] = None
+            houve_falha = houve_falha or resultados[indice] is None
+
+        # Sem resposta dentro do atraso, ou tentativa sem dados: lança a próxima, com no
+        # máximo uma especulativa em voo além da mais prioritária. Com um resultado já
+        # em mãos, uma tentativa de prioridade menor não teria como vencer
+        if (not concluidos or houve_falha) and melhor is None and len(pendentes) < 2 \
+                and len(indices) < len(tentativas):
+            lancar()
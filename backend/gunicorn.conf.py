@@ -0,0 +1,50 @@
+"""
+Configuração do servidor de produção (gunicorn)
+
+Uso:
+    cd backend
+    CACHE_BACKEND=sqlite gunicorn -c gunicorn.conf.py app:app
+
+Cada worker é um processo com várias threads: uma chamada lenta ao Yahoo
+ocupa só uma thread, e o cache compartilhado (CACHE_BACKEND=sqlite ou redis)
+evita que os workers repitam as mesmas buscas.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+bind = f"{os.getenv('WEB_HOST', '127.0.0.1')}:{os.getenv('FLASK_RUN_PORT', '5001')}"
+workers = int(os.getenv('WEB_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# Os workers dividem os limites de requisições às fontes externas (ver limitador.py)
+os.environ.setdefault('LIMITE_PROCESSOS', str(workers))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '8'))
+
+# A análise de IA (pesquisa web + OpenAI) pode levar dezenas de segundos
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers periodicamente para conter o crescimento de memória
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    if os.getenv('CACHE_BACKEND', 'local') == 'local' and workers > 1:
+        print("⚠️  CACHE_BACKEND=local: cada worker terá seu próprio cache (use sqlite ou redis)")
+
+
+def post_worker_init(worker):
+    # Todos os workers restauram o snapshot dos dados de mercado; um só o grava
+    # (se ele for reciclado, o próximo worker a iniciar assume a gravação)
+    from app import snapshot
+    snapshot.iniciar(escritor_unico=True)
@@ -0,0 +1,194 @@
+"""
+Limitador de taxa (token bucket) por host de origem
+Compartilhado por todo o processo: app.py, telegram_monitor.py e pesquisa_fiis.py
+usam os mesmos baldes, inclusive entre requisições Flask concorrentes
+
+Com vários processos (workers do gunicorn) cada um recebe uma fração do
+limite (LIMITE_PROCESSOS), para que a soma nunca passe da taxa e da rajada
+configuradas; a rajada de cada processo pode ficar abaixo de 1 requisição
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Taxa (requisições/segundo) e rajada máxima por host
+LIMITES_PADRAO = {
+    'yahoo': (float(os.getenv('LIMITE_YAHOO_RPS', '2')), int(os.getenv('LIMITE_YAHOO_RAJADA', '5'))),
+    'google': (float(os.getenv('LIMITE_GOOGLE_RPS', '0.5')), int(os.getenv('LIMITE_GOOGLE_RAJADA', '1'))),
+    'fundsexplorer': (float(os.getenv('LIMITE_FUNDSEXPLORER_RPS', '1')), int(os.getenv('LIMITE_FUNDSEXPLORER_RAJADA', '2'))),
+}
+
+# Limite usado para hosts sem configuração específica
+LIMITE_GENERICO = (1.0, 2)
+
+# Processos que dividem os limites acima (o gunicorn.conf.py define com WEB_WORKERS)
+LIMITE_PROCESSOS = max(1, int(os.getenv('LIMITE_PROCESSOS', '1')))
+
+# Backoff adaptativo após HTTP 429
+BACKOFF_INICIAL = 2.0
+BACKOFF_MAXIMO = 120.0
+
+
+class EsperaCancelada(Exception):
+    """A chamada foi abandonada enquanto aguardava a vez no limitador (tokens devolvidos)"""
+
+
+class BaldeTokens:
+    """
+    Token bucket com backoff adaptativo
+
+    A taxa efetiva nunca passa da configurada: cada 429 reduz a taxa pela
+    metade e bloqueia o host por um tempo crescente; cada sucesso recupera
+    a taxa aos poucos até o limite original
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa_maxima = taxa
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.ultima_reposicao = time.monotonic()
+        self.bloqueado_ate = 0.0
+        self.backoff = BACKOFF_INICIAL
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        decorrido = agora - self.ultima_reposicao
+        self.tokens = min(self.capacidade, self.tokens + decorrido * self.taxa)
+        self.ultima_reposicao = agora
+
+    def reservar(self, custo=1):
+        """
+        Reserva tokens e informa quanto tempo esperar antes de usá-los
+
+        Args:
+            custo (int): Quantidade de requisições que serão feitas
+
+        Returns:
+            float: Segundos de espera (0 se o token está disponível agora)
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._repor(agora)
+
+            # Consome o token mesmo que fique negativo: a dívida é paga com espera,
+            # o que mantém a ordem de chegada entre threads concorrentes
+            self.tokens -= custo
+            espera = 0.0 if self.tokens >= 0 else -self.tokens / self.taxa
+            return max(espera, self.bloqueado_ate - agora)
+
+    def devolver(self, custo=1):
+        """Devolve tokens reservados e não usados"""
+        with self._lock:
+            self.tokens = min(self.capacidade, self.tokens + custo)
+
+    def aguardar(self, custo=1, cancelado=None):
+        """
+        Bloqueia até os tokens reservados poderem ser usados
+
+        Args:
+            custo (int): Quantidade de requisições que serão feitas
+            cancelado (threading.Event): Se for sinalizado durante a espera, devolve os
+                                         tokens e levanta EsperaCancelada
+        """
+        if cancelado is not None and cancelado.is_set():
+            raise EsperaCancelada()
+        espera = self.reservar(custo)
+        if espera <= 0:
+            return
+        if cancelado is None:
+            time.sleep(espera)
+        elif cancelado.wait(espera):
+            self.devolver(custo)
+            raise EsperaCancelada()
+
+    def registrar_sucesso(self):
+        """Recupera gradualmente a taxa após um período de backoff"""
+        with self._lock:
+            self.backoff = BACKOFF_INICIAL
+            if self.taxa < self.taxa_maxima:
+                self.taxa = min(self.taxa_maxima, self.taxa + self.taxa_maxima * 0.1)
+
+    def registrar_limite_excedido(self, retry_after=None):
+        """
+        Aplica backoff após HTTP 429
+
+        Args:
+            retry_after (float): Tempo de espera sugerido pelo servidor, se houver
+        """
+        with self._lock:
+            agora = time.monotonic()
+            espera = retry_after if retry_after else self.backoff
+            self.bloqueado_ate = max(self.bloqueado_ate, agora + espera)
+            self.backoff = min(self.backoff * 2, BACKOFF_MAXIMO)
+            self.taxa = max(self.taxa / 2, self.taxa_maxima / 16)
+            self.tokens = min(self.tokens, 0.0)
+            print(f"  🐢 Limite excedido: pausando {espera:.1f}s, taxa reduzida para {self.taxa:.2f} req/s")
+
+
+class LimitadorTaxa:
+    """Registro de baldes por host, compartilhado pelo processo"""
+
+    def __init__(self, limites=None, limite_padrao=LIMITE_GENERICO, processos=LIMITE_PROCESSOS):
+        """
+        Args:
+            limites (dict): host -> (taxa, rajada)
+            limite_padrao (tuple): (taxa, rajada) dos hosts sem limite próprio
+            processos (int): Processos que dividem cada limite (a taxa e a rajada são repartidas,
+                             mesmo que a rajada de cada um fique fracionária)
+        """
+        self.limites = dict(limites or LIMITES_PADRAO)
+        self.limite_padrao = limite_padrao
+        self.processos = max(1, processos)
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def balde(self, host):
+        """Retorna (criando se necessário) o balde de um host"""
+        with self._lock:
+            if host not in self._baldes:
+                taxa, capacidade = self.limites.get(host, self.limite_padrao)
+                if capacidade < self.processos:
+                    # Arredondar para 1 token por processo multiplicaria a rajada da frota
+                    print(f"⚠️  Rajada de {host} ({capacidade}) menor que os {self.processos} processos: "
+                          f"a primeira requisição de cada processo pode esperar até "
+                          f"{(self.processos - capacidade) / taxa:.1f}s")
+                self._baldes[host] = BaldeTokens(taxa / self.processos, capacidade / self.processos)
+            return self._baldes[host]
+
+    def aguardar(self, host, custo=1, cancelado=None):
+        """Aguarda a vez de fazer requisição(ões) ao host (ver BaldeTokens.aguardar)"""
+        self.balde(host).aguardar(custo, cancelado)
+
+    def registrar_sucesso(self, host):
+        self.balde(host).registrar_sucesso()
+
+    def registrar_limite_excedido(self, host, retry_after=None):
+        self.balde(host).registrar_limite_excedido(retry_after)
+
+
+def host_da_url(url):
+    """
+    Converte uma URL na chave de host usada pelo limitador
+
+    Args:
+        url (str): URL completa
+
+    Returns:
+        str: 'google', 'fundsexplorer' ou o hostname
+    """
+    hostname = urlparse(url).hostname or ''
+    for chave in LIMITES_PADRAO:
+        if chave in hostname:
+            return chave
+    return hostname
+
+
+# Instância global do limitador
+limitador = LimitadorTaxa()
@@ -0,0 +1,357 @@
+"""
+Mercado sintético de FIIs para testes de escala
+Gera, a partir de uma semente, barras diárias e intradiárias, dividendos e
+fundamentos para milhares de tickers distribuídos entre os setores de SETORES_FIIS
+"""
+import threading
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from setores_fiis import SETORES_FIIS
+
+FUSO_B3 = 'America/Sao_Paulo'
+DIAS_UTEIS_ANO = 252
+# Pregão de FIIs: 10h às 18h
+ABERTURA_PREGAO = 10
+MINUTOS_PREGAO = 8 * 60
+
+DIAS_POR_PERIODO = {
+    '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126,
+    '1y': 252, '2y': 504, '5y': 1260, '10y': 2520,
+}
+MINUTOS_POR_INTERVALO = {
+    '1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60, '90m': 90,
+}
+REGRA_REAMOSTRAGEM = {'1wk': 'W-MON', '1mo': 'MS', '3mo': 'QS'}
+
+# Parâmetros anuais por setor: retorno, volatilidade, DY, P/VP médio e peso do fator setorial
+PARAMETROS_SETORES_SINTETICOS = {
+    'Logística':               {'retorno': 0.04, 'vol': 0.16, 'dy': 0.085, 'pvp': 0.95, 'beta': 0.7},
+    'Shopping Centers':        {'retorno': 0.03, 'vol': 0.20, 'dy': 0.090, 'pvp': 0.90, 'beta': 0.8},
+    'Lajes Corporativas':      {'retorno': 0.00, 'vol': 0.22, 'dy': 0.095, 'pvp': 0.75, 'beta': 0.8},
+    'Recebíveis Imobiliários': {'retorno': 0.01, 'vol': 0.10, 'dy': 0.125, 'pvp': 0.98, 'beta': 0.6},
+    'Desenvolvimento':         {'retorno': 0.03, 'vol': 0.18, 'dy': 0.090, 'pvp': 0.92, 'beta': 0.7},
+    'Terrenos':                {'retorno': 0.02, 'vol': 0.24, 'dy': 0.080, 'pvp': 0.85, 'beta': 0.7},
+    'Fundos de Fundos':        {'retorno': 0.02, 'vol': 0.14, 'dy': 0.110, 'pvp': 0.90, 'beta': 0.9},
+    'Agronegócio':             {'retorno': 0.00, 'vol': 0.18, 'dy': 0.140, 'pvp': 0.88, 'beta': 0.6},
+    'Híbrido':                 {'retorno': 0.02, 'vol': 0.15, 'dy': 0.100, 'pvp': 0.90, 'beta': 0.7},
+}
+
+COLUNAS_BARRAS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _semente_texto(texto):
+    """Semente estável entre execuções (hash() do Python varia por processo)"""
+    return zlib.crc32(texto.encode('utf-8'))
+
+
+def _nome_sintetico(indice):
+    """0 → SAAA11, 1 → SAAB11, ... (até 17.576 tickers)"""
+    letras = ''
+    for _ in range(3):
+        indice, resto = divmod(indice, 26)
+        letras = chr(ord('A') + resto) + letras
+    return f'S{letras}11.SA'
+
+
+class GeradorMercadoSintetico:
+    """
+    Mercado de FIIs sintético e determinístico
+
+    Produz barras diárias de vários anos, barras intradiárias, dividendos
+    mensais e fundamentos para milhares de tickers distribuídos entre os
+    setores de SETORES_FIIS. A mesma semente sempre gera os mesmos dados.
+    Os tickers reais de SETORES_FIIS vêm primeiro, seguidos dos sintéticos.
+    """
+
+    def __init__(self, quantidade=2000, semente=42, anos=10, hoje=None):
+        """
+        Args:
+            quantidade (int): Total de tickers do universo
+            semente (int): Semente do gerador
+            anos (int): Anos de histórico diário (período 'max')
+            hoje (pd.Timestamp): Data de referência (padrão: agora, fuso da B3)
+        """
+        self.semente = semente
+        self.agora = pd.Timestamp(hoje) if hoje is not None else pd.Timestamp.now(tz=FUSO_B3)
+        if self.agora.tzinfo is None:
+            self.agora = self.agora.tz_localize(FUSO_B3)
+
+        # O dia corrente só tem barra depois da abertura do pregão
+        ultimo_dia = self.agora.normalize()
+        if self.agora.hour < ABERTURA_PREGAO:
+            ultimo_dia -= pd.Timedelta(days=1)
+        self.calendario = pd.bdate_range(end=ultimo_dia.tz_localize(None), periods=anos * DIAS_UTEIS_ANO,
+                                         tz=FUSO_B3)
+
+        reais = [f'{t}.SA' for t in SETORES_FIIS]
+        setores_reais = list(dict.fromkeys(v['setor'] for v in SETORES_FIIS.values()))
+        self.setores = {f'{t}.SA': v['setor'] for t, v in SETORES_FIIS.items()}
+        self.universo = reais[:quantidade]
+
+        rng = np.random.default_rng(semente)
+        for i in range(max(0, quantidade - len(reais))):
+            ticker = _nome_sintetico(i)
+            self.universo.append(ticker)
+            self.setores[ticker] = setores_reais[rng.integers(len(setores_reais))]
+
+        self._indices = {t: i for i, t in enumerate(self.universo)}
+        self._diarias = lru_cache(maxsize=512)(self._gerar_diarias)
+        self._fator_setor = lru_cache(maxsize=None)(self._gerar_fator_setor)
+
+    def _rng(self, *partes):
+        return np.random.default_rng([self.semente] + [_semente_texto(str(p)) for p in partes])
+
+    def _parametros(self, ticker):
+        """Parâmetros próprios do ticker, sorteados em torno dos do setor"""
+        setor = self.setores.get(ticker, 'Híbrido')
+        base = PARAMETROS_SETORES_SINTETICOS.get(setor, PARAMETROS_SETORES_SINTETICOS['Híbrido'])
+        rng = self._rng('parametros', ticker)
+        # Preço de emissão: cotas de R$ 10 (papel/varejo) ou R$ 100 (tijolo)
+        preco_inicial = (10.0 if rng.random() < 0.35 else 100.0) * float(rng.lognormal(0, 0.15))
+        return {
+            'setor': setor,
+            'retorno': base['retorno'] + float(rng.normal(0, 0.02)),
+            'vol': base['vol'] * float(rng.lognormal(0, 0.2)),
+            'dy': max(0.04, base['dy'] + float(rng.normal(0, 0.015))),
+            'pvp': max(0.4, base['pvp'] + float(rng.normal(0, 0.08))),
+            'beta': base['beta'],
+            'preco_inicial': preco_inicial,
+            # Liquidez: de poucas centenas a milhões de cotas por dia
+            'volume_medio': float(rng.lognormal(10.5, 1.5)),
+        }
+
+    def _gerar_fator_setor(self, setor):
+        """Retornos diários comuns ao setor (padronizados)"""
+        return self._rng('setor', setor).standard_normal(len(self.calendario))
+
+    def _gerar_diarias(self, ticker):
+        """Barras diárias completas do ticker sobre o calendário inteiro"""
+        p = self._parametros(ticker)
+        rng = self._rng('diarias', ticker)
+        n = len(self.calendario)
+
+        sigma_dia = p['vol'] / np.sqrt(DIAS_UTEIS_ANO)
+        beta = p['beta']
+        choques = beta * self._fator_setor(p['setor']) + np.sqrt(1 - beta ** 2) * rng.standard_normal(n)
+        retornos = (p['retorno'] - 0.5 * p['vol'] ** 2) / DIAS_UTEIS_ANO + sigma_dia * choques
+        fechamento = p['preco_inicial'] * np.exp(np.cumsum(retornos))
+
+        anterior = np.concatenate([[p['preco_inicial']], fechamento[:-1]])
+        abertura = anterior * np.exp(rng.normal(0, sigma_dia * 0.3, n))
+        amplitude = np.abs(rng.normal(0, sigma_dia * 0.6, (2, n)))
+        maxima = np.maximum(abertura, fechamento) * (1 + amplitude[0])
+        minima = np.minimum(abertura, fechamento) * (1 - amplitude[1])
+
+        volume = rng.lognormal(np.log(p['volume_medio']), 0.6, n)
+        # Fundos ilíquidos ficam dias sem negócios
+        if p['volume_medio'] < 5_000:
+            volume[rng.random(n) < 0.3] = 0
+
+        return pd.DataFrame({
+            'Open': np.round(abertura, 2),
+            'High': np.round(maxima, 2),
+            'Low': np.round(minima, 2),
+            'Close': np.round(fechamento, 2),
+            'Volume': volume.astype(np.int64),
+        }, index=self.calendario)
+
+    def _intradiarias(self, ticker, dias, minutos):
+        """Barras intradiárias dos últimos dias, ligando abertura e fechamento de cada dia"""
+        diarias = self._diarias(ticker).iloc[-dias:]
+        passos = MINUTOS_PREGAO // minutos
+        rng = self._rng('intradiarias', ticker, minutos)
+
+        # Ponte browniana em log-preço entre a abertura e o fechamento do dia
+        t = np.linspace(0, 1, passos + 1)
+        ruido = np.cumsum(rng.standard_normal((len(diarias), passos + 1)), axis=1) / np.sqrt(passos)
+        ponte = ruido - t * ruido[:, -1:]
+        inicio = np.log(diarias['Open'].to_numpy())[:, None]
+        fim = np.log(diarias['Close'].to_numpy())[:, None]
+        amplitude = np.log(diarias['High'].to_numpy() / diarias['Low'].to_numpy())[:, None]
+        caminho = np.exp(inicio + (fim - inicio) * t + amplitude * 0.5 * ponte)
+
+        abertura, fechamento = caminho[:, :-1], caminho[:, 1:]
+        folga = np.abs(rng.normal(0, 0.0005, (2,) + abertura.shape))
+        maxima = np.maximum(abertura, fechamento) * (1 + folga[0])
+        minima = np.minimum(abertura, fechamento) * (1 - folga[1])
+
+        # Volume em "U": mais negócios na abertura e no fechamento
+        perfil = 1 + 2 * (np.linspace(-1, 1, passos) ** 2)
+        volume = diarias['Volume'].to_numpy()[:, None] * perfil / perfil.sum()
+
+        inicio_dias = diarias.index.tz_localize(None) + pd.Timedelta(hours=ABERTURA_PREGAO)
+        deslocamentos = pd.to_timedelta(np.arange(passos) * minutos, unit='min')
+        indice = pd.DatetimeIndex(np.add.outer(inicio_dias.values, deslocamentos.values).ravel()).tz_localize(FUSO_B3)
+
+        barras = pd.DataFrame({
+            'Open': abertura.ravel().round(2),
+            'High': maxima.ravel().round(2),
+            'Low': minima.ravel().round(2),
+            'Close': fechamento.ravel().round(2),
+            'Volume': volume.ravel().astype(np.int64),
+        }, index=indice)
+        # O pregão em andamento só tem barras até agora
+        return barras[barras.index <= self.agora]
+
+    def historico(self, ticker, period='1mo', interval='1d', start=None, end=None, **kwargs):
+        """
+        Histórico no formato de yf.Ticker.history
+
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volume (vazio para ticker desconhecido)
+        """
+        if ticker not in self._indices:
+            return pd.DataFrame(columns=COLUNAS_BARRAS)
+
+        if period == 'ytd':
+            dias = int((self.calendario >= pd.Timestamp(self.agora.year, 1, 1, tz=FUSO_B3)).sum())
+        else:
+            dias = DIAS_POR_PERIODO.get(period, len(self.calendario))
+
+        if interval in MINUTOS_POR_INTERVALO:
+            barras = self._intradiarias(ticker, min(dias, 60), MINUTOS_POR_INTERVALO[interval])
+        else:
+            barras = self._diarias(ticker).iloc[-dias:]
+            if interval in REGRA_REAMOSTRAGEM:
+                barras = barras.resample(REGRA_REAMOSTRAGEM[interval], label='left', closed='left').agg(
+                    {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+                ).dropna()
+
+        if start is not None:
+            barras = barras[barras.index >= pd.Timestamp(start, tz=FUSO_B3)]
+        if end is not None:
+            barras = barras[barras.index < pd.Timestamp(end, tz=FUSO_B3)]
+
+        # Cópia: quem chama pode acrescentar colunas
+        return barras.copy()
+
+    def dividendos(self, ticker):
+        """Dividendos mensais (data-com no último dia útil do mês), como yf.Ticker.dividends"""
+        if ticker not in self._indices:
+            return pd.Series(dtype=float, name='Dividends')
+
+        p = self._parametros(ticker)
+        diarias = self._diarias(ticker)
+        meses = diarias.index.month
+        # Último pregão de cada mês já encerrado
+        ultimo_do_mes = np.append(meses[:-1] != meses[1:], False)
+        precos = diarias['Close'].to_numpy()[ultimo_do_mes]
+        rng = self._rng('dividendos', ticker)
+        valores = np.round(precos * p['dy'] / 12 * rng.lognormal(0, 0.08, len(precos)), 2)
+        return pd.Series(valores, index=diarias.index[ultimo_do_mes], name='Dividends')
+
+    def info(self, ticker):
+        """Fundamentos no formato de yf.Ticker.info"""
+        if ticker not in self._indices:
+            return {}
+
+        p = self._parametros(ticker)
+        diarias = self._diarias(ticker)
+        fechamento = diarias['Close']
+        preco = float(fechamento.iloc[-1])
+        anterior = float(fechamento.iloc[-2])
+        ultimo_ano = diarias.iloc[-DIAS_UTEIS_ANO:]
+        cotas = int(self._rng('cotas', ticker).integers(1_000_000, 300_000_000))
+        valor_patrimonial = preco / p['pvp']
+        dividendos_12m = float(GeradorMercadoSintetico.dividendos(self, ticker).iloc[-12:].sum())
+        nome = ticker.replace('.SA', '')
+
+        return {
+            'symbol': ticker,
+            'shortName': f'FII {nome[:4]}',
+            'longName': f'{nome[:4]} {p["setor"]} Fundo de Investimento Imobiliário',
+            'quoteType': 'EQUITY',
+            'currency': 'BRL',
+            'exchange': 'SAO',
+            'sector': 'Real Estate',
+            'currentPrice': preco,
+            'regularMarketPrice': preco,
+            'previousClose': anterior,
+            'regularMarketChangePercent': (preco - anterior) / anterior * 100,
+            'regularMarketVolume': int(diarias['Volume'].iloc[-1]),
+            'averageVolume': int(ultimo_ano['Volume'].mean()),
+            'fiftyTwoWeekHigh': float(ultimo_ano['High'].max()),
+            'fiftyTwoWeekLow': float(ultimo_ano['Low'].min()),
+            'bookValue': round(valor_patrimonial, 2),
+            'priceToBook': round(p['pvp'], 4),
+            # O Yahoo devolve o DY já em porcentagem para FIIs
+            'dividendYield': round(dividendos_12m / preco * 100, 2),
+            'trailingAnnualDividendRate': round(dividendos_12m, 2),
+            'sharesOutstanding': cotas,
+            'marketCap': int(preco * cotas),
+        }
+
+    def download(self, tickers, period='1mo', interval='1d', group_by='column', **kwargs):
+        """Download em lote no formato de yf.download (colunas MultiIndex)"""
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        quadros = {t: GeradorMercadoSintetico.historico(self, t, period=period, interval=interval) for t in tickers}
+        dados = pd.concat(quadros, axis=1)
+        if group_by == 'ticker':
+            return dados
+        return dados.swaplevel(axis=1).sort_index(axis=1)
+
+
+class FonteSintetica(GeradorMercadoSintetico):
+    """
+    Fonte de dados (mesma interface de fontes_dados.FonteAoVivo) servida pelo
+    gerador sintético, sem rede, com latência injetada e contagem de chamadas
+
+    O setor dos tickers sintéticos fica só na fonte (ver setor), sem entrar em
+    SETORES_FIIS; a análise setorial o consulta por fontes_dados.setor_info
+    """
+
+    offline = True
+
+    def __init__(self, quantidade=2000, semente=42, latencia_ms=0, **kwargs):
+        super().__init__(quantidade=quantidade, semente=semente, **kwargs)
+        self.latencia_ms = latencia_ms
+        self.chamadas = Counter()
+        self._lock = threading.Lock()
+
+    def setor(self, ticker):
+        """Setor/tipo de um ticker sintético (None para os reais e os desconhecidos)"""
+        ticker = ticker if ticker.endswith('.SA') else f'{ticker}.SA'
+        if ticker.replace('.SA', '') in SETORES_FIIS or ticker not in self.setores:
+            return None
+        return {'setor': self.setores[ticker], 'tipo': 'Sintético'}
+
+    def _registrar(self, tipo, quantidade=1):
+        with self._lock:
+            self.chamadas[tipo] += quantidade
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+
+    def historico(self, ticker, **kwargs):
+        self._registrar('historico')
+        return super().historico(ticker, **kwargs)
+
+    def info(self, ticker):
+        self._registrar('info')
+        return super().info(ticker)
+
+    def dividendos(self, ticker):
+        self._registrar('dividendos')
+        return super().dividendos(ticker)
+
+    def download(self, tickers, **kwargs):
+        self._registrar('download', len(tickers))
+        return super().download(tickers, **kwargs)
+
+    def pagina(self, url, headers=None, timeout=10):
+        from fixtures_upstream import RespostaGravada
+        self._registrar('pagina')
+        return RespostaGravada(200, '<html><body><div class="VwiC3b">Sem notícias (mercado sintético)</div></body></html>')
+
+    def completar(self, **kwargs):
+        self._registrar('completar')
+        return 'Análise gerada sobre dados sintéticos.'
+
+    def llm_disponivel(self):
+        return True
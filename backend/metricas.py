@@ -0,0 +1,293 @@
+"""
+Registro de métricas no formato de texto do Prometheus
+Contadores, medidores e histogramas com rótulos, sem dependências externas,
+exportados em /api/metrics (API) ou em uma porta própria (monitor do Telegram)
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores)) + (extra or [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{n}="{_escapar(v)}"' for n, v in pares) + '}'
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"❌ Rótulos inválidos para {self.nome}: {sorted(rotulos)} (esperado {list(self.rotulos)})")
+        return tuple(str(rotulos[n]) for n in self.rotulos)
+
+    def _linhas(self):
+        raise NotImplementedError
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+        with self._lock:
+            linhas.extend(self._linhas())
+        return '\n'.join(linhas)
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: total de requisições)"""
+
+    tipo = 'counter'
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        with self._lock:
+            return self._valores.get(self._chave(rotulos), 0)
+
+    def _linhas(self):
+        return [f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(v)}'
+                for chave, v in sorted(self._valores.items())]
+
+
+class Medidor(Contador):
+    """Valor que sobe e desce (ex.: requisições em andamento)"""
+
+    tipo = 'gauge'
+
+    def dec(self, valor=1, **rotulos):
+        self.inc(-valor, **rotulos)
+
+    def definir(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = valor
+
+
+class Histograma(_Metrica):
+    """Distribuição de valores em faixas cumulativas (ex.: latências)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites)) + (float('inf'),)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        if not math.isfinite(valor):
+            # NaN não cai em nenhuma faixa e tornaria a soma NaN para sempre
+            return
+        with self._lock:
+            faixas, soma, total = self._valores.get(chave) or ([0] * len(self.limites), 0.0, 0)
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    faixas[i] += 1
+                    break
+            self._valores[chave] = (faixas, soma + valor, total + 1)
+
+    @contextmanager
+    def medir(self, **rotulos):
+        """Mede a duração do bloco em segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def _linhas(self):
+        linhas = []
+        for chave, (faixas, soma, total) in sorted(self._valores.items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.limites, faixas):
+                acumulado += quantidade
+                le = [('le', _formatar_numero(limite))]
+                linhas.append(f'{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, le)} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(soma)}')
+            linhas.append(f'{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {total}')
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas do processo"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._registrar(Medidor(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_LATENCIA):
+        return self._registrar(Histograma(nome, ajuda, rotulos, limites))
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return '\n'.join(m.exportar() for m in metricas) + '\n'
+
+
+# Registro global do processo (com gunicorn, cada worker tem o seu: some as séries por 'pid')
+registro = RegistroMetricas()
+
+processo_info = registro.medidor(
+    'fii_processo_info', 'Processo (worker) que respondeu a coleta; as demais métricas são deste processo', ('pid',))
+processo_info.definir(1, pid=str(os.getpid()))
+
+# Rotas HTTP
+http_requisicoes = registro.contador(
+    'fii_http_requisicoes_total', 'Requisições HTTP atendidas', ('rota', 'metodo', 'status'))
+http_duracao = registro.histograma(
+    'fii_http_duracao_segundos', 'Duração total das requisições HTTP', ('rota',))
+http_tempo_fontes = registro.histograma(
+    'fii_http_tempo_fontes_segundos', 'Tempo de cada requisição gasto em chamadas às fontes externas', ('rota',))
+http_tempo_json = registro.histograma(
+    'fii_http_tempo_json_segundos', 'Tempo de cada requisição gasto serializando JSON', ('rota',))
+http_em_andamento = registro.medidor(
+    'fii_http_requisicoes_em_andamento', 'Requisições HTTP em andamento')
+
+# Fontes externas (historico, info, dividendos, download, pagina = pesquisa web, completar = OpenAI)
+fonte_chamadas = registro.contador(
+    'fii_fonte_chamadas_total', 'Chamadas às fontes externas', ('tipo', 'resultado'))
+fonte_duracao = registro.histograma(
+    'fii_fonte_duracao_segundos', 'Latência das chamadas às fontes externas', ('tipo',))
+
+# Caches
+cache_consultas = registro.contador(
+    'fii_cache_consultas_total', 'Consultas aos caches em memória', ('cache', 'resultado'))
+cache_memoria = registro.medidor(
+    'fii_cache_memoria_bytes', 'Memória ocupada pelas entradas do cache', ('cache',))
+cache_memoria_limite = registro.medidor(
+    'fii_cache_memoria_limite_bytes', 'Orçamento de memória do cache', ('cache',))
+cache_entradas = registro.medidor(
+    'fii_cache_entradas', 'Entradas guardadas no cache', ('cache',))
+cache_despejos = registro.contador(
+    'fii_cache_despejos_total', 'Entradas removidas do cache (memoria, expirado, tamanho)', ('cache', 'motivo'))
+
+# Ciclos do monitor do Telegram
+monitor_ciclo_duracao = registro.histograma(
+    'fii_monitor_ciclo_duracao_segundos', 'Duração da coleta de dados de cada ciclo do monitor')
+monitor_coletas = registro.contador(
+    'fii_monitor_coletas_total', 'FIIs buscados pelo monitor (ok, sem_dados, prazo_esgotado)', ('resultado',))
+monitor_alertas = registro.contador(
+    'fii_monitor_alertas_total', 'Alertas avaliados pelo monitor (novo = enviado, repetido = suprimido)',
+    ('regra', 'resultado'))
+monitor_universo = registro.medidor(
+    'fii_monitor_universo_tickers', 'FIIs no universo do monitor e buscados no último ciclo', ('conjunto',))
+monitor_universo_idade = registro.medidor(
+    'fii_monitor_universo_idade_segundos', 'Idade da cotação mais antiga do universo no quadro do monitor')
+monitor_serie_pontos = registro.contador(
+    'fii_monitor_serie_pontos_total', 'Cotações acrescentadas à série intradiária pelo monitor')
+
+# Telegram
+telegram_envios = registro.contador(
+    'fii_telegram_envios_total', 'Mensagens enviadas ao Telegram', ('resultado',))
+telegram_fila = registro.medidor(
+    'fii_telegram_fila_alertas', 'Alertas aguardando envio na fila do Telegram')
+telegram_duracao = registro.histograma(
+    'fii_telegram_envio_duracao_segundos', 'Latência do envio de mensagens ao Telegram')
+
+
+# Tempos acumulados da requisição atual: {'fontes': s, 'json': s}
+_tempos_requisicao = contextvars.ContextVar('tempos_requisicao', default=None)
+
+
+def iniciar_requisicao():
+    """Começa a acumular os tempos da requisição atual"""
+    tempos = {'fontes': 0.0, 'json': 0.0}
+    _tempos_requisicao.set(tempos)
+    return tempos
+
+
+def acumular_tempo(categoria, duracao):
+    """Soma uma duração à requisição atual (se houver uma)"""
+    tempos = _tempos_requisicao.get()
+    if tempos is not None:
+        tempos[categoria] += duracao
+
+
+def registrar_chamada_fonte(tipo, funcao, *args, **kwargs):
+    """
+    Executa uma chamada a uma fonte externa medindo latência e resultado
+
+    Args:
+        tipo (str): Tipo da chamada (historico, info, dividendos, download, pagina, completar)
+        funcao (callable): Chamada a executar
+    """
+    inicio = time.perf_counter()
+    resultado = 'erro'
+    try:
+        valor = funcao(*args, **kwargs)
+        resultado = 'ok'
+        return valor
+    finally:
+        duracao = time.perf_counter() - inicio
+        fonte_duracao.observar(duracao, tipo=tipo)
+        fonte_chamadas.inc(tipo=tipo, resultado=resultado)
+        acumular_tempo('fontes', duracao)
+
+
+def servir_metricas(porta, host='127.0.0.1'):
+    """
+    Expõe o registro em http://host:porta/metrics numa thread em segundo plano
+    (usado por processos sem Flask, como o monitor do Telegram)
+
+    Returns:
+        ThreadingHTTPServer: Servidor iniciado
+    """
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            corpo = registro.exportar().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', TIPO_CONTEUDO)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True, name='metricas').start()
+    print(f"📈 Métricas disponíveis em http://{host}:{porta}/metrics")
+    return servidor
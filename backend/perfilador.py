@@ -0,0 +1,167 @@
+"""
+Perfilamento sob demanda de requisições individuais
+Com PERFIL_HABILITADO=true, uma requisição com o cabeçalho 'X-Perfil' ou o
+parâmetro '?perfil=' roda sob um perfilador e o resultado é gravado em
+PERFIS_DIR. A resposta traz o nome do perfil no cabeçalho 'X-Perfil'.
+
+Modos:
+    deterministico  cProfile: <nome>.prof (pstats) e <nome>.txt (top funções)
+    amostragem      Amostras da pilha a cada PERFIL_INTERVALO_MS: <nome>.collapsed
+                    (formato de pilhas colapsadas, aceito por flamegraph.pl/speedscope)
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+PERFIL_HABILITADO = os.getenv('PERFIL_HABILITADO', 'false').lower() == 'true'
+PERFIS_DIR = os.getenv('PERFIS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perfis'))
+PERFIL_INTERVALO_MS = float(os.getenv('PERFIL_INTERVALO_MS', '2'))
+# Quantidade de perfis mantidos em disco (os mais antigos são apagados)
+PERFIS_MAXIMO = int(os.getenv('PERFIS_MAXIMO', '200'))
+
+MODO_DETERMINISTICO = 'deterministico'
+MODO_AMOSTRAGEM = 'amostragem'
+
+
+def modo_solicitado(cabecalhos, parametros):
+    """
+    Retorna o modo de perfilamento pedido pela requisição (ou None)
+
+    Aceita '1'/'true' (determinístico), 'deterministico' ou 'amostragem'
+    """
+    if not PERFIL_HABILITADO:
+        return None
+
+    valor = (cabecalhos.get('X-Perfil') or parametros.get('perfil') or '').strip().lower()
+    if not valor or valor in ('0', 'false'):
+        return None
+    if valor == MODO_AMOSTRAGEM:
+        return MODO_AMOSTRAGEM
+    return MODO_DETERMINISTICO
+
+
+class AmostradorPilha:
+    """Amostra periodicamente a pilha de uma thread e acumula pilhas colapsadas"""
+
+    def __init__(self, id_thread, intervalo_ms=PERFIL_INTERVALO_MS):
+        self.id_thread = id_thread
+        self.intervalo = intervalo_ms / 1000
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True, name='perfil-amostragem')
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def colapsado(self):
+        return '\n'.join(f'{pilha} {total}' for pilha, total in self.pilhas.most_common()) + '\n'
+
+
+class PerfilRequisicao:
+    """Perfilamento de uma requisição, do início da view até a resposta"""
+
+    def __init__(self, modo, descricao):
+        """
+        Args:
+            modo (str): 'deterministico' ou 'amostragem'
+            descricao (str): Método e rota, usados no nome do arquivo
+        """
+        self.modo = modo
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', descricao).strip('-')[:60]
+        self.nome = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{slug}_{uuid.uuid4().hex[:6]}"
+        self._perfil = None
+        self._amostrador = None
+        self._inicio = None
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        if self.modo == MODO_AMOSTRAGEM:
+            self._amostrador = AmostradorPilha(threading.get_ident())
+            self._amostrador.iniciar()
+        else:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+
+    def finalizar(self):
+        """
+        Para o perfilador e grava os arquivos
+
+        Returns:
+            str: Nome do perfil gravado
+        """
+        if self._perfil:
+            self._perfil.disable()
+        if self._amostrador:
+            self._amostrador.parar()
+        duracao = time.perf_counter() - self._inicio
+
+        os.makedirs(PERFIS_DIR, exist_ok=True)
+        base = os.path.join(PERFIS_DIR, self.nome)
+
+        if self._perfil:
+            self._perfil.dump_stats(f'{base}.prof')
+            resumo = io.StringIO()
+            resumo.write(f'Duração total: {duracao * 1000:.1f} ms\n\n')
+            pstats.Stats(self._perfil, stream=resumo).sort_stats('cumulative').print_stats(40)
+            with open(f'{base}.txt', 'w', encoding='utf-8') as arquivo:
+                arquivo.write(resumo.getvalue())
+        else:
+            with open(f'{base}.collapsed', 'w', encoding='utf-8') as arquivo:
+                arquivo.write(self._amostrador.colapsado())
+
+        print(f"🔬 Perfil {self.modo} gravado: {base} ({duracao * 1000:.1f} ms)")
+        _remover_antigos()
+        return self.nome
+
+
+def _remover_antigos():
+    """Mantém apenas os PERFIS_MAXIMO perfis mais recentes"""
+    try:
+        arquivos = sorted(os.listdir(PERFIS_DIR))
+    except FileNotFoundError:
+        return
+    nomes = sorted({os.path.splitext(a)[0] for a in arquivos})
+    excedentes = set(nomes[:max(0, len(nomes) - PERFIS_MAXIMO)])
+    for arquivo in arquivos:
+        if os.path.splitext(arquivo)[0] in excedentes:
+            os.remove(os.path.join(PERFIS_DIR, arquivo))
+
+
+def arquivos_do_perfil(nome):
+    """
+    Lista os arquivos gravados de um perfil
+
+    Returns:
+        list: Nomes de arquivo dentro de PERFIS_DIR (vazio se não existir)
+    """
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', nome) or not os.path.isdir(PERFIS_DIR):
+        return []
+    return sorted(a for a in os.listdir(PERFIS_DIR) if os.path.splitext(a)[0] == nome)
@@ -3,11 +3,17 @@ Módulo de pesquisa web para análise de FIIs
 Busca informações em múltiplas fontes para enriquecer a análise de IA
 """
 
-import requests
-from bs4 import BeautifulSoup
-import time
 import re
 
+import fontes_dados
+from rastreamento import rastrear
+
+
+def _analisar_html(html):
+    """Interpreta o HTML (bs4 é importado só quando a pesquisa web é usada)"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
 
 class PesquisadorFII:
     """Pesquisador de informações sobre FIIs em múltiplas fontes"""
@@ -18,6 +24,7 @@ class PesquisadorFII:
         }
         self.timeout = 10
     
+    @rastrear('pesquisa.fii')
     def pesquisar_fii(self, ticker):
         """
         Pesquisa informações sobre um FII em múltiplas fontes
@@ -63,6 +70,7 @@ class PesquisadorFII:
         
         return informacoes
     
+    @rastrear('pesquisa.google')
     def _buscar_google(self, ticker):
         """Busca informações gerais via Google"""
         try:
@@ -72,11 +80,11 @@ class PesquisadorFII:
             query = f"FII {ticker} análise 2024 2025"
             url = f"https://www.google.com/search?q={query}"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = fontes_dados.pagina(url, headers=self.headers, timeout=self.timeout)
             
             if response.status_code == 200:
                 # Extrai snippets básicos
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = _analisar_html(response.text)
                 snippets = []
                 
                 # Procura por divs com classes de resultado do Google
@@ -97,6 +105,7 @@ class PesquisadorFII:
             print(f"    ❌ Erro ao buscar no Google: {str(e)}")
             return None
     
+    @rastrear('pesquisa.fundsexplorer')
     def _buscar_fundexplorer(self, ticker):
         """Busca dados no Fund Explorer (se disponível publicamente)"""
         try:
@@ -105,10 +114,10 @@ class PesquisadorFII:
             # Fund Explorer tem API pública (sem auth)
             url = f"https://www.fundsexplorer.com.br/funds/{ticker}"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = fontes_dados.pagina(url, headers=self.headers, timeout=self.timeout)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = _analisar_html(response.text)
                 
                 # Tenta extrair informações básicas
                 info = []
@@ -134,6 +143,7 @@ class PesquisadorFII:
             print(f"    ❌ Erro ao buscar no Fund Explorer: {str(e)}")
             return None
     
+    @rastrear('pesquisa.noticias')
     def _buscar_noticias(self, ticker):
         """Busca notícias recentes sobre o FII"""
         try:
@@ -143,10 +153,10 @@ class PesquisadorFII:
             query = f"FII {ticker} notícias"
             url = f"https://www.google.com/search?q={query}&tbm=nws"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = fontes_dados.pagina(url, headers=self.headers, timeout=self.timeout)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = _analisar_html(response.text)
                 noticias = []
                 
                 # Procura por títulos de notícias
@@ -223,9 +233,6 @@ def pesquisar_multiplos_fiis(tickers):
             info = pesquisador.pesquisar_fii(ticker)
             resultados[ticker_limpo] = info
             
-            # Pequena pausa entre requisições para não sobrecarregar
-            time.sleep(1)
-            
         except Exception as e:
             print(f"  ❌ Erro ao pesquisar {ticker_limpo}: {str(e)}")
             resultados[ticker_limpo] = {
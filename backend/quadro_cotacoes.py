@@ -0,0 +1,262 @@
+"""
+Quadro colunar de cotações do universo de FIIs
+Guarda a última cotação de cada ticker em arrays numpy (uma coluna por campo)
+com um índice ticker → linha, atualizados no lugar à medida que as cotações
+chegam. Rankings, filtros e estatísticas são operações vetorizadas sobre as
+colunas, sem montar uma lista de dicionários a cada consulta.
+
+As consultas não travam o quadro: com um único escritor (o ciclo do monitor)
+elas podem usar o quadro vivo; com escritores concorrentes (requisições do
+Flask) devem ser feitas sobre um retrato(), já que um ticker novo pode tomar
+a linha de outro (despejo) entre duas chamadas.
+"""
+import threading
+import time
+
+import numpy as np
+
+# Colunas numéricas do quadro (P/VP e DY ausentes ficam como NaN)
+COLUNAS = ('preco', 'variacao', 'dy', 'pvp', 'volume', 'atualizado_em')
+
+CAPACIDADE_INICIAL = 512
+
+# Teto de tickers no quadro: acima dele o ticker atualizado há mais tempo cede a linha
+MAX_TICKERS = 4096
+
+
+class QuadroCotacoes:
+    """Última cotação de cada ticker em formato colunar (linhas x campos)"""
+
+    def __init__(self, capacidade=CAPACIDADE_INICIAL, max_tickers=MAX_TICKERS):
+        self._capacidade = capacidade
+        self.max_tickers = max_tickers
+        self._colunas = None          # nome -> array float64 (criados no primeiro uso)
+        self._indice = {}             # ticker -> linha
+        self._tickers = []            # linha -> ticker
+        self._nomes = []              # linha -> nome do fundo
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._indice
+
+    def _garantir_capacidade(self, linhas):
+        if self._colunas is None:
+            self._colunas = {c: np.full(self._capacidade, np.nan) for c in COLUNAS}
+        if linhas <= self._capacidade:
+            return
+
+        # Dobra a capacidade: realocação amortizada, não a cada ticker novo
+        while self._capacidade < linhas:
+            self._capacidade *= 2
+        for nome, coluna in self._colunas.items():
+            nova = np.full(self._capacidade, np.nan)
+            nova[:len(coluna)] = coluna
+            self._colunas[nome] = nova
+
+    def _nova_linha(self, ticker, nome):
+        """Linha para um ticker novo: a próxima livre ou, no teto, a do ticker mais desatualizado"""
+        if len(self._tickers) < self.max_tickers:
+            linha = len(self._tickers)
+            self._garantir_capacidade(linha + 1)
+            self._tickers.append(ticker)
+            self._nomes.append(nome)
+        else:
+            linha = int(np.argmin(self.coluna('atualizado_em')))
+            del self._indice[self._tickers[linha]]
+            self._tickers[linha] = ticker
+            self._nomes[linha] = nome
+        self._indice[ticker] = linha
+        return linha
+
+    def atualizar(self, ticker, preco, variacao, dy=None, pvp=None, volume=0, nome=None):
+        """
+        Grava a cotação de um ticker (na linha existente ou em uma nova)
+
+        Args:
+            ticker (str): Ticker com sufixo .SA
+            preco (float): Preço atual
+            variacao (float): Variação do dia em %
+            dy (float): Dividend Yield em % (None se desconhecido)
+            pvp (float): P/VP (None se desconhecido)
+            volume (int): Volume do último pregão
+            nome (str): Nome do fundo
+        """
+        with self._lock:
+            linha = self._indice.get(ticker)
+            if linha is None:
+                linha = self._nova_linha(ticker, nome or ticker.replace('.SA', ''))
+            elif nome:
+                self._nomes[linha] = nome
+
+            valores = (preco, variacao, dy, pvp, volume, time.time())
+            for coluna, valor in zip(COLUNAS, valores):
+                self._colunas[coluna][linha] = float('nan') if valor is None else valor
+
+    def coluna(self, nome):
+        """
+        Returns:
+            ndarray: Visão da coluna para as linhas ocupadas (não copie para consultas; num
+                     quadro com escritores concorrentes use a de um retrato())
+        """
+        if self._colunas is None:
+            return np.empty(0)
+        return self._colunas[nome][:len(self._tickers)]
+
+    def linhas(self, tickers):
+        """Linhas dos tickers presentes no quadro, na ordem pedida"""
+        return np.fromiter((self._indice[t] for t in tickers if t in self._indice), dtype=np.intp)
+
+    def tickers(self, linhas):
+        """Tickers das linhas, na ordem dada"""
+        return [self._tickers[linha] for linha in linhas.tolist()]
+
+    def mascara(self, tickers=None, **limites):
+        """
+        Filtro vetorizado por faixas de valores
+
+        Args:
+            tickers (list): Restringe às linhas destes tickers (None = todas)
+            **limites: <coluna>_min e/ou <coluna>_max (ex.: dy_min=8, pvp_max=0.95);
+                       linhas com valor ausente (NaN) nunca passam no filtro da coluna
+
+        Returns:
+            ndarray: Máscara booleana sobre as linhas ocupadas
+        """
+        if tickers is None:
+            resultado = np.ones(len(self._tickers), dtype=bool)
+        else:
+            resultado = np.zeros(len(self._tickers), dtype=bool)
+            resultado[self.linhas(tickers)] = True
+        for chave, limite in limites.items():
+            if limite is None:
+                continue
+            nome, _, lado = chave.rpartition('_')
+            if nome not in COLUNAS or lado not in ('min', 'max'):
+                raise ValueError(f"❌ Filtro inválido: {chave}")
+            valores = self.coluna(nome)[:len(resultado)]
+            with np.errstate(invalid='ignore'):
+                resultado &= (valores >= limite) if lado == 'min' else (valores <= limite)
+        return resultado
+
+    def ranking(self, coluna, n=10, crescente=False, mascara=None):
+        """
+        Top-N por uma coluna (argpartition + ordenação só dos N escolhidos)
+
+        Args:
+            coluna (str): Coluna de ordenação (ex.: 'variacao', 'dy')
+            n (int): Quantidade de linhas (None = todas)
+            crescente (bool): True para os menores valores primeiro
+            mascara (ndarray): Filtro booleano opcional (ver mascara())
+
+        Returns:
+            ndarray: Linhas ordenadas
+        """
+        valores = self.coluna(coluna)
+        validas = ~np.isnan(valores)
+        if mascara is not None:
+            # Um ticker novo pode ter entrado depois de a máscara ser montada
+            validas = validas[:len(mascara)] & mascara[:len(validas)]
+        candidatas = np.flatnonzero(validas)
+        chaves = valores[candidatas] if crescente else -valores[candidatas]
+
+        if n is not None and n < len(candidatas):
+            escolhidas = np.argpartition(chaves, n)[:n]
+            candidatas, chaves = candidatas[escolhidas], chaves[escolhidas]
+        return candidatas[np.argsort(chaves, kind='stable')]
+
+    def estatisticas(self, coluna, mascara=None):
+        """
+        Returns:
+            dict: quantidade, media, mediana, minimo, maximo e desvio da coluna (ignora NaN)
+        """
+        valores = self.coluna(coluna)
+        if mascara is not None:
+            valores = valores[:len(mascara)][mascara[:len(valores)]]
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return {'quantidade': 0}
+        return {
+            'quantidade': int(len(valores)),
+            'media': float(valores.mean()),
+            'mediana': float(np.median(valores)),
+            'minimo': float(valores.min()),
+            'maximo': float(valores.max()),
+            'desvio': float(valores.std()),
+        }
+
+    def registros(self, linhas=None):
+        """
+        Converte linhas em dicionários (só na borda: resposta JSON, mensagens)
+
+        Returns:
+            list: [{'ticker', 'nome', 'preco', 'variacao', 'dy', 'pvp', 'volume'}]
+        """
+        if linhas is None:
+            linhas = np.arange(len(self._tickers))
+        colunas = {c: self.coluna(c)[linhas].tolist() for c in COLUNAS[:-1]}
+        registros = []
+        for i, linha in enumerate(linhas.tolist()):
+            pvp, dy, volume = colunas['pvp'][i], colunas['dy'][i], colunas['volume'][i]
+            registros.append({
+                'ticker': self._tickers[linha],
+                'nome': self._nomes[linha],
+                'preco': colunas['preco'][i],
+                'variacao': colunas['variacao'][i],
+                'dy': 0 if dy != dy else dy,
+                'pvp': None if pvp != pvp else pvp,
+                'volume': 0 if volume != volume else int(volume),
+            })
+        return registros
+
+    def retrato(self):
+        """
+        Cópia somente leitura do quadro, com linhas, tickers e colunas do mesmo instante
+
+        Returns:
+            QuadroCotacoes: Retrato para consultas (não recebe atualizações)
+        """
+        with self._lock:
+            retrato = QuadroCotacoes(capacidade=max(1, len(self._tickers)), max_tickers=self.max_tickers)
+            retrato._indice = dict(self._indice)
+            retrato._tickers = list(self._tickers)
+            retrato._nomes = list(self._nomes)
+            if self._colunas is not None:
+                retrato._colunas = {c: self.coluna(c).copy() for c in COLUNAS}
+                for coluna in retrato._colunas.values():
+                    coluna.setflags(write=False)
+        return retrato
+
+    def exportar_estado(self):
+        """
+        Returns:
+            dict: Linhas ocupadas do quadro (para o snapshot em disco) ou None se vazio
+        """
+        with self._lock:
+            if not self._tickers:
+                return None
+            return {
+                'tickers': list(self._tickers),
+                'nomes': list(self._nomes),
+                'colunas': {c: self.coluna(c).copy() for c in COLUNAS},
+            }
+
+    def importar_estado(self, estado):
+        """
+        Restaura as linhas de um snapshot (cada cotação mantém seu horário original)
+
+        Returns:
+            int: Quantidade de tickers restaurados
+        """
+        with self._lock:
+            for i, ticker in enumerate(estado['tickers']):
+                linha = self._indice.get(ticker)
+                if linha is None:
+                    linha = self._nova_linha(ticker, estado['nomes'][i])
+                elif self._colunas['atualizado_em'][linha] >= estado['colunas']['atualizado_em'][i]:
+                    continue
+                for coluna in COLUNAS:
+                    self._colunas[coluna][linha] = estado['colunas'][coluna][i]
+            return len(estado['tickers'])
@@ -0,0 +1,190 @@
+"""
+Rastreamento leve (spans) de requisição → fontes externas → serialização
+Cada span tem nome, início, duração, atributos e o span pai; com
+RASTREAMENTO_HABILITADO=true os spans finalizados são gravados, um por linha,
+em RASTREAMENTO_ARQUIVO (JSON lines). Desabilitado, o custo é desprezível.
+
+Conversão para linha do tempo (chrome://tracing, Perfetto ou speedscope):
+    python rastreamento.py spans.jsonl linha_do_tempo.json
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+RASTREAMENTO_HABILITADO = os.getenv('RASTREAMENTO_HABILITADO', 'false').lower() == 'true'
+RASTREAMENTO_ARQUIVO = os.getenv(
+    'RASTREAMENTO_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spans.jsonl')
+)
+
+# Span ativo no contexto atual (propagado para threads com contextvars.copy_context)
+_span_atual = contextvars.ContextVar('span_atual', default=None)
+
+
+class ExportadorJSONL:
+    """Grava spans finalizados em um arquivo JSON lines"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def exportar(self, registro):
+        linha = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + '\n')
+
+
+class Span:
+    """Intervalo de tempo nomeado, filho do span ativo quando foi iniciado"""
+
+    def __init__(self, nome, atributos=None):
+        pai = _span_atual.get()
+        self.nome = nome
+        self.atributos = dict(atributos or {})
+        self.id = uuid.uuid4().hex[:16]
+        self.id_pai = pai.id if pai else None
+        self.id_rastro = pai.id_rastro if pai else uuid.uuid4().hex
+        self.inicio = time.time()
+        self._inicio_relogio = time.perf_counter()
+        self._token = _span_atual.set(self)
+        self._finalizado = False
+
+    def definir(self, **atributos):
+        """Acrescenta atributos ao span"""
+        self.atributos.update(atributos)
+
+    def finalizar(self, erro=None):
+        if self._finalizado:
+            return
+        self._finalizado = True
+        duracao = time.perf_counter() - self._inicio_relogio
+
+        # O token só pode ser restaurado no mesmo contexto em que foi criado
+        try:
+            _span_atual.reset(self._token)
+        except ValueError:
+            pass
+
+        registro = {
+            'rastro': self.id_rastro,
+            'span': self.id,
+            'pai': self.id_pai,
+            'nome': self.nome,
+            'inicio': self.inicio,
+            'duracao_ms': round(duracao * 1000, 3),
+            'thread': threading.current_thread().name,
+            'atributos': self.atributos,
+        }
+        if erro is not None:
+            registro['erro'] = f'{type(erro).__name__}: {erro}'
+        exportador.exportar(registro)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        self.finalizar(erro)
+        return False
+
+
+class _SpanInativo:
+    """Span que não faz nada (rastreamento desabilitado)"""
+
+    def definir(self, **atributos):
+        pass
+
+    def finalizar(self, erro=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_SPAN_INATIVO = _SpanInativo()
+exportador = ExportadorJSONL(RASTREAMENTO_ARQUIVO)
+
+
+def iniciar_span(nome, **atributos):
+    """
+    Inicia um span (use como context manager ou chame finalizar())
+
+    Args:
+        nome (str): Nome do span (ex.: 'fonte.historico')
+        **atributos: Atributos do span (ex.: ticker='HGLG11.SA')
+    """
+    if not RASTREAMENTO_HABILITADO:
+        return _SPAN_INATIVO
+    return Span(nome, atributos)
+
+
+def rastrear(nome=None):
+    """Decorador que envolve a função em um span"""
+    def decorador(funcao):
+        nome_span = nome or funcao.__qualname__
+
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with iniciar_span(nome_span):
+                return funcao(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+def converter_linha_do_tempo(entrada, saida):
+    """
+    Converte os spans JSON lines para o formato Trace Event (eventos completos 'X'),
+    aberto como linha do tempo/flamegraph em chrome://tracing, Perfetto ou speedscope
+
+    Returns:
+        int: Quantidade de spans convertidos
+    """
+    eventos = []
+    threads = {}
+    with open(entrada, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            if not linha.strip():
+                continue
+            span = json.loads(linha)
+            tid = threads.setdefault(span['thread'], len(threads) + 1)
+            eventos.append({
+                'name': span['nome'],
+                'cat': span['nome'].split('.')[0],
+                'ph': 'X',
+                'ts': span['inicio'] * 1_000_000,
+                'dur': span['duracao_ms'] * 1000,
+                'pid': 1,
+                'tid': tid,
+                'args': {'rastro': span['rastro'], **span['atributos'],
+                         **({'erro': span['erro']} if 'erro' in span else {})},
+            })
+
+    # Uma linha por thread, com spans filhos aninhados sob o pai
+    metadados = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': nome}}
+                 for nome, tid in threads.items()]
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump({'traceEvents': metadados + eventos, 'displayTimeUnit': 'ms'}, arquivo, ensure_ascii=False)
+    return len(eventos)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Converte spans JSON lines em linha do tempo (Trace Event)')
+    parser.add_argument('entrada', nargs='?', default=RASTREAMENTO_ARQUIVO, help='Arquivo de spans (.jsonl)')
+    parser.add_argument('saida', nargs='?', default='linha_do_tempo.json', help='Arquivo de saída (.json)')
+    args = parser.parse_args()
+
+    total = converter_linha_do_tempo(args.entrada, args.saida)
+    print(f"✅ {total} spans convertidos para {args.saida} (abra em https://ui.perfetto.dev ou chrome://tracing)")
@@ -0,0 +1,375 @@
+"""
+Regras de alerta declarativas avaliadas sobre o retrato colunar do ciclo
+Uma regra é uma expressão como
+
+    variacao >= 2 and pvp < 0.95 and setor == 'Logística'
+    setor in ('Shopping Centers', 'Lajes Corporativas') and not dy < 8
+
+compilada uma vez para uma árvore de comparações vetorizadas (numpy) e
+avaliada sobre todas as linhas do ciclo de uma só vez. Comparações repetidas
+entre regras são calculadas uma única vez por ciclo.
+
+Colunas numéricas: preco, variacao, dy, pvp, volume
+Colunas categóricas (== != in, not in): setor, tipo (de setores_fiis.py ou da fonte ativa), ticker
+
+Uma comparação com valor ausente (NaN, ex.: FII sem P/VP) é sempre falsa,
+também quando negada: `not dy < 8` vira `dy >= 8` na compilação.
+
+Cada regra também tem uma versão "mantida", com os limites afrouxados pelas
+bandas de histerese, usada para decidir quando um alerta ativo é rearmado.
+"""
+import ast
+import operator
+import threading
+
+import numpy as np
+
+import fontes_dados
+
+COLUNAS_NUMERICAS = ('preco', 'variacao', 'dy', 'pvp', 'volume')
+COLUNAS_CATEGORICAS = ('setor', 'tipo', 'ticker')
+
+_COMPARADORES = {
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+# Operador equivalente com os lados trocados (2 < variacao -> variacao > 2)
+_INVERSOS = {ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+# Operador complementar (not variacao > 2 -> variacao <= 2)
+_NEGADOS = {ast.Gt: ast.LtE, ast.GtE: ast.Lt, ast.Lt: ast.GtE, ast.LtE: ast.Gt, ast.Eq: ast.NotEq, ast.NotEq: ast.Eq}
+
+# Códigos das categorias (ex.: 'Logística' -> 3), estáveis durante o processo
+_categorias = {}
+_lock_categorias = threading.Lock()
+# ticker -> (código do setor, código do tipo, código do ticker)
+_codigos_tickers = {}
+
+
+def codigo_categoria(valor):
+    """Código inteiro de um valor categórico (novos valores ganham o próximo código)"""
+    codigo = _categorias.get(valor)
+    if codigo is None:
+        with _lock_categorias:
+            codigo = _categorias.setdefault(valor, len(_categorias))
+    return codigo
+
+
+def _codigos_do_ticker(ticker):
+    codigos = _codigos_tickers.get(ticker)
+    if codigos is None:
+        info = fontes_dados.setor_info(ticker)
+        codigos = (codigo_categoria(info['setor']), codigo_categoria(info['tipo']), codigo_categoria(ticker))
+        _codigos_tickers[ticker] = codigos
+    return codigos
+
+
+class ContextoColunar:
+    """Colunas somente leitura de um ciclo: numéricas (float) e categóricas (códigos inteiros)"""
+
+    def __init__(self, tickers, colunas):
+        """
+        Args:
+            tickers (tuple): Ticker de cada linha
+            colunas (dict): Nome -> ndarray alinhado com `tickers`
+        """
+        self.tickers = tuple(tickers)
+        self.colunas = colunas
+        for coluna in colunas.values():
+            coluna.setflags(write=False)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def tickers_das_linhas(self, linhas):
+        """Tickers das linhas, na ordem dada"""
+        return [self.tickers[linha] for linha in linhas.tolist()]
+
+    @classmethod
+    def do_quadro(cls, quadro, tickers):
+        """
+        Copia do quadro as linhas dos tickers (na ordem do quadro) e codifica setor e tipo
+
+        Args:
+            quadro (QuadroCotacoes): Quadro de cotações
+            tickers (list): Tickers do retrato
+
+        Returns:
+            ContextoColunar: Contexto do ciclo
+        """
+        linhas = np.sort(quadro.linhas(tickers))
+        presentes = quadro.tickers(linhas)
+        colunas = {c: quadro.coluna(c)[linhas] for c in COLUNAS_NUMERICAS}
+        codigos = np.array([_codigos_do_ticker(t) for t in presentes], dtype=np.int32).reshape(-1, 3)
+        for indice, coluna in enumerate(COLUNAS_CATEGORICAS):
+            colunas[coluna] = codigos[:, indice].copy()
+        return cls(presentes, colunas)
+
+
+def _normalizar_constante(coluna, valor):
+    """Constante de comparação: número para colunas numéricas, código para categóricas"""
+    if coluna in COLUNAS_NUMERICAS:
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise ValueError(f"❌ {coluna} só compara com números (recebeu {valor!r})")
+        return float(valor)
+    if not isinstance(valor, str):
+        raise ValueError(f"❌ {coluna} só compara com textos (recebeu {valor!r})")
+    if coluna == 'ticker':
+        valor = valor.upper() if valor.upper().endswith('.SA') else f'{valor.upper()}.SA'
+    return codigo_categoria(valor)
+
+
+def _constante(no):
+    if isinstance(no, ast.Constant):
+        return no.value
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.USub) and isinstance(no.operand, ast.Constant):
+        return -no.operand.value
+    raise ValueError(f"❌ Esperado um valor constante: {ast.unparse(no)}")
+
+
+def _comparacao(esquerda, op, direita):
+    """Folha ('cmp', coluna, operador, constante) de uma comparação simples"""
+    if isinstance(direita, ast.Name) and not isinstance(esquerda, ast.Name):
+        esquerda, direita = direita, esquerda
+        op = _INVERSOS.get(type(op), type(op))()
+    if not isinstance(esquerda, ast.Name):
+        raise ValueError(f"❌ Comparação sem coluna: {ast.unparse(esquerda)}")
+
+    coluna = esquerda.id
+    if coluna not in COLUNAS_NUMERICAS + COLUNAS_CATEGORICAS:
+        raise ValueError(f"❌ Coluna desconhecida: {coluna} "
+                         f"(use {', '.join(COLUNAS_NUMERICAS + COLUNAS_CATEGORICAS)})")
+
+    if isinstance(op, (ast.In, ast.NotIn)):
+        if coluna not in COLUNAS_CATEGORICAS or not isinstance(direita, (ast.Tuple, ast.List, ast.Set)):
+            raise ValueError(f"❌ 'in' exige coluna categórica e uma lista: {coluna}")
+        valores = tuple(sorted(_normalizar_constante(coluna, _constante(e)) for e in direita.elts))
+        folha = ('cmp', coluna, 'in', valores)
+        return _negar(folha) if isinstance(op, ast.NotIn) else folha
+
+    if type(op) not in _COMPARADORES:
+        raise ValueError(f"❌ Operador não suportado: {ast.dump(op)}")
+    if coluna in COLUNAS_CATEGORICAS and not isinstance(op, (ast.Eq, ast.NotEq)):
+        raise ValueError(f"❌ {coluna} aceita apenas ==, !=, in e not in")
+    return ('cmp', coluna, type(op), _normalizar_constante(coluna, _constante(direita)))
+
+
+def _negar(arvore):
+    """
+    Negação levada até as folhas (De Morgan): cada comparação vira a complementar,
+    que continua falsa para NaN. Só 'in' fica com um 'nao' (colunas categóricas não têm NaN)
+    """
+    tipo = arvore[0]
+    if tipo == 'nao':
+        return arvore[1]
+    if tipo in ('e', 'ou'):
+        return ('ou' if tipo == 'e' else 'e', tuple(_negar(filho) for filho in arvore[1]))
+    _, coluna, op, valor = arvore
+    if op == 'in':
+        return ('nao', arvore)
+    return ('cmp', coluna, _NEGADOS[op], valor)
+
+
+def _compilar(no):
+    """Árvore de avaliação a partir da AST (apenas o subconjunto seguro da linguagem)"""
+    if isinstance(no, ast.BoolOp):
+        return ('e' if isinstance(no.op, ast.And) else 'ou', tuple(_compilar(v) for v in no.values))
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.Not):
+        return _negar(_compilar(no.operand))
+    if isinstance(no, ast.Compare):
+        # Comparações encadeadas (0.8 <= pvp < 1) viram um "e"
+        termos = [no.left] + no.comparators
+        folhas = tuple(_comparacao(termos[i], op, termos[i + 1]) for i, op in enumerate(no.ops))
+        return folhas[0] if len(folhas) == 1 else ('e', folhas)
+    raise ValueError(f"❌ Expressão não suportada: {ast.unparse(no)}")
+
+
+def compilar_expressao(expressao):
+    """
+    Compila uma expressão de regra
+
+    Args:
+        expressao (str): Ex.: "variacao >= 2 and setor == 'Logística'"
+
+    Returns:
+        tuple: Árvore de avaliação
+
+    Raises:
+        ValueError: Se a expressão usar algo fora da linguagem de regras
+    """
+    try:
+        arvore = ast.parse(expressao.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"❌ Regra inválida '{expressao}': {e.msg}") from None
+    return _compilar(arvore.body)
+
+
+def _primeira_comparacao(arvore):
+    """Primeira comparação numérica da regra (define o campo e o sentido da ordenação)"""
+    if arvore[0] == 'cmp':
+        return arvore if arvore[1] in COLUNAS_NUMERICAS and arvore[2] != 'in' else None
+    filhos = (arvore[1],) if arvore[0] == 'nao' else arvore[1]
+    for filho in filhos:
+        encontrada = _primeira_comparacao(filho)
+        if encontrada:
+            return encontrada
+    return None
+
+
+class RegraAlerta:
+    """Regra nomeada e compilada"""
+
+    def __init__(self, nome, expressao):
+        """
+        Args:
+            nome (str): Nome da regra (tipo do alerta, ex.: 'alta')
+            expressao (str): Expressão na linguagem de regras
+        """
+        self.nome = nome
+        self.expressao = expressao
+        self.arvore = compilar_expressao(expressao)
+
+        # Alertas ordenados pelo campo da primeira comparação, mais extremos primeiro
+        primeira = _primeira_comparacao(self.arvore)
+        self.campo = primeira[1] if primeira else None
+        self.decrescente = primeira is not None and primeira[2] in (ast.Gt, ast.GtE)
+
+    def __repr__(self):
+        return f'RegraAlerta({self.nome!r}, {self.expressao!r})'
+
+
+def interpretar_regras(texto, reservados=()):
+    """
+    Lê regras no formato "nome: expressão; nome: expressão"
+
+    Args:
+        texto (str): Regras separadas por ';'
+        reservados (tuple): Nomes já usados por outros alertas (não podem ser repetidos)
+
+    Returns:
+        list: RegraAlerta compiladas
+
+    Raises:
+        ValueError: Regra sem nome, nome inválido, reservado ou repetido, ou expressão inválida
+    """
+    regras = []
+    for trecho in texto.split(';'):
+        if not trecho.strip():
+            continue
+        nome, separador, expressao = trecho.partition(':')
+        nome = nome.strip()
+        if not separador or not nome:
+            raise ValueError(f"❌ Regra sem nome (use 'nome: expressão'): {trecho.strip()}")
+        if not nome.isidentifier():
+            raise ValueError(f"❌ Nome de regra inválido (use letras, números e _): {nome}")
+        if nome in reservados or any(regra.nome == nome for regra in regras):
+            raise ValueError(f"❌ Nome de regra reservado ou repetido: {nome}")
+        regras.append(RegraAlerta(nome, expressao))
+    return regras
+
+
+class MotorRegras:
+    """
+    Avalia um conjunto de regras sobre um ContextoColunar
+
+    Na criação, cada regra é resolvida em duas árvores (exata e mantida) cujas
+    folhas já têm o limite final; na avaliação, cada comparação distinta é
+    calculada uma vez e as regras só combinam máscaras prontas.
+    """
+
+    def __init__(self, regras, histereses=None):
+        """
+        Args:
+            regras (list): RegraAlerta a avaliar
+            histereses (dict): Coluna -> banda de histerese para a versão "mantida" das regras
+        """
+        self.regras = list(regras)
+        nomes = [regra.nome for regra in self.regras]
+        repetidos = sorted({nome for nome in nomes if nomes.count(nome) > 1})
+        if repetidos:
+            # As máscaras e o estado dos alertas são indexados pelo nome da regra
+            raise ValueError(f"❌ Regras com o mesmo nome: {', '.join(repetidos)}")
+        self.histereses = histereses or {}
+        # folga -> [(nome, árvore resolvida)]: 0 = condição exata, 1 = mantida
+        self._planos = {
+            folga: [(regra.nome, self._resolver(regra.arvore, folga)) for regra in self.regras]
+            for folga in (0, 1)
+        }
+
+    def _resolver(self, arvore, folga):
+        """Troca cada folha por sua chave (coluna, operador, limite afrouxado pela histerese)"""
+        tipo = arvore[0]
+        if tipo == 'nao':
+            # Afrouxar uma negação é apertar o que está dentro dela
+            return ('nao', self._resolver(arvore[1], -folga))
+        if tipo != 'cmp':
+            return (tipo, tuple(self._resolver(filho, folga) for filho in arvore[1]))
+
+        _, coluna, op, valor = arvore
+        if folga and coluna in COLUNAS_NUMERICAS and op in (ast.Gt, ast.GtE, ast.Lt, ast.LtE):
+            banda = self.histereses.get(coluna, 0.0) * folga
+            valor = valor - banda if op in (ast.Gt, ast.GtE) else valor + banda
+        return ('cmp', (coluna, op, valor))
+
+    @staticmethod
+    def _comparar(contexto, chave):
+        coluna, op, valor = chave
+        dados = contexto.colunas[coluna]
+        if op == 'in':
+            return np.isin(dados, valor)
+        mascara = _COMPARADORES[op](dados, valor)
+        if coluna in COLUNAS_NUMERICAS and op is ast.NotEq:
+            mascara &= ~np.isnan(dados)
+        return mascara
+
+    def _combinar(self, contexto, arvore, cache):
+        tipo = arvore[0]
+        if tipo == 'cmp':
+            mascara = cache.get(arvore[1])
+            if mascara is None:
+                mascara = cache[arvore[1]] = self._comparar(contexto, arvore[1])
+            return mascara
+        if tipo == 'nao':
+            return ~self._combinar(contexto, arvore[1], cache)
+        # Operadores que criam arrays novos: as máscaras do cache não podem ser alteradas
+        juntar = operator.and_ if tipo == 'e' else operator.or_
+        resultado = self._combinar(contexto, arvore[1][0], cache)
+        for filho in arvore[1][1:]:
+            resultado = juntar(resultado, self._combinar(contexto, filho, cache))
+        return resultado
+
+    def mascaras(self, contexto, folga=0, cache=None):
+        """
+        Máscaras booleanas de todas as regras (comparações repetidas são calculadas uma vez)
+
+        Args:
+            contexto (ContextoColunar): Colunas do ciclo
+            folga (int): 0 = condição exata; 1 = versão mantida (limites afrouxados pela histerese)
+            cache (dict): Comparações já calculadas sobre o mesmo contexto
+
+        Returns:
+            dict: Nome da regra -> ndarray booleano alinhado com contexto.tickers
+        """
+        cache = {} if cache is None else cache
+        with np.errstate(invalid='ignore'):
+            return {nome: self._combinar(contexto, arvore, cache) for nome, arvore in self._planos[folga]}
+
+    def avaliar(self, contexto):
+        """
+        Linhas que disparam cada regra (ordenadas, mais extremas primeiro) e as que ainda a mantêm
+
+        Returns:
+            dict: Nome da regra -> (ndarray de linhas disparadas, máscara "mantida")
+        """
+        # As comparações sem histerese (setor, colunas sem banda) são reaproveitadas na versão mantida
+        cache = {}
+        disparadas = self.mascaras(contexto, cache=cache)
+        mantidas = self.mascaras(contexto, folga=1, cache=cache) if self.histereses else disparadas
+
+        resultado = {}
+        for regra in self.regras:
+            linhas = disparadas[regra.nome].nonzero()[0]
+            if regra.campo and len(linhas) > 1:
+                chaves = contexto.colunas[regra.campo][linhas]
+                linhas = linhas[np.argsort(-chaves if regra.decrescente else chaves, kind='stable')]
+            resultado[regra.nome] = (linhas, mantidas[regra.nome])
+        return resultado
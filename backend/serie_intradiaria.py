@@ -0,0 +1,504 @@
+"""
+Série intradiária das cotações coletadas pelo monitor
+A cada ciclo, as cotações atualizadas no quadro são acrescentadas ao arquivo do
+pregão, em formato colunar: uma pasta por dia (SERIE_DIR/AAAA-MM-DD) com um
+arquivo binário por coluna, que só cresce no fim, e a lista de tickers do dia
+(o código de cada ponto é a linha do ticker em tickers.txt).
+
+As consultas (variação numa janela, aceleração, média móvel, sparklines) são
+operações vetorizadas sobre essas colunas, sem buscar histórico nas fontes
+externas. A API lê os mesmos arquivos gravados pelo monitor.
+"""
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from dotenv import load_dotenv
+
+from calendario_pregao import FUSO_B3
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+SERIE_HABILITADA = os.getenv('SERIE_HABILITADA', 'true').lower() == 'true'
+SERIE_DIR = os.getenv('SERIE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'series'))
+# Dias de pregão mantidos em disco (os mais antigos são apagados na virada do dia)
+SERIE_RETENCAO_DIAS = int(os.getenv('SERIE_RETENCAO_DIAS', '30'))
+# Quanto (segundos) o ponto inicial de uma janela pode ser mais antigo que o início dela:
+# com o rodízio, um ticker fora da fatia pode estar sem cotação há horas
+SERIE_TOLERANCIA_JANELA = float(os.getenv('SERIE_TOLERANCIA_JANELA', '900'))
+
+# Colunas gravadas por ponto (nome, tipo numpy little-endian): 34 bytes por cotação
+COLUNAS_SERIE = (
+    ('momento', '<f8'),    # Horário da cotação (epoch)
+    ('codigo', '<u2'),     # Linha do ticker em tickers.txt
+    ('preco', '<f4'),
+    ('variacao', '<f4'),
+    ('dy', '<f4'),
+    ('pvp', '<f4'),
+    ('volume', '<f8'),
+)
+COLUNAS_CONSULTA = tuple(nome for nome, _ in COLUNAS_SERIE if nome not in ('momento', 'codigo'))
+
+ARQUIVO_TICKERS = 'tickers.txt'
+PADRAO_DIA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Dias mantidos em memória pela consulta (o de hoje e alguns anteriores)
+DIAS_EM_MEMORIA = 4
+
+# Pontos ordenados por (código, momento) e chave composta para as buscas "até o instante t"
+_Ordenacao = namedtuple('_Ordenacao', 'colunas ordem codigos chave base faixa inicios fins')
+
+
+def dia_de(momento):
+    """Dia de pregão (fuso da B3) de um horário epoch"""
+    return datetime.fromtimestamp(momento, FUSO_B3).date()
+
+
+def _arquivo(pasta, coluna):
+    return os.path.join(pasta, f'{coluna}.bin')
+
+
+def _ler_tickers(pasta):
+    try:
+        with open(os.path.join(pasta, ARQUIVO_TICKERS), encoding='utf-8') as arquivo:
+            return [linha.strip() for linha in arquivo if linha.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _linhas_completas(pasta):
+    """Pontos gravados por inteiro em todas as colunas (um acréscimo interrompido fica de fora)"""
+    linhas = []
+    for nome, tipo in COLUNAS_SERIE:
+        caminho = _arquivo(pasta, nome)
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        linhas.append(tamanho // np.dtype(tipo).itemsize)
+    return min(linhas)
+
+
+class DiaIntradiario:
+    """
+    Pontos de um dia em colunas numpy, com as consultas da série
+
+    Os pontos ficam na ordem de gravação; para as consultas por ticker e
+    horário é mantida uma ordenação (código, momento) e uma chave composta
+    em que cada ticker ocupa uma faixa própria, de modo que "última cotação
+    até o instante t" de vários tickers é um único searchsorted.
+    """
+
+    def __init__(self, pasta, dia):
+        """
+        Args:
+            pasta (str): Pasta do dia (SERIE_DIR/AAAA-MM-DD)
+            dia (date): Dia de pregão
+        """
+        self.pasta = pasta
+        self.dia = dia
+        self.tickers = []
+        self._indice = {}
+        self.colunas = {nome: np.empty(0, dtype=tipo) for nome, tipo in COLUNAS_SERIE}
+        self._ordem = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.colunas['momento'])
+
+    def recarregar(self):
+        """
+        Lê do disco só os pontos acrescentados desde a última leitura
+
+        Returns:
+            int: Quantidade de pontos novos
+        """
+        with self._lock:
+            total = _linhas_completas(self.pasta)
+            atuais = len(self)
+            if total <= atuais:
+                return 0
+
+            # Colunas novas (não alteradas no lugar): uma consulta em andamento segue com as antigas
+            colunas = {}
+            for nome, tipo in COLUNAS_SERIE:
+                tamanho = np.dtype(tipo).itemsize
+                with open(_arquivo(self.pasta, nome), 'rb') as arquivo:
+                    arquivo.seek(atuais * tamanho)
+                    novos = np.frombuffer(arquivo.read((total - atuais) * tamanho), dtype=tipo)
+                colunas[nome] = np.concatenate([self.colunas[nome], novos])
+
+            if int(colunas['codigo'][atuais:].max()) >= len(self.tickers):
+                self.tickers = _ler_tickers(self.pasta)
+                self._indice = {ticker: codigo for codigo, ticker in enumerate(self.tickers)}
+            self.colunas = colunas
+            self._ordem = None
+            return total - atuais
+
+    def _ordenacao(self):
+        """_Ordenacao dos pontos carregados (recalculada quando chegam pontos novos)"""
+        if self._ordem is None:
+            colunas = self.colunas
+            momento, codigo = colunas['momento'], colunas['codigo']
+            ordem = np.lexsort((momento, codigo))
+            codigos = codigo[ordem].astype(np.int64)
+            base = float(momento.min()) if len(momento) else 0.0
+            # Cada ticker ocupa [código * faixa, código * faixa + faixa) na chave
+            faixa = float(momento.max()) - base + 2.0 if len(momento) else 2.0
+            chave = codigos * faixa + (momento[ordem] - base)
+            grupos = np.arange(len(self.tickers))
+            self._ordem = _Ordenacao(colunas, ordem, codigos, chave, base, faixa,
+                                     np.searchsorted(codigos, grupos, 'left'),
+                                     np.searchsorted(codigos, grupos, 'right'))
+        return self._ordem
+
+    def codigos(self, tickers=None):
+        """
+        Returns:
+            tuple: (tickers presentes no dia, códigos)
+        """
+        if tickers is None:
+            return list(self.tickers), np.arange(len(self.tickers))
+        presentes = [t for t in tickers if t in self._indice]
+        return presentes, np.fromiter((self._indice[t] for t in presentes), dtype=np.int64, count=len(presentes))
+
+    def _ate(self, codigos, instantes):
+        """
+        Posição (na ordenação) da última cotação de cada código até cada instante
+
+        Args:
+            codigos (ndarray): Códigos dos tickers
+            instantes (ndarray): Horários epoch (com broadcasting contra os códigos)
+
+        Returns:
+            ndarray: Posições, com -1 onde o ticker ainda não tinha cotação
+        """
+        ordenacao = self._ordenacao()
+        deslocamento = np.clip(np.asarray(instantes, dtype=float) - ordenacao.base, -0.5, ordenacao.faixa - 1.0)
+        posicoes = np.searchsorted(ordenacao.chave, codigos * ordenacao.faixa + deslocamento, side='right') - 1
+        # Antes do primeiro ponto do ticker a busca cai na faixa do código anterior
+        invalidas = (posicoes < 0) | (ordenacao.codigos[np.maximum(posicoes, 0)] != codigos)
+        return np.where(invalidas, -1, posicoes)
+
+    def _valores(self, posicoes, coluna):
+        """Valores da coluna nas posições da ordenação (NaN onde a posição é -1)"""
+        ordenacao = self._ordenacao()
+        valores = ordenacao.colunas[coluna][ordenacao.ordem[np.maximum(posicoes, 0)]].astype(float)
+        valores[posicoes < 0] = np.nan
+        return valores
+
+    def ultimo_momento(self):
+        """Horário (epoch) do ponto mais recente, ou None se o dia está vazio"""
+        return float(self.colunas['momento'].max()) if len(self) else None
+
+    def serie(self, ticker, coluna='preco'):
+        """
+        Returns:
+            tuple: (momentos, valores) das cotações do ticker, em ordem de horário
+        """
+        if ticker not in self._indice:
+            return np.empty(0), np.empty(0)
+        ordenacao = self._ordenacao()
+        codigo = self._indice[ticker]
+        linhas = ordenacao.ordem[ordenacao.inicios[codigo]:ordenacao.fins[codigo]]
+        return ordenacao.colunas['momento'][linhas], ordenacao.colunas[coluna][linhas].astype(float)
+
+    def amostrar(self, instantes, tickers=None, coluna='preco'):
+        """
+        Última cotação de cada ticker até cada instante (amostragem "as of")
+
+        Args:
+            instantes (list): Horários epoch
+            tickers (list): Tickers (None = todos do dia)
+            coluna (str): Coluna amostrada (preco, variacao, dy, pvp, volume)
+
+        Returns:
+            tuple: (tickers presentes, matriz tickers x instantes com NaN antes do primeiro ponto)
+        """
+        if coluna not in COLUNAS_CONSULTA:
+            raise ValueError(f"❌ Coluna inválida: {coluna}")
+        tickers, codigos = self.codigos(tickers)
+        instantes = np.atleast_1d(np.asarray(instantes, dtype=float))
+        if not len(codigos) or not len(self):
+            return tickers, np.full((len(codigos), len(instantes)), np.nan)
+        return tickers, self._valores(self._ate(codigos[:, None], instantes[None, :]), coluna)
+
+    def variacoes(self, janela=None, agora=None, tickers=None, coluna='preco', tolerancia=SERIE_TOLERANCIA_JANELA):
+        """
+        Variação (%) de cada ticker numa janela terminando em `agora`
+
+        O ponto inicial é a última cotação até o início da janela; se ela for
+        mais antiga que `tolerancia` antes do início, a variação fica NaN (seria
+        um movimento de um período maior que a janela). Um ticker que só
+        apareceu no meio da janela é comparado com o seu primeiro ponto do dia.
+
+        Args:
+            janela (float): Segundos (None = desde o primeiro ponto do dia)
+            agora (float): Fim da janela (padrão: ponto mais recente do dia)
+            tickers (list): Tickers (None = todos do dia)
+            coluna (str): Coluna comparada
+            tolerancia (float): Segundos que o ponto inicial pode anteceder a janela (None = sem limite)
+
+        Returns:
+            dict: 'tickers', 'inicial', 'final', 'variacao' (%), 'pontos' (cotações na janela) e
+                  'desde'/'ate' (horários dos pontos comparados), em arrays
+        """
+        tickers, codigos = self.codigos(tickers)
+        vazio = np.empty(0)
+        if not len(codigos) or not len(self):
+            return {'tickers': [], 'inicial': vazio, 'final': vazio, 'variacao': vazio,
+                    'pontos': np.empty(0, dtype=np.int64), 'desde': vazio, 'ate': vazio}
+
+        agora = self.ultimo_momento() if agora is None else agora
+        inicios = self._ordenacao().inicios
+        finais = self._ate(codigos, agora)
+        if janela is None:
+            iniciais = inicios[codigos].astype(np.int64)
+        else:
+            iniciais = self._ate(codigos, agora - janela)
+            iniciais = np.where(iniciais < 0, inicios[codigos], iniciais)
+        iniciais = np.where(finais < 0, -1, iniciais)
+
+        desde, ate = self._valores(iniciais, 'momento'), self._valores(finais, 'momento')
+        if janela is not None and tolerancia is not None:
+            with np.errstate(invalid='ignore'):
+                antigas = desde < agora - janela - tolerancia
+            iniciais = np.where(antigas, -1, iniciais)
+            desde[antigas] = np.nan
+
+        inicial, final = self._valores(iniciais, coluna), self._valores(finais, coluna)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variacao = (final / inicial - 1.0) * 100.0
+        return {
+            'tickers': tickers,
+            'inicial': inicial,
+            'final': final,
+            'variacao': variacao,
+            'pontos': np.where((finais < 0) | (iniciais < 0), 0, finais - iniciais + 1),
+            'desde': desde,
+            'ate': ate,
+        }
+
+    def aceleracao(self, janela, agora=None, tickers=None, tolerancia=SERIE_TOLERANCIA_JANELA):
+        """
+        Variação (%) na última janela e na janela anterior, de mesmo tamanho
+
+        Returns:
+            dict: 'tickers', 'recente', 'anterior', 'aceleracao' (recente - anterior),
+                  'pontos' (cotações na janela recente) e 'desde'/'ate' da janela recente, em arrays
+        """
+        agora = self.ultimo_momento() if agora is None else agora
+        recente = self.variacoes(janela, agora, tickers, tolerancia=tolerancia)
+        anterior = self.variacoes(janela, agora - janela, recente['tickers'], tolerancia=tolerancia)
+        # Sem cotação no início da janela anterior não há com o que comparar
+        _, matriz = self.amostrar([agora - 2 * janela], recente['tickers'])
+        variacao_anterior = np.where(np.isnan(matriz[:, 0]), np.nan, anterior['variacao'])
+        return {
+            'tickers': recente['tickers'],
+            'recente': recente['variacao'],
+            'anterior': variacao_anterior,
+            'aceleracao': recente['variacao'] - variacao_anterior,
+            'pontos': recente['pontos'],
+            'desde': recente['desde'],
+            'ate': recente['ate'],
+        }
+
+    def maiores_movimentos(self, janela=None, n=10, agora=None, minimo_pontos=2, tolerancia=SERIE_TOLERANCIA_JANELA):
+        """
+        Maiores altas e baixas numa janela ("o que mais se mexeu na última hora")
+
+        Returns:
+            tuple: (altas, baixas) como listas de dicts {'ticker', 'preco', 'preco_inicial',
+                   'variacao_janela', 'minutos' (intervalo real entre os pontos), 'pontos'},
+                   mais extremos primeiro
+        """
+        resultado = self.variacoes(janela, agora, tolerancia=tolerancia)
+        variacao = resultado['variacao']
+        validas = ~np.isnan(variacao) & (resultado['pontos'] >= minimo_pontos)
+
+        def registros(linhas):
+            return [{
+                'ticker': resultado['tickers'][linha],
+                'preco': round(float(resultado['final'][linha]), 4),
+                'preco_inicial': round(float(resultado['inicial'][linha]), 4),
+                'variacao_janela': round(float(variacao[linha]), 4),
+                'minutos': round(float(resultado['ate'][linha] - resultado['desde'][linha]) / 60, 1),
+                'pontos': int(resultado['pontos'][linha]),
+            } for linha in linhas.tolist()]
+
+        altas = np.flatnonzero(validas & (variacao > 0))
+        baixas = np.flatnonzero(validas & (variacao < 0))
+        altas = altas[np.argsort(-variacao[altas], kind='stable')][:n]
+        baixas = baixas[np.argsort(variacao[baixas], kind='stable')][:n]
+        return registros(altas), registros(baixas)
+
+    def media_movel(self, ticker, janela, coluna='preco'):
+        """
+        Média móvel por tempo: em cada ponto, a média das cotações dos últimos `janela` segundos
+
+        Returns:
+            tuple: (momentos, médias)
+        """
+        momentos, valores = self.serie(ticker, coluna)
+        if not len(momentos):
+            return momentos, valores
+        acumulado = np.concatenate([[0.0], np.cumsum(np.nan_to_num(valores))])
+        contagem = np.concatenate([[0], np.cumsum(~np.isnan(valores))])
+        inicios = np.searchsorted(momentos, momentos - janela, side='left')
+        fins = np.arange(1, len(momentos) + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            medias = (acumulado[fins] - acumulado[inicios]) / (contagem[fins] - contagem[inicios])
+        return momentos, medias
+
+    def sparklines(self, tickers=None, pontos=24, inicio=None, fim=None, coluna='preco'):
+        """
+        Séries curtas, em intervalos iguais, para minigráficos por ticker
+
+        Args:
+            tickers (list): Tickers (None = todos do dia)
+            pontos (int): Amostras por ticker
+            inicio (float): Primeiro instante (padrão: primeiro ponto do dia)
+            fim (float): Último instante (padrão: ponto mais recente do dia)
+
+        Returns:
+            dict: Ticker -> lista de valores (None antes da primeira cotação do ticker)
+        """
+        if not len(self):
+            return {}
+        inicio = float(self.colunas['momento'].min()) if inicio is None else inicio
+        fim = self.ultimo_momento() if fim is None else fim
+        tickers, matriz = self.amostrar(np.linspace(inicio, fim, max(2, pontos)), tickers, coluna)
+        matriz = np.round(matriz, 4)
+        return {
+            ticker: [None if valor != valor else valor for valor in linha]
+            for ticker, linha in zip(tickers, matriz.tolist())
+        }
+
+
+class SerieIntradiaria:
+    """Grava os pontos de cada ciclo e abre os dias para consulta"""
+
+    def __init__(self, diretorio=SERIE_DIR, retencao_dias=SERIE_RETENCAO_DIAS, habilitada=SERIE_HABILITADA):
+        """
+        Args:
+            diretorio (str): Pasta com uma subpasta por dia
+            retencao_dias (int): Dias mantidos em disco (0 = sem limpeza)
+            habilitada (bool): False para não gravar nada
+        """
+        self.diretorio = diretorio
+        self.retencao_dias = retencao_dias
+        self.habilitada = habilitada
+        self._gravando = None      # (dia, ticker -> código) do dia aberto para escrita
+        self._dias = OrderedDict()  # dia -> DiaIntradiario (consulta)
+        self._lock = threading.Lock()
+
+    def _pasta(self, dia):
+        return os.path.join(self.diretorio, dia.isoformat())
+
+    def _abrir_para_escrita(self, dia):
+        """Prepara a pasta do dia: corta um acréscimo interrompido e carrega os códigos"""
+        pasta = self._pasta(dia)
+        os.makedirs(pasta, exist_ok=True)
+        completas = _linhas_completas(pasta)
+        for nome, tipo in COLUNAS_SERIE:
+            caminho = _arquivo(pasta, nome)
+            if os.path.exists(caminho) and os.path.getsize(caminho) > completas * np.dtype(tipo).itemsize:
+                with open(caminho, 'r+b') as arquivo:
+                    arquivo.truncate(completas * np.dtype(tipo).itemsize)
+        self._gravando = (dia, {ticker: codigo for codigo, ticker in enumerate(_ler_tickers(pasta))})
+        self.limpar_antigos(dia)
+
+    def registrar(self, quadro, tickers, momento=None):
+        """
+        Acrescenta ao arquivo do dia a cotação atual dos tickers no quadro
+
+        Args:
+            quadro (QuadroCotacoes): Quadro com as cotações do ciclo
+            tickers (list): Tickers atualizados no ciclo
+            momento (float): Horário do ciclo, que define o dia (padrão: time.time())
+
+        Returns:
+            int: Pontos gravados
+        """
+        if not self.habilitada:
+            return 0
+        linhas = quadro.linhas(tickers)
+        if not len(linhas):
+            return 0
+
+        dia = dia_de(momento or time.time())
+        with self._lock:
+            try:
+                if self._gravando is None or self._gravando[0] != dia:
+                    self._abrir_para_escrita(dia)
+                pasta = self._pasta(dia)
+                codigos = self._gravando[1]
+
+                # Tickers novos entram em tickers.txt antes dos pontos que os usam
+                novos = [t for t in dict.fromkeys(quadro.tickers(linhas)) if t not in codigos]
+                if novos:
+                    with open(os.path.join(pasta, ARQUIVO_TICKERS), 'a', encoding='utf-8') as arquivo:
+                        for ticker in novos:
+                            codigos[ticker] = len(codigos)
+                            arquivo.write(f'{ticker}\n')
+
+                valores = {coluna: quadro.coluna(coluna)[linhas] for coluna in COLUNAS_CONSULTA}
+                valores['momento'] = quadro.coluna('atualizado_em')[linhas]
+                valores['codigo'] = [codigos[t] for t in quadro.tickers(linhas)]
+                for nome, tipo in COLUNAS_SERIE:
+                    with open(_arquivo(pasta, nome), 'ab') as arquivo:
+                        np.asarray(valores[nome], dtype=tipo).tofile(arquivo)
+            except OSError as e:
+                print(f"⚠️  Erro ao gravar a série intradiária: {str(e)}")
+                return 0
+        return len(linhas)
+
+    def dias(self):
+        """Dias com série gravada, do mais antigo ao mais recente"""
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return []
+        return [date.fromisoformat(nome) for nome in sorted(nomes) if PADRAO_DIA.match(nome)]
+
+    def dia(self, dia=None):
+        """
+        Abre um dia para consulta (lendo só o que foi acrescentado desde a última vez)
+
+        Args:
+            dia (date): Dia de pregão (padrão: hoje, no fuso da B3)
+
+        Returns:
+            DiaIntradiario: Pontos do dia (vazio se não houver série)
+        """
+        dia = dia or dia_de(time.time())
+        with self._lock:
+            consulta = self._dias.pop(dia, None) or DiaIntradiario(self._pasta(dia), dia)
+            self._dias[dia] = consulta
+            while len(self._dias) > DIAS_EM_MEMORIA:
+                self._dias.popitem(last=False)
+        consulta.recarregar()
+        return consulta
+
+    def limpar_antigos(self, hoje=None):
+        """
+        Apaga as pastas de dias além da retenção
+
+        Returns:
+            int: Dias apagados
+        """
+        if self.retencao_dias <= 0:
+            return 0
+        limite = (hoje or dia_de(time.time())) - timedelta(days=self.retencao_dias)
+        apagados = 0
+        for dia in self.dias():
+            if dia < limite:
+                shutil.rmtree(self._pasta(dia), ignore_errors=True)
+                self._dias.pop(dia, None)
+                apagados += 1
+        if apagados:
+            print(f"🧹 Série intradiária: {apagados} dia(s) antigos apagados")
+        return apagados
@@ -203,13 +203,19 @@ CARACTERISTICAS_SETORES = {
     }
 }
 
-def get_setor_info(ticker):
-    """Retorna informações do setor de um FII"""
+def get_setor_info(ticker, padrao=None):
+    """
+    Retorna informações do setor de um FII
+
+    Args:
+        ticker (str): Código do FII
+        padrao (dict): Setor/tipo usados se o ticker não estiver em SETORES_FIIS
+    """
     ticker_clean = ticker.replace('.SA', '')
-    info = SETORES_FIIS.get(ticker_clean, {
+    info = SETORES_FIIS.get(ticker_clean) or padrao or {
         'setor': 'Desconhecido',
         'tipo': 'N/A'
-    })
+    }
     
     setor = info['setor']
     caracteristicas = CARACTERISTICAS_SETORES.get(setor, {
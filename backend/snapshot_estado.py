@@ -0,0 +1,206 @@
+"""
+Snapshot em disco do estado de dados de mercado mantido em memória
+A API e o monitor do Telegram salvam periodicamente (e ao encerrar) o que já
+buscaram num arquivo compacto (pickle + gzip) e o restauram ao iniciar, para
+que um reinício durante o pregão não dispare uma rajada de chamadas ao Yahoo.
+
+Cada entrada restaurada mantém sua validade original: o que expirou enquanto
+o processo estava parado é descartado e buscado de novo normalmente.
+"""
+import atexit
+import gzip
+import os
+import pickle
+import signal
+import socket
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+SNAPSHOT_HABILITADO = os.getenv('SNAPSHOT_HABILITADO', 'true').lower() == 'true'
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+# Intervalo (segundos) entre salvamentos periódicos
+SNAPSHOT_INTERVALO = float(os.getenv('SNAPSHOT_INTERVALO', '300'))
+# Snapshots mais antigos que isso (segundos) são ignorados no boot
+SNAPSHOT_IDADE_MAXIMA = float(os.getenv('SNAPSHOT_IDADE_MAXIMA', str(12 * 60 * 60)))
+
+VERSAO_SNAPSHOT = 2
+
+
+class SnapshotEstado:
+    """Salva e restaura o estado de componentes registrados (caches, armazém...)"""
+
+    def __init__(self, nome, diretorio=SNAPSHOT_DIR):
+        """
+        Args:
+            nome (str): Nome do processo (ex.: 'api', 'monitor'), usado no arquivo
+            diretorio (str): Pasta onde o snapshot é gravado
+        """
+        self.nome = nome
+        self.caminho = os.path.join(diretorio, f'{nome}.pkl.gz')
+        self.metadados = None  # Informações do último snapshot restaurado
+        self._componentes = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._iniciado = False
+        self._trava = None  # Arquivo travado pelo processo que grava (escritor_unico)
+
+    def registrar(self, componente, exportar, importar):
+        """
+        Registra um componente cujo estado entra no snapshot
+
+        Args:
+            componente (str): Nome do componente (ex.: 'armazem')
+            exportar (callable): Retorna o estado atual (ou None se não houver o que salvar)
+            importar (callable): Recebe o estado salvo e retorna quantos itens restaurou
+        """
+        self._componentes[componente] = (exportar, importar)
+
+    def salvar(self):
+        """
+        Grava o snapshot de forma atômica (arquivo temporário + rename)
+
+        Returns:
+            str: Caminho do arquivo ou None se falhar
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            try:
+                estado = {}
+                for componente, (exportar, _) in self._componentes.items():
+                    valor = exportar()
+                    if valor is not None:
+                        estado[componente] = valor
+
+                documento = {
+                    'versao': VERSAO_SNAPSHOT,
+                    'processo': self.nome,
+                    'host': socket.gethostname(),
+                    'pid': os.getpid(),
+                    'criado_em': time.time(),
+                    'componentes': estado,
+                }
+
+                os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+                temporario = f'{self.caminho}.{os.getpid()}.tmp'
+                with gzip.open(temporario, 'wb', compresslevel=3) as arquivo:
+                    pickle.dump(documento, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporario, self.caminho)
+            except Exception as e:
+                print(f"⚠️  Erro ao salvar snapshot {self.nome}: {str(e)}")
+                return None
+
+            tamanho = os.path.getsize(self.caminho) / 1024
+            print(f"💾 Snapshot {self.nome} salvo ({tamanho:.0f} KB, "
+                  f"{(time.perf_counter() - inicio) * 1000:.0f} ms)")
+            return self.caminho
+
+    def carregar(self):
+        """
+        Restaura o snapshot salvo, se existir e não for antigo demais
+
+        Returns:
+            dict: Metadados do snapshot restaurado (idade, itens por componente) ou None
+        """
+        try:
+            with gzip.open(self.caminho, 'rb') as arquivo:
+                documento = pickle.load(arquivo)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Snapshot {self.nome} ilegível, ignorado: {str(e)}")
+            return None
+
+        idade = time.time() - documento.get('criado_em', 0)
+        if documento.get('versao') != VERSAO_SNAPSHOT or idade > SNAPSHOT_IDADE_MAXIMA:
+            print(f"⚠️  Snapshot {self.nome} ignorado (versão {documento.get('versao')}, "
+                  f"idade {idade / 60:.0f} min)")
+            return None
+
+        itens = {}
+        for componente, estado in documento['componentes'].items():
+            if componente not in self._componentes:
+                continue
+            try:
+                itens[componente] = self._componentes[componente][1](estado)
+            except Exception as e:
+                print(f"⚠️  Erro ao restaurar {componente} do snapshot: {str(e)}")
+
+        self.metadados = {
+            'criado_em': datetime.fromtimestamp(documento['criado_em']).isoformat(),
+            'idade_segundos': round(idade, 1),
+            'restaurado_em': datetime.now().isoformat(),
+            'itens': itens,
+        }
+        resumo = ', '.join(f'{componente}: {total}' for componente, total in itens.items())
+        print(f"♻️  Snapshot {self.nome} restaurado (salvo há {idade:.0f}s) - {resumo}")
+        return self.metadados
+
+    def _salvar_periodicamente(self, intervalo):
+        while not self._parar.wait(intervalo):
+            self.salvar()
+
+    @staticmethod
+    def _sinal_termino(sinal, quadro):
+        raise SystemExit(0)
+
+    def _encerrar(self):
+        self._parar.set()
+        self.salvar()
+
+    def _obter_trava(self):
+        """Tenta travar o arquivo de escrita (só um processo por snapshot o consegue)"""
+        try:
+            import fcntl
+        except ImportError:
+            # Windows: sem flock (e sem gunicorn); cada processo grava o próprio snapshot
+            print(f"⚠️  Trava de escritor único indisponível nesta plataforma: snapshot {self.nome} gravado sem trava")
+            return True
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        trava = open(f'{self.caminho}.lock', 'w')
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            trava.close()
+            return False
+        self._trava = trava  # Liberada pelo sistema quando o processo termina
+        return True
+
+    def iniciar(self, intervalo=SNAPSHOT_INTERVALO, escritor_unico=False):
+        """
+        Restaura o snapshot e passa a salvá-lo a cada `intervalo` segundos e ao encerrar
+
+        Args:
+            intervalo (float): Segundos entre gravações (0 grava só ao encerrar)
+            escritor_unico (bool): Vários processos com o mesmo snapshot (ex.: workers
+                do gunicorn): todos restauram, mas só o que travar o arquivo grava
+
+        Returns:
+            dict: Metadados do snapshot restaurado ou None
+        """
+        if not SNAPSHOT_HABILITADO or self._iniciado:
+            return None
+        self._iniciado = True
+
+        metadados = self.carregar()
+        if escritor_unico and not self._obter_trava():
+            print(f"💾 Snapshot {self.nome} gravado por outro processo (pid {os.getpid()} só restaura)")
+            return metadados
+        atexit.register(self._encerrar)
+
+        # SIGTERM (kill, systemd, docker stop) encerra sem rodar o atexit; converte
+        # em SystemExit, a menos que outro código (ex.: gunicorn) já trate o sinal
+        if (threading.current_thread() is threading.main_thread()
+                and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL):
+            signal.signal(signal.SIGTERM, self._sinal_termino)
+
+        if intervalo > 0:
+            threading.Thread(target=self._salvar_periodicamente, args=(intervalo,),
+                             daemon=True, name=f'snapshot-{self.nome}').start()
+        return metadados
+
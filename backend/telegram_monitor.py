@@ -2,18 +2,33 @@
 Script de monitoramento de FIIs com notificações no Telegram
 Executa análises periódicas e envia alertas sobre variações significativas
 """
-import yfinance as yf
-import schedule
+import asyncio
+import threading
 import time
-from datetime import datetime, time as dt_time
-from telegram_notifier import TelegramNotifier, run_async
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, time as dt_time
+from types import MappingProxyType
+import numpy as np
+from telegram_notifier import notificador_compartilhado, fila_compartilhada, run_async
+import fontes_dados
+from rastreamento import rastrear
+from metricas import (monitor_ciclo_duracao, monitor_coletas, monitor_alertas, monitor_universo,
+                      monitor_universo_idade, monitor_serie_pontos)
+from snapshot_estado import SnapshotEstado
+from quadro_cotacoes import QuadroCotacoes
+from estado_alertas import EstadoAlertas, ACIMA, ABAIXO, NOVO, REPETIDO
+from calendario_pregao import CalendarioB3, AgendadorPregao
+from universo_fiis import carregar_universo, RodizioUniverso, UNIVERSO_ATUALIZACAO_HORAS
+from assinantes import RegistroAssinantes, OPERADORES
+from regras_alerta import RegraAlerta, MotorRegras, ContextoColunar, interpretar_regras
+from serie_intradiaria import SerieIntradiaria
 import os
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Lista de FIIs para monitorar (mesma lista do app.py)
+# Lista padrão de FIIs (mesma lista do app.py), sempre incluída no universo
 FIIS_POPULARES = [
     'MXRF11.SA', 'MCRE11.SA', 'VGHF11.SA', 'VISC11.SA',
     'RURA11.SA', 'TRXF11.SA', 'XPLG11.SA', 'RZTR11.SA',
@@ -21,14 +36,67 @@ FIIS_POPULARES = [
     'VILG11.SA', 'VRTA11.SA', 'HGRU11.SA', 'RBRP11.SA'
 ]
 
+# Tickers buscados em todo ciclo, fora do rodízio (padrão: FIIS_POPULARES)
+UNIVERSO_PRIORITARIOS = [
+    t.strip() for t in os.getenv('UNIVERSO_PRIORITARIOS', ','.join(FIIS_POPULARES)).split(',') if t.strip()
+]
+
+# Última cotação de cada FII monitorado, em formato colunar
+quadro = QuadroCotacoes()
+
+# Rodízio de atualização do universo (criado na primeira análise, ver obter_rodizio)
+rodizio = None
+_universo_carregado_em = 0.0
+
+# Snapshot em disco do cache de dados de mercado e do quadro (restaurado ao iniciar)
+snapshot = SnapshotEstado('monitor')
+snapshot.registrar('fontes', fontes_dados.cache.exportar_estado, fontes_dados.cache.importar_estado)
+snapshot.registrar('quadro', quadro.exportar_estado, quadro.importar_estado)
+
+# Série intradiária: as cotações de cada ciclo, gravadas por dia (ver serie_intradiaria.py)
+serie = SerieIntradiaria()
+
 # Configurações de alertas
 ALERTA_ALTA_MINIMA = float(os.getenv('ALERTA_ALTA_MINIMA', '1.5'))  # % mínima para alertar alta
 ALERTA_BAIXA_MINIMA = float(os.getenv('ALERTA_BAIXA_MINIMA', '-1.5'))  # % mínima para alertar baixa
 ALERTA_DESCONTO_PVP = float(os.getenv('ALERTA_DESCONTO_PVP', '0.95'))  # P/VP mínimo para alertar desconto
+# Bandas de histerese: quanto o valor precisa voltar além do limite para o alerta rearmar
+ALERTA_HISTERESE_VARIACAO = float(os.getenv('ALERTA_HISTERESE_VARIACAO', '0.5'))  # pontos percentuais
+ALERTA_HISTERESE_PVP = float(os.getenv('ALERTA_HISTERESE_PVP', '0.02'))
+# Movimentos intradiários: variação mínima (%) do preço dentro da janela (minutos) da série
+ALERTA_MOVIMENTO_MINIMO = float(os.getenv('ALERTA_MOVIMENTO_MINIMO', '1.0'))
+ALERTA_MOVIMENTO_JANELA = float(os.getenv('ALERTA_MOVIMENTO_JANELA', '60'))
+
+# Alertas já enviados (não se repetem enquanto a condição continuar valendo)
+estado_alertas = EstadoAlertas()
 
-# Configurações de horário de pregão (segunda a sexta, 10h-17h)
-HORA_INICIO_PREGAO = 10
-HORA_FIM_PREGAO = 17
+# Chats assinantes com watchlist e regras próprias (ver assinantes.py)
+assinantes = RegistroAssinantes()
+
+# Regras dos alertas personalizados: as três padrão + ALERTAS_REGRAS ("nome: expressão; ...",
+# ex.: "logistica: variacao >= 2 and pvp < 0.95 and setor == 'Logística'")
+REGRAS_PERSONALIZADAS = [
+    RegraAlerta('alta', f'variacao >= {ALERTA_ALTA_MINIMA}'),
+    RegraAlerta('baixa', f'variacao <= {ALERTA_BAIXA_MINIMA}'),
+    RegraAlerta('desconto', f'pvp <= {ALERTA_DESCONTO_PVP}'),
+] + interpretar_regras(os.getenv('ALERTAS_REGRAS', ''),
+                       reservados=('alta', 'baixa', 'desconto', 'movimento_alta', 'movimento_baixa'))
+motor_alertas = MotorRegras(
+    REGRAS_PERSONALIZADAS, histereses={'variacao': ALERTA_HISTERESE_VARIACAO, 'pvp': ALERTA_HISTERESE_PVP}
+)
+
+# Produtores de alerta executados a cada ciclo, na ordem (ver PRODUTORES_ALERTA)
+ALERTAS_ATIVOS = [a.strip() for a in os.getenv('ALERTAS_ATIVOS', 'resumo').split(',') if a.strip()]
+
+# Coleta concorrente: FIIs buscados ao mesmo tempo e prazo (segundos) de cada ciclo
+COLETA_PARALELISMO = int(os.getenv('COLETA_PARALELISMO', '8'))
+COLETA_PRAZO = float(os.getenv('COLETA_PRAZO', '120'))
+
+# Pool próprio da coleta (o padrão do asyncio é compartilhado e limitado por CPU)
+_executor_coleta = ThreadPoolExecutor(max_workers=COLETA_PARALELISMO, thread_name_prefix='coleta')
+
+# Calendário de pregões da B3 (fins de semana, feriados, horário da sessão)
+calendario = CalendarioB3()
 
 
 def buscar_dados_fii(ticker):
@@ -42,16 +110,14 @@ def buscar_dados_fii(ticker):
         dict: Dados do FII ou None se houver erro
     """
     try:
-        fii = yf.Ticker(ticker)
-        
         # Busca histórico para calcular variação
-        hist = fii.history(period='5d')
+        hist = fontes_dados.historico(ticker, period='5d')
         
         if hist.empty or len(hist) < 2:
             print(f"  ⚠️  {ticker}: Sem dados suficientes")
             return None
         
-        info = fii.info if fii.info else {}
+        info = fontes_dados.info(ticker)
         
         # Preço atual
         preco_atual = info.get('currentPrice') or info.get('regularMarketPrice')
@@ -70,8 +136,8 @@ def buscar_dados_fii(ticker):
             if book_value and book_value > 0:
                 pvp = preco_atual / book_value
         
-        # Valida P/VP
-        if pvp and (pvp < 0.3 or pvp > 3.0):
+        # Valida P/VP (sem P/VP fica None: um 0 dispararia as regras de desconto)
+        if not pvp or pvp < 0.3 or pvp > 3.0:
             pvp = None
         
         # Dividend Yield
@@ -105,156 +171,374 @@ def buscar_dados_fii(ticker):
         return None
 
 
+async def coletar_dados_fiis(tickers, executor=_executor_coleta, prazo=COLETA_PRAZO):
+    """
+    Busca vários FIIs concorrentemente no pool da coleta (COLETA_PARALELISMO threads)
+
+    O limitador de taxa de fontes_dados continua valendo para o conjunto. O que
+    não terminar em `prazo` segundos fica de fora do ciclo: buscas ainda na fila
+    do pool nem começam, as que esperam o limitador desistem e devolvem os
+    tokens, e o resultado das que já estavam em andamento é descartado.
+
+    Args:
+        tickers (list): Tickers a buscar
+        executor (ThreadPoolExecutor): Pool das buscas (define o paralelismo)
+        prazo (float): Tempo máximo da coleta em segundos
+
+    Returns:
+        tuple: (dados dos FIIs na ordem de `tickers`, tickers que estouraram o prazo)
+    """
+    cancelado = threading.Event()
+    futuros = {
+        ticker: executor.submit(fontes_dados.executar_cancelavel, cancelado, buscar_dados_fii, ticker)
+        for ticker in tickers
+    }
+    tarefas = {ticker: asyncio.wrap_future(futuro) for ticker, futuro in futuros.items()}
+    _, pendentes = await asyncio.wait(tarefas.values(), timeout=prazo)
+    if pendentes:
+        cancelado.set()
+        for ticker, tarefa in tarefas.items():
+            if tarefa in pendentes:
+                # Cancela o futuro do pool (os da fila não chegam a rodar); o resultado de
+                # uma busca já em andamento chega depois e é ignorado
+                futuros[ticker].cancel()
+                tarefa.cancel()
+
+    dados = []
+    atrasados = []
+    for ticker, tarefa in tarefas.items():
+        if tarefa in pendentes:
+            atrasados.append(ticker)
+            monitor_coletas.inc(resultado='prazo_esgotado')
+        elif tarefa.exception() is None and tarefa.result():
+            dados.append(tarefa.result())
+            monitor_coletas.inc(resultado='ok')
+        else:
+            monitor_coletas.inc(resultado='sem_dados')
+    return dados, atrasados
+
+
+def obter_rodizio():
+    """
+    Rodízio do universo de FIIs, com a lista recarregada a cada UNIVERSO_ATUALIZACAO_HORAS
+
+    Returns:
+        RodizioUniverso: Rodízio compartilhado pelos ciclos
+    """
+    global rodizio, _universo_carregado_em
+    
+    if rodizio is None or time.time() - _universo_carregado_em > UNIVERSO_ATUALIZACAO_HORAS * 60 * 60:
+        universo = carregar_universo(FIIS_POPULARES)
+        if rodizio is None:
+            rodizio = RodizioUniverso(universo)
+        else:
+            rodizio.definir_universo(universo)
+        _universo_carregado_em = time.time()
+    
+    # FIIs seguidos por assinantes entram no universo mesmo fora da lista carregada
+    faltando = assinantes.tickers_seguidos() - set(rodizio.universo)
+    if faltando:
+        rodizio.definir_universo(rodizio.universo + sorted(faltando))
+    monitor_universo.definir(len(rodizio.universo), conjunto='universo')
+    return rodizio
+
+
+@rastrear('monitor.analisar_fiis')
 def analisar_fiis():
     """
-    Analisa todos os FIIs e retorna dados organizados
+    Atualiza parte do universo (rodízio) e retorna o retrato completo do ciclo
     
     Returns:
-        dict: Dados organizados com 'todos', 'altas' e 'baixas'
+        MappingProxyType: Retrato imutável com 'todos' (universo inteiro, do quadro),
+        'altas' e 'baixas' (tuplas de FIIs somente leitura), 'momento', 'duracao_coleta',
+        'fora_do_prazo', 'atualizados' (tickers buscados no ciclo), 'idade_maxima' e
+        'colunas' (ContextoColunar do universo, para as regras vetorizadas)
     """
     print(f"\n{'='*60}")
     print(f"📊 Iniciando análise de FIIs - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
     print(f"{'='*60}\n")
     
-    dados_fiis = []
+    rodizio = obter_rodizio()
+    plano = rodizio.planejar(quadro, UNIVERSO_PRIORITARIOS + sorted(assinantes.tickers_seguidos()))
+    monitor_universo.definir(plano['total'], conjunto='ciclo')
     
-    for ticker in FIIS_POPULARES:
-        print(f"🔍 Buscando {ticker}...")
-        dados = buscar_dados_fii(ticker)
-        
-        if dados:
-            dados_fiis.append(dados)
-            print(f"  ✅ {ticker}: R$ {dados['preco']:.2f} ({dados['variacao']:+.2f}%)")
-        
-        # Pequena pausa para não sobrecarregar a API
-        time.sleep(0.5)
+    print(f"🔍 Buscando {plano['total']} de {len(rodizio.universo)} FIIs "
+          f"(fatia {plano['fatia'] + 1}/{len(rodizio.fatias)}, {plano['prioritarios']} prioritários, "
+          f"{plano['vencendo']} vencendo; {COLETA_PARALELISMO} por vez, prazo de {COLETA_PRAZO:.0f}s)...")
+    inicio = time.perf_counter()
+    dados_fiis, atrasados = run_async(coletar_dados_fiis(plano['tickers']))
+    duracao = time.perf_counter() - inicio
+    monitor_ciclo_duracao.observar(duracao)
+    
+    for dados in dados_fiis:
+        quadro.atualizar(dados['ticker'], dados['preco'], dados['variacao'], dados['dy'], dados['pvp'],
+                         dados['volume'], dados['nome'])
+        print(f"  ✅ {dados['ticker']}: R$ {dados['preco']:.2f} ({dados['variacao']:+.2f}%)")
+    if atrasados:
+        print(f"  ⏱️  Fora do prazo, ficam para o próximo ciclo: {', '.join(atrasados)}")
     
-    # Ordena por variação
-    dados_fiis_ordenados = sorted(dados_fiis, key=lambda x: x['variacao'], reverse=True)
+    # Só o que foi buscado agora entra na série (o resto do quadro já foi gravado quando chegou)
+    pontos = serie.registrar(quadro, [dados['ticker'] for dados in dados_fiis])
+    monitor_serie_pontos.inc(pontos)
     
-    # Separa altas e baixas
-    maiores_altas = [f for f in dados_fiis_ordenados if f['variacao'] > 0]
-    maiores_baixas = sorted([f for f in dados_fiis if f['variacao'] < 0], key=lambda x: x['variacao'])
+    # Retrato completo: o universo inteiro a partir do quadro (atualizado agora ou em ciclos anteriores)
+    do_universo = quadro.mascara(tickers=rodizio.universo)
+    variacoes = quadro.coluna('variacao')[:len(do_universo)]
+    todos = quadro.registros(quadro.linhas(rodizio.universo))
+    maiores_altas = quadro.registros(quadro.ranking('variacao', None, mascara=do_universo & (variacoes > 0)))
+    maiores_baixas = quadro.registros(
+        quadro.ranking('variacao', None, crescente=True, mascara=do_universo & (variacoes < 0))
+    )
+    idade_maxima = rodizio.idade_maxima_atual(quadro)
+    if idade_maxima is not None:
+        monitor_universo_idade.definir(idade_maxima)
     
     print(f"\n{'='*60}")
     print(f"✅ Análise concluída!")
-    print(f"  • Total analisado: {len(dados_fiis)} FIIs")
+    print(f"  • Atualizados no ciclo: {len(dados_fiis)} FIIs")
+    print(f"  • No retrato: {len(todos)} de {len(rodizio.universo)} FIIs")
+    if idade_maxima is not None:
+        print(f"  • Cotação mais antiga: {idade_maxima / 60:.0f} min")
     print(f"  • Em alta: {len(maiores_altas)}")
     print(f"  • Em baixa: {len(maiores_baixas)}")
+    print(f"  • Duração da coleta: {duracao:.1f}s")
+    if pontos:
+        print(f"  • Gravados na série intradiária: {pontos} pontos")
     print(f"{'='*60}\n")
     
-    return {
-        'todos': dados_fiis,
-        'altas': maiores_altas,
-        'baixas': maiores_baixas
-    }
+    return _congelar_ciclo(todos, maiores_altas, maiores_baixas,
+                           colunas=ContextoColunar.do_quadro(quadro, rodizio.universo),
+                           duracao_coleta=duracao, fora_do_prazo=tuple(atrasados),
+                           atualizados=tuple(f['ticker'] for f in dados_fiis), idade_maxima=idade_maxima)
+
+
+def _congelar_ciclo(todos, altas, baixas, **extras):
+    """
+    Monta o retrato imutável do ciclo, compartilhado por todos os produtores de alerta
+
+    Cada FII vira um mapeamento somente leitura (o mesmo objeto em 'todos',
+    'altas' e 'baixas') e as listas viram tuplas: um produtor não consegue
+    alterar o que o próximo vai ler
+    """
+    fiis = {f['ticker']: MappingProxyType(dict(f)) for f in todos}
+    return MappingProxyType({
+        'todos': tuple(fiis.values()),
+        'altas': tuple(fiis[f['ticker']] for f in altas),
+        'baixas': tuple(fiis[f['ticker']] for f in baixas),
+        'momento': datetime.now().isoformat(),
+        **extras
+    })
+
+
+# Produtores de alerta registrados: nome -> função(ciclo, fila)
+PRODUTORES_ALERTA = {}
+
+
+def produtor_alerta(nome):
+    """
+    Registra uma função como produtor de alertas (habilitado por ALERTAS_ATIVOS)
+
+    O produtor recebe o retrato do ciclo e a fila de envio do Telegram e nunca
+    busca dados de mercado: um tipo de alerta novo não acrescenta chamadas às
+    fontes externas. Enfileirar não bloqueia o ciclo.
+    """
+    def decorador(funcao):
+        PRODUTORES_ALERTA[nome] = funcao
+        return funcao
+    return decorador
 
 
-def enviar_alerta_resumo():
+@produtor_alerta('resumo')
+@rastrear('monitor.alerta_resumo')
+def enviar_alerta_resumo(dados, fila):
     """
-    Executa a análise e envia alerta resumido no Telegram
+    Enfileira o alerta resumido do ciclo (enviado sozinho, sem agrupamento)
+    
+    Args:
+        dados (MappingProxyType): Retrato do ciclo (ver analisar_fiis)
+        fila (FilaEnvio): Fila de envio do Telegram
     """
     try:
-        # Analisa FIIs
-        dados = analisar_fiis()
+        mensagem = fila.notifier.formatar_alerta_resumo(dados, len(dados['todos']))
+        fila.enfileirar(mensagem, agrupar=False)
+        print("📤 Alerta resumo enfileirado para envio no Telegram")
+            
+    except Exception as e:
+        print(f"❌ Erro ao enviar alerta: {str(e)}")
+
+
+@produtor_alerta('personalizados')
+@rastrear('monitor.alertas_personalizados')
+def enviar_alertas_personalizados(dados, fila):
+    """
+    Enfileira os alertas das regras personalizadas (REGRAS_PERSONALIZADAS)
+    
+    As regras são avaliadas de uma vez sobre as colunas do ciclo; só os FIIs
+    disparados e os alertas ativos passam pelo estado. Os alertas do ciclo
+    chegam juntos à fila e são entregues agrupados em poucas mensagens
+    
+    Args:
+        dados (MappingProxyType): Retrato do ciclo (ver analisar_fiis)
+        fila (FilaEnvio): Fila de envio do Telegram
+    """
+    try:
+        contexto = dados['colunas']
+        por_ticker = {fii['ticker']: fii for fii in dados['todos']}
+        linha_do_ticker = {ticker: linha for linha, ticker in enumerate(contexto.tickers)}
+        icones = {'alta': '🚀', 'baixa': '⚠️', 'desconto': '💎'}
+        alertas = []
+        repetidos = 0
         
-        if not dados['todos']:
-            print("❌ Nenhum dado disponível para enviar alerta")
-            return
+        resultados = motor_alertas.avaliar(contexto)
+        for regra in motor_alertas.regras:
+            disparadas, mantidas = resultados[regra.nome]
         
-        # Envia notificação
-        print("📱 Enviando notificação no Telegram...")
+            # Alertas ativos que saíram da condição (além da banda de histerese) são rearmados
+            for ticker in estado_alertas.tickers_ativos(regra.nome):
+                linha = linha_do_ticker.get(ticker)
+                if linha is not None and not mantidas[linha]:
+                    estado_alertas.registrar(ticker, regra.nome, None, False, True)
         
-        notifier = TelegramNotifier()
-        sucesso = run_async(notifier.enviar_alerta_resumo(dados, len(FIIS_POPULARES)))
+            # Já vêm ordenados: mais extremos primeiro
+            for ticker in contexto.tickers_das_linhas(disparadas):
+                fii = por_ticker[ticker]
+                valor = fii.get(regra.campo) if regra.campo else None
+                valor = 0.0 if valor is None else valor
+                resultado = estado_alertas.registrar(ticker, regra.nome, valor, True, False)
+                monitor_alertas.inc(regra=regra.nome, resultado=resultado)
+                if resultado == NOVO:
+                    detalhe = f" ({regra.campo}: {valor:+.2f})" if regra.campo else ''
+                    print(f"{icones.get(regra.nome, '🔔')} Alerta de {regra.nome.upper()}: {ticker}{detalhe}")
+                    alertas.append((fii, regra.nome))
+                else:
+                    repetidos += 1
         
-        if sucesso:
-            print("✅ Alerta enviado com sucesso!")
-        else:
-            print("❌ Falha ao enviar alerta")
-            
+        for fii, tipo in alertas:
+            fila.enfileirar(fila.notifier.formatar_alerta_personalizado(fii['ticker'], fii, tipo))
+        
+        print(f"\n📤 {len(alertas)} alertas personalizados enfileirados ({repetidos} repetidos suprimidos)")
+
     except Exception as e:
-        print(f"❌ Erro ao enviar alerta: {str(e)}")
+        print(f"❌ Erro ao enviar alertas personalizados: {str(e)}")
 
 
-def enviar_alertas_personalizados():
+@produtor_alerta('assinantes')
+@rastrear('monitor.alertas_assinantes')
+def enviar_alertas_assinantes(dados, fila):
     """
-    Analisa FIIs e envia alertas personalizados para variações significativas
+    Enfileira, para cada chat assinante, os alertas das suas próprias regras
+    
+    Só os FIIs atualizados no ciclo são avaliados, e cada um consulta o índice
+    de regras: o custo não cresce com o número de assinantes
+    
+    Args:
+        dados (MappingProxyType): Retrato do ciclo (ver analisar_fiis)
+        fila (FilaEnvio): Fila de envio do Telegram
     """
     try:
-        # Analisa FIIs
-        dados = analisar_fiis()
+        por_ticker = {fii['ticker']: fii for fii in dados['todos']}
+        atualizados = [por_ticker[t] for t in dados.get('atualizados', por_ticker) if t in por_ticker]
+        histereses = {'variacao': ALERTA_HISTERESE_VARIACAO, 'pvp': ALERTA_HISTERESE_PVP}
         
-        if not dados['todos']:
-            print("❌ Nenhum dado disponível")
-            return
+        novos, repetidos = assinantes.avaliar(atualizados, estado_alertas, histereses)
+        monitor_alertas.inc(len(novos), regra='assinante', resultado=NOVO)
+        monitor_alertas.inc(repetidos, regra='assinante', resultado=REPETIDO)
+        
+        operadores = {direcao: operador for operador, direcao in OPERADORES.items()}
+        for regra, fii in novos:
+            fila.enfileirar(
+                fila.notifier.formatar_alerta_regra(fii, regra.campo, operadores[regra.direcao], regra.limite),
+                chat_id=regra.chat_id
+            )
+        
+        chats = len({regra.chat_id for regra, _ in novos})
+        print(f"📤 {len(novos)} alertas de assinantes enfileirados para {chats} chat(s) "
+              f"({repetidos} repetidos suprimidos, {len(atualizados)} FIIs avaliados)")
         
-        notifier = TelegramNotifier()
-        alertas_enviados = 0
+    except Exception as e:
+        print(f"❌ Erro ao enviar alertas de assinantes: {str(e)}")
+
+
+@produtor_alerta('movimentos')
+@rastrear('monitor.alertas_movimentos')
+def enviar_alertas_movimentos(dados, fila):
+    """
+    Enfileira os FIIs que mais se mexeram nos últimos ALERTA_MOVIMENTO_JANELA minutos
+    
+    A variação na janela vem da série intradiária gravada pelos ciclos
+    anteriores, sem buscar histórico nas fontes; a janela anterior, de mesmo
+    tamanho, entra na mensagem para mostrar se o movimento está acelerando.
+    Um FII sem cotação perto do início da janela (ex.: fora da fatia do rodízio
+    há horas) fica de fora, e a mensagem traz o intervalo real entre os pontos
+    
+    Args:
+        dados (MappingProxyType): Retrato do ciclo (ver analisar_fiis)
+        fila (FilaEnvio): Fila de envio do Telegram
+    """
+    try:
+        por_ticker = {fii['ticker']: fii for fii in dados['todos']}
+        movimentos = serie.dia().aceleracao(ALERTA_MOVIMENTO_JANELA * 60, time.time(), list(por_ticker))
+        recente = movimentos['recente']
+        regras = (('movimento_alta', ALERTA_MOVIMENTO_MINIMO, ACIMA),
+                  ('movimento_baixa', -ALERTA_MOVIMENTO_MINIMO, ABAIXO))
         
-        # Alertas de altas significativas
-        for fii in dados['altas']:
-            if fii['variacao'] >= ALERTA_ALTA_MINIMA:
-                print(f"🚀 Alerta de ALTA: {fii['ticker']} ({fii['variacao']:+.2f}%)")
-                sucesso = run_async(
-                    notifier.enviar_alerta_personalizado(fii['ticker'], fii, 'alta')
-                )
-                if sucesso:
-                    alertas_enviados += 1
-                time.sleep(1)  # Pausa entre mensagens
+        # Só passam pelo estado os disparados (mais extremos primeiro) e os alertas ativos, para rearmar
+        with np.errstate(invalid='ignore'):
+            disparadas = np.flatnonzero((np.abs(recente) >= ALERTA_MOVIMENTO_MINIMO) & (movimentos['pontos'] >= 2))
+        disparadas = disparadas[np.argsort(-np.abs(recente[disparadas]), kind='stable')]
+        linha_do_ticker = {ticker: linha for linha, ticker in enumerate(movimentos['tickers'])}
+        ativas = [linha_do_ticker[t] for regra, _, _ in regras for t in estado_alertas.tickers_ativos(regra)
+                  if t in linha_do_ticker]
         
-        # Alertas de baixas significativas
-        for fii in dados['baixas']:
-            if fii['variacao'] <= ALERTA_BAIXA_MINIMA:
-                print(f"⚠️ Alerta de BAIXA: {fii['ticker']} ({fii['variacao']:+.2f}%)")
-                sucesso = run_async(
-                    notifier.enviar_alerta_personalizado(fii['ticker'], fii, 'baixa')
-                )
-                if sucesso:
-                    alertas_enviados += 1
-                time.sleep(1)
+        alertas = []
+        repetidos = 0
+        for linha in dict.fromkeys(disparadas.tolist() + ativas):
+            variacao = float(recente[linha])
+            if variacao != variacao:
+                continue
+            ticker = movimentos['tickers'][linha]
+            for regra, limite, direcao in regras:
+                resultado = estado_alertas.avaliar(ticker, regra, variacao, limite, direcao,
+                                                   ALERTA_HISTERESE_VARIACAO)
+                if resultado is None:
+                    continue
+                monitor_alertas.inc(regra=regra, resultado=resultado)
+                if resultado == NOVO:
+                    minutos = max(1, round(float(movimentos['ate'][linha] - movimentos['desde'][linha]) / 60))
+                    print(f"{'📈' if variacao > 0 else '📉'} Movimento de {variacao:+.2f}% "
+                          f"em {minutos} min: {ticker}")
+                    anterior = float(movimentos['anterior'][linha])
+                    alertas.append((por_ticker[ticker], variacao, minutos,
+                                    None if anterior != anterior else anterior))
+                else:
+                    repetidos += 1
         
-        # Alertas de descontos (P/VP < threshold)
-        for fii in dados['todos']:
-            if fii.get('pvp') and fii['pvp'] < ALERTA_DESCONTO_PVP:
-                print(f"💎 Alerta de DESCONTO: {fii['ticker']} (P/VP: {fii['pvp']:.2f})")
-                sucesso = run_async(
-                    notifier.enviar_alerta_personalizado(fii['ticker'], fii, 'desconto')
-                )
-                if sucesso:
-                    alertas_enviados += 1
-                time.sleep(1)
+        for fii, variacao, minutos, anterior in alertas:
+            fila.enfileirar(fila.notifier.formatar_alerta_movimento(fii, variacao, minutos, anterior))
         
-        print(f"\n✅ {alertas_enviados} alertas personalizados enviados")
+        print(f"📤 {len(alertas)} alertas de movimento enfileirados ({repetidos} repetidos suprimidos)")
         
     except Exception as e:
-        print(f"❌ Erro ao enviar alertas personalizados: {str(e)}")
+        print(f"❌ Erro ao enviar alertas de movimento: {str(e)}")
 
 
 def esta_em_horario_pregao():
     """
-    Verifica se está no horário de pregão (segunda a sexta, 10h-17h)
+    Verifica se está no horário de pregão da B3 (dias úteis sem feriado)
     
     Returns:
         bool: True se está no horário de pregão
     """
-    agora = datetime.now()
-    
-    # Verifica se é dia da semana (0=segunda, 6=domingo)
-    if agora.weekday() >= 5:  # 5=sábado, 6=domingo
-        return False
-    
-    # Verifica horário (10h às 17h)
-    hora_atual = agora.hour
-    if hora_atual < HORA_INICIO_PREGAO or hora_atual >= HORA_FIM_PREGAO:
-        return False
+    agora = calendario.agora()
     
-    return True
+    # A execução agendada no fechamento ainda conta como horário de pregão
+    sessao = calendario.sessao(agora.date())
+    return sessao is not None and sessao[0] <= agora <= sessao[1] + timedelta(minutes=1)
 
 
 def executar_monitoramento():
     """
-    Executa o monitoramento completo (resumo + alertas personalizados)
+    Executa o monitoramento completo (uma coleta + produtores em ALERTAS_ATIVOS)
     Só executa se estiver no horário de pregão
     """
     print(f"\n{'█'*60}")
@@ -263,37 +547,58 @@ def executar_monitoramento():
     
     # Verifica horário de pregão
     if not esta_em_horario_pregao():
-        agora = datetime.now()
+        agora = calendario.agora()
         dia_semana = ['segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo'][agora.weekday()]
+        abertura, _ = calendario.proximo_pregao(agora)
         
         print(f"⏸️  FORA DO HORÁRIO DE PREGÃO")
         print(f"  • Dia: {dia_semana.capitalize()}")
         print(f"  • Hora: {agora.strftime('%H:%M')}")
-        print(f"  • Pregão: Segunda a Sexta, 10h-17h")
-        print(f"\n⏰ Próxima verificação em 30 minutos")
+        feriado = calendario.feriado(agora.date())
+        if feriado:
+            print(f"  • Feriado: {feriado}")
+        print(f"  • Próximo pregão: {abertura.strftime('%d/%m/%Y %H:%M')}")
         print(f"{'█'*60}\n")
         return
     
-    # Envia alerta resumido
-    enviar_alerta_resumo()
+    # Uma única coleta por ciclo, compartilhada por todos os produtores de alerta
+    dados = analisar_fiis()
     
-    # Opcional: Descomentar para enviar alertas personalizados também
-    # print("\n" + "─"*60 + "\n")
-    # enviar_alertas_personalizados()
+    if not dados['todos']:
+        print("❌ Nenhum dado disponível para enviar alertas")
+        return
+    
+    fila = fila_compartilhada()
+    for nome in ALERTAS_ATIVOS:
+        produtor = PRODUTORES_ALERTA.get(nome)
+        if produtor is None:
+            print(f"⚠️  Produtor de alerta desconhecido em ALERTAS_ATIVOS: {nome}")
+            continue
+        print("\n" + "─"*60 + "\n")
+        produtor(dados, fila)
     
     print(f"\n{'█'*60}")
     print(f"✅ MONITORAMENTO CONCLUÍDO")
-    print(f"⏰ Próxima execução em 30 minutos")
     print(f"{'█'*60}\n")
 
 
-def iniciar_monitoramento_agendado(intervalo_horas=0.5):
+def iniciar_monitoramento_agendado(intervalo_horas=None):
     """
-    Inicia o monitoramento agendado
+    Inicia o monitoramento agendado pelo calendário de pregões
     
     Args:
-        intervalo_horas (int): Intervalo em horas entre cada execução
+        intervalo_horas (float): Intervalo em horas no meio do pregão
+                                 (None = MONITOR_CADENCIA_SESSAO)
     """
+    opcoes = {}
+    if intervalo_horas:
+        opcoes['cadencia_sessao'] = intervalo_horas * 60
+    agendador = AgendadorPregao(executar_monitoramento, calendario, **opcoes)
+    cadencia_abertura, cadencia_sessao, cadencia_fechamento = (
+        c.total_seconds() / 60 for c in agendador.cadencias
+    )
+    rodizio = obter_rodizio()
+    
     print(f"""
 ╔════════════════════════════════════════════════════════════╗
 ║                                                            ║
@@ -302,19 +607,20 @@ def iniciar_monitoramento_agendado(intervalo_horas=0.5):
 ╚════════════════════════════════════════════════════════════╝
 
 ⚙️  CONFIGURAÇÕES:
-  • FIIs monitorados: {len(FIIS_POPULARES)}
-  • Intervalo: A cada {intervalo_horas} hora(s)
-  • Horário: Segunda a Sexta, {HORA_INICIO_PREGAO}h-{HORA_FIM_PREGAO}h
+  • FIIs monitorados: {len(rodizio.universo)} ({len(rodizio.fatias)} fatias em rodízio)
+  • Cadência: abertura {cadencia_abertura:g} min, sessão {cadencia_sessao:g} min, fechamento {cadencia_fechamento:g} min
+  • Horário: dias de pregão da B3, {calendario.abertura:%H:%M}-{calendario.fechamento:%H:%M} (fora dos feriados)
   • Alerta alta: ≥ {ALERTA_ALTA_MINIMA:+.2f}%
   • Alerta baixa: ≤ {ALERTA_BAIXA_MINIMA:+.2f}%
-  • Alerta desconto P/VP: < {ALERTA_DESCONTO_PVP:.2f}
+  • Alerta desconto P/VP: <= {ALERTA_DESCONTO_PVP:.2f}
+  • Alertas ativos: {', '.join(ALERTAS_ATIVOS)}
 
 🔄 Testando conexão com Telegram...
 """)
     
     # Testa conexão
     try:
-        notifier = TelegramNotifier()
+        notifier = notificador_compartilhado()
         if run_async(notifier.testar_conexao()):
             print("✅ Conexão com Telegram estabelecida!\n")
         else:
@@ -324,28 +630,23 @@ def iniciar_monitoramento_agendado(intervalo_horas=0.5):
         print(f"❌ Erro: {str(e)}")
         return
     
-    # Executa imediatamente a primeira análise
+    # Executa imediatamente a primeira análise (se o pregão estiver aberto)
     print("🚀 Executando primeira análise...\n")
     executar_monitoramento()
     
-    # Agenda execuções futuras
-    schedule.every(intervalo_horas).hours.do(executar_monitoramento)
-    
     print(f"""
 ╔════════════════════════════════════════════════════════════╗
 ║  ✅ BOT ATIVO - Monitoramento em andamento...             ║
 ║                                                            ║
-║  ⏰ Próxima atualização: {(datetime.now().replace(microsecond=0) + __import__('datetime').timedelta(hours=intervalo_horas)).strftime('%d/%m/%Y %H:%M:%S')}      ║
+║  ⏰ Próxima atualização: {agendador.proxima_execucao().strftime('%d/%m/%Y %H:%M:%S')}      ║
 ║                                                            ║
 ║  💡 Pressione Ctrl+C para parar                           ║
 ╚════════════════════════════════════════════════════════════╝
 """)
     
-    # Loop principal
+    # Loop principal: dorme até o próximo horário do calendário
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Verifica a cada minuto
+        agendador.executar()
     except KeyboardInterrupt:
         print(f"\n\n{'='*60}")
         print("🛑 Monitoramento interrompido pelo usuário")
@@ -359,17 +660,29 @@ if __name__ == "__main__":
     parser.add_argument(
         '--intervalo',
         type=float,
-        default=0.5,
-        help='Intervalo em horas entre cada atualização (padrão: 0.5)'
+        default=None,
+        help='Intervalo em horas entre atualizações no meio do pregão (padrão: MONITOR_CADENCIA_SESSAO)'
     )
     parser.add_argument(
         '--teste',
         action='store_true',
         help='Executa apenas uma análise de teste e sai'
     )
+    parser.add_argument(
+        '--metricas-porta',
+        type=int,
+        default=int(os.getenv('METRICAS_MONITOR_PORTA', '0')),
+        help='Expõe métricas Prometheus em http://127.0.0.1:<porta>/metrics (padrão: desligado)'
+    )
     
     args = parser.parse_args()
     
+    snapshot.iniciar()
+    
+    if args.metricas_porta:
+        from metricas import servir_metricas
+        servir_metricas(args.metricas_porta)
+    
     if args.teste:
         print("\n🧪 MODO TESTE - Executando análise única...\n")
         executar_monitoramento()
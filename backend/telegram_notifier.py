@@ -2,15 +2,57 @@
 Módulo de notificações do Telegram para monitoramento de FIIs
 """
 import asyncio
-from datetime import datetime
+import atexit
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
 import os
 from dotenv import load_dotenv
 
+import fontes_dados
+from limitador import LimitadorTaxa
+from metricas import telegram_envios, telegram_duracao, telegram_fila
+from rastreamento import iniciar_span
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
+# Conexões HTTP mantidas abertas com a API do Telegram (reaproveitadas entre envios)
+TELEGRAM_CONEXOES = int(os.getenv('TELEGRAM_CONEXOES', '4'))
+
+# Limites de envio do Telegram: ~1 mensagem/s por chat e ~30/s no total do bot
+TELEGRAM_LIMITE_CHAT_RPS = float(os.getenv('TELEGRAM_LIMITE_CHAT_RPS', '1'))
+TELEGRAM_LIMITE_GLOBAL_RPS = float(os.getenv('TELEGRAM_LIMITE_GLOBAL_RPS', '25'))
+# Tentativas de envio quando o Telegram responde 429 (respeitando retry_after)
+TELEGRAM_TENTATIVAS = int(os.getenv('TELEGRAM_TENTATIVAS', '3'))
+# Janela (segundos) em que alertas enfileirados são juntados em uma mensagem
+TELEGRAM_JANELA_AGRUPAMENTO = float(os.getenv('TELEGRAM_JANELA_AGRUPAMENTO', '2'))
+
+# Tamanho máximo de uma mensagem do Telegram (caracteres)
+LIMITE_CARACTERES = 4096
+
+# Token buckets do Telegram: 'global' para o bot e um balde por chat
+limitador_telegram = LimitadorTaxa(
+    {'global': (TELEGRAM_LIMITE_GLOBAL_RPS, max(1, int(TELEGRAM_LIMITE_GLOBAL_RPS)))},
+    limite_padrao=(TELEGRAM_LIMITE_CHAT_RPS, 3)
+)
+
+
+async def _aguardar_vez(chat_id):
+    """Espera (sem bloquear o loop) os tokens do bot e do chat"""
+    espera = max(limitador_telegram.balde('global').reservar(),
+                 limitador_telegram.balde(f'chat:{chat_id}').reservar())
+    if espera > 0:
+        await asyncio.sleep(espera)
+
+
+def _segundos_retry_after(erro):
+    espera = erro.retry_after
+    return espera.total_seconds() if isinstance(espera, timedelta) else float(espera)
+
 class TelegramNotifier:
     """Classe para enviar notificações sobre FIIs no Telegram"""
     
@@ -19,36 +61,74 @@ class TelegramNotifier:
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         
+        # Reproduzindo fixtures: nada sai para a rede, as mensagens só são registradas
+        self.offline = fontes_dados.offline()
+        if self.offline:
+            self.bot_token = self.bot_token or 'offline'
+            self.chat_id = self.chat_id or 'offline'
+        
         if not self.bot_token:
             raise ValueError("❌ TELEGRAM_BOT_TOKEN não configurado no arquivo .env")
         
         if not self.chat_id:
             raise ValueError("❌ TELEGRAM_CHAT_ID não configurado no arquivo .env")
         
-        self.bot = Bot(token=self.bot_token)
+        self.bot = Bot(token=self.bot_token, request=HTTPXRequest(connection_pool_size=TELEGRAM_CONEXOES))
     
-    async def enviar_mensagem(self, mensagem, parse_mode='HTML'):
+    async def encerrar(self):
+        """Fecha as conexões HTTP do bot"""
+        if not self.offline:
+            await self.bot.request.shutdown()
+    
+    async def enviar_mensagem(self, mensagem, parse_mode='HTML', chat_id=None):
         """
         Envia uma mensagem para o Telegram
         
+        Respeita os limites de envio por chat e do bot (token buckets) e, se o
+        Telegram responder 429, espera o retry_after indicado e tenta de novo
+        
         Args:
             mensagem (str): Texto da mensagem
             parse_mode (str): Formato da mensagem ('HTML' ou 'Markdown')
+            chat_id (str): Chat de destino (padrão: TELEGRAM_CHAT_ID)
         
         Returns:
             bool: True se enviou com sucesso, False caso contrário
         """
-        try:
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=mensagem,
-                parse_mode=parse_mode
-            )
+        chat_id = chat_id or self.chat_id
+        
+        if self.offline:
+            print(f"📵 [offline] Mensagem para {chat_id} ({len(mensagem)} caracteres): {mensagem.splitlines()[0]}")
+            telegram_envios.inc(resultado='offline')
             return True
+        
+        try:
+            for tentativa in range(1, TELEGRAM_TENTATIVAS + 1):
+                await _aguardar_vez(chat_id)
+                try:
+                    with telegram_duracao.medir(), iniciar_span('telegram.enviar', caracteres=len(mensagem)):
+                        await self.bot.send_message(
+                            chat_id=chat_id,
+                            text=mensagem,
+                            parse_mode=parse_mode
+                        )
+                    limitador_telegram.registrar_sucesso(f'chat:{chat_id}')
+                    telegram_envios.inc(resultado='ok')
+                    return True
+                except RetryAfter as e:
+                    espera = _segundos_retry_after(e)
+                    telegram_envios.inc(resultado='limite')
+                    limitador_telegram.registrar_limite_excedido(f'chat:{chat_id}', espera)
+                    if tentativa == TELEGRAM_TENTATIVAS:
+                        raise
+                    print(f"  🐢 Telegram pediu {espera:.0f}s de pausa (tentativa {tentativa}/{TELEGRAM_TENTATIVAS})")
+                    await asyncio.sleep(espera)
         except TelegramError as e:
+            telegram_envios.inc(resultado='erro')
             print(f"❌ Erro ao enviar mensagem no Telegram: {str(e)}")
             return False
         except Exception as e:
+            telegram_envios.inc(resultado='erro')
             print(f"❌ Erro inesperado ao enviar mensagem: {str(e)}")
             return False
     
@@ -173,7 +253,7 @@ class TelegramNotifier:
         Args:
             ticker (str): Ticker do FII
             dados_fii (dict): Dados do FII
-            tipo_alerta (str): Tipo do alerta ('alta', 'baixa', 'desconto')
+            tipo_alerta (str): Tipo do alerta ('alta', 'baixa', 'desconto' ou nome de uma regra)
         
         Returns:
             str: Mensagem formatada
@@ -187,9 +267,12 @@ class TelegramNotifier:
         elif tipo_alerta == 'baixa':
             emoji = "⚠️"
             titulo = "BAIXA SIGNIFICATIVA"
-        else:
+        elif tipo_alerta == 'desconto':
             emoji = "💎"
             titulo = "OPORTUNIDADE DE DESCONTO"
+        else:
+            emoji = "🔔"
+            titulo = f"REGRA: {tipo_alerta.upper()}"
         
         mensagem = f"""{emoji} <b>{titulo}</b> {emoji}
 📅 {agora}
@@ -216,6 +299,59 @@ class TelegramNotifier:
         
         return mensagem
     
+    def formatar_alerta_regra(self, dados_fii, campo, operador, limite):
+        """
+        Formata o alerta de uma regra de assinante (ex.: variacao >= 2)
+        
+        Args:
+            dados_fii (dict): Dados do FII
+            campo (str): Campo da regra ('variacao', 'pvp', ...)
+            operador (str): '>=' ou '<='
+            limite (float): Limite da regra
+        
+        Returns:
+            str: Mensagem formatada
+        """
+        ticker_limpo = dados_fii['ticker'].replace('.SA', '')
+        emoji = "🔺" if operador == '>=' else "🔻"
+        
+        mensagem = f"""{emoji} <b>{ticker_limpo}</b>: {campo} {dados_fii[campo]:.2f} ({operador} {limite:g})
+💰 Preço: R$ {dados_fii['preco']:.2f} {self.formatar_variacao(dados_fii['variacao'])}
+"""
+        if dados_fii.get('dy'):
+            mensagem += f"📊 DY: {dados_fii['dy']:.2f}%"
+            if dados_fii.get('pvp'):
+                mensagem += f" | P/VP: {dados_fii['pvp']:.2f}"
+            mensagem += "\n"
+        
+        return mensagem
+    
+    def formatar_alerta_movimento(self, dados_fii, variacao_janela, minutos, variacao_anterior=None):
+        """
+        Formata o alerta de um movimento intradiário (ex.: +1.8% na última hora)
+        
+        Args:
+            dados_fii (dict): Dados do FII
+            variacao_janela (float): Variação do preço na janela em %
+            minutos (float): Intervalo real entre as cotações comparadas
+            variacao_anterior (float): Variação na janela anterior, de mesmo tamanho (None se não houver pontos)
+        
+        Returns:
+            str: Mensagem formatada
+        """
+        ticker_limpo = dados_fii['ticker'].replace('.SA', '')
+        emoji = "📈" if variacao_janela > 0 else "📉"
+        
+        mensagem = f"""{emoji} <b>{ticker_limpo}</b>: {variacao_janela:+.2f}% nos últimos {minutos:g} min
+💰 Preço: R$ {dados_fii['preco']:.2f} {self.formatar_variacao(dados_fii['variacao'])}
+"""
+        if variacao_anterior is not None:
+            acelerando = abs(variacao_janela) > 2 * abs(variacao_anterior)
+            mensagem += f"⏪ Janela anterior: {variacao_anterior:+.2f}%"
+            mensagem += " ⚡ acelerando\n" if acelerando else "\n"
+        
+        return mensagem
+    
     async def enviar_alerta_resumo(self, dados_fiis, total_analisados):
         """
         Envia um alerta resumido com as principais variações
@@ -252,6 +388,10 @@ class TelegramNotifier:
         Returns:
             bool: True se a conexão foi bem-sucedida
         """
+        if self.offline:
+            print("📵 Modo offline: conexão com o Telegram simulada")
+            return True
+        
         try:
             me = await self.bot.get_me()
             print(f"✅ Conectado ao bot: @{me.username}")
@@ -279,23 +419,258 @@ class TelegramNotifier:
             return False
 
 
+class LacoAssincrono:
+    """
+    Event loop único do processo, rodando numa thread de fundo
+
+    Todo o código assíncrono (envios ao Telegram, coleta do monitor) roda neste
+    mesmo loop: o pool de conexões do Bot, preso ao loop em que foi aberto, é
+    reaproveitado em todos os envios em vez de um loop novo a cada chamada
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _obter_loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True, name='laco-assincrono').start()
+            return self._loop
+
+    def submeter(self, coro):
+        """
+        Agenda a coroutine sem esperar o resultado
+
+        Returns:
+            concurrent.futures.Future: Resultado futuro da coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._obter_loop())
+
+    def executar(self, coro, timeout=None):
+        """Executa a coroutine no loop e espera o resultado (chamado de código síncrono)"""
+        return self.submeter(coro).result(timeout)
+
+    def encerrar(self):
+        """Fecha o notificador compartilhado e para o loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            return
+        if _notificador is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(_notificador.encerrar(), loop).result(10)
+            except Exception as e:
+                print(f"⚠️  Erro ao fechar conexões do Telegram: {str(e)}")
+        asyncio.run_coroutine_threadsafe(_cancelar_tarefas(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+
+
+async def _cancelar_tarefas():
+    """Cancela as tarefas ainda vivas no loop (ex.: trabalhador da fila ocioso)"""
+    atual = asyncio.current_task()
+    tarefas = [t for t in asyncio.all_tasks() if t is not atual]
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+# Loop do processo, encerrado na saída
+laco = LacoAssincrono()
+atexit.register(laco.encerrar)
+
+_notificador = None
+_lock_notificador = threading.RLock()
+
+
+def notificador_compartilhado():
+    """
+    Notificador único do processo (um Bot e um pool de conexões reaproveitados)
+
+    Returns:
+        TelegramNotifier: Notificador criado no primeiro uso
+    """
+    global _notificador
+    with _lock_notificador:
+        if _notificador is None:
+            _notificador = TelegramNotifier()
+        return _notificador
+
+
+def agrupar_mensagens(mensagens, limite=LIMITE_CARACTERES, separador='\n\n'):
+    """
+    Junta mensagens em resumos de até `limite` caracteres
+
+    Mensagens maiores que o limite são quebradas em linhas (as tags HTML usadas
+    aqui nunca atravessam linhas)
+
+    Args:
+        mensagens (list): Textos na ordem de envio
+        limite (int): Tamanho máximo de cada resumo
+
+    Returns:
+        list: Textos prontos para envio
+    """
+    partes = []
+    for mensagem in mensagens:
+        if len(mensagem) <= limite:
+            partes.append(mensagem)
+            continue
+        bloco = ''
+        for linha in mensagem.splitlines(keepends=True):
+            while len(linha) > limite:
+                partes.append(linha[:limite])
+                linha = linha[limite:]
+            if len(bloco) + len(linha) > limite:
+                partes.append(bloco)
+                bloco = ''
+            bloco += linha
+        if bloco:
+            partes.append(bloco)
+
+    resumos = []
+    for parte in partes:
+        if resumos and len(resumos[-1]) + len(separador) + len(parte) <= limite:
+            resumos[-1] += separador + parte
+        else:
+            resumos.append(parte)
+    return resumos
+
+
+class FilaEnvio:
+    """
+    Fila de saída para o Telegram, processada no loop persistente
+
+    enfileirar() retorna na hora: quem gera alertas nunca espera a entrega.
+    Alertas que chegam dentro de TELEGRAM_JANELA_AGRUPAMENTO segundos são
+    juntados, por chat, em resumos de até 4096 caracteres; o envio respeita
+    os token buckets e o retry_after de enviar_mensagem
+    """
+
+    def __init__(self, notifier, janela=TELEGRAM_JANELA_AGRUPAMENTO):
+        self.notifier = notifier
+        self.janela = janela
+        self._fila = None  # asyncio.Queue, criada dentro do loop
+        self._trabalhador = None
+
+    def enfileirar(self, mensagem, chat_id=None, agrupar=True):
+        """
+        Coloca uma mensagem na fila (não bloqueia)
+
+        Args:
+            mensagem (str): Texto da mensagem (HTML)
+            chat_id (str): Chat de destino (padrão: TELEGRAM_CHAT_ID)
+            agrupar (bool): False para enviar sozinha (ex.: resumo do ciclo)
+
+        Returns:
+            Future: Resolve com True/False quando a mensagem for entregue
+        """
+        futuro = Future()
+        telegram_fila.inc()
+        laco.submeter(self._colocar((mensagem, chat_id or self.notifier.chat_id, agrupar, futuro)))
+        return futuro
+
+    async def _colocar(self, item):
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+            self._trabalhador = asyncio.ensure_future(self._processar())
+        self._fila.put_nowait(item)
+
+    async def _proximo_lote(self):
+        """Primeiro item da fila + os que chegarem dentro da janela de agrupamento"""
+        loop = asyncio.get_running_loop()
+        lote = [await self._fila.get()]
+        prazo = loop.time() + self.janela
+        while lote[0][2] and (restante := prazo - loop.time()) > 0:
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _processar(self):
+        while True:
+            lote = await self._proximo_lote()
+
+            # Avulsas vão sozinhas; as agrupáveis viram resumos por chat
+            grupos = []
+            por_chat = {}
+            for mensagem, chat_id, agrupar, futuro in lote:
+                if not agrupar:
+                    grupos.append((chat_id, [mensagem], [futuro]))
+                    continue
+                if chat_id not in por_chat:
+                    por_chat[chat_id] = (chat_id, [], [])
+                    grupos.append(por_chat[chat_id])
+                por_chat[chat_id][1].append(mensagem)
+                por_chat[chat_id][2].append(futuro)
+
+            for chat_id, mensagens, futuros in grupos:
+                resumos = agrupar_mensagens(mensagens)
+                if len(mensagens) > 1:
+                    print(f"📦 {len(mensagens)} alertas agrupados em {len(resumos)} mensagem(ns) para {chat_id}")
+                sucesso = True
+                for resumo in resumos:
+                    sucesso = await self.notifier.enviar_mensagem(resumo, chat_id=chat_id) and sucesso
+                for futuro in futuros:
+                    futuro.set_result(sucesso)
+
+            telegram_fila.dec(len(lote))
+            for _ in lote:
+                self._fila.task_done()
+
+    async def _aguardar_vazia(self):
+        if self._fila is not None:
+            await self._fila.join()
+
+    def esvaziar(self, timeout=60):
+        """
+        Espera a fila ser entregue (usado ao encerrar o processo)
+
+        Returns:
+            bool: True se tudo foi entregue dentro do prazo
+        """
+        try:
+            laco.executar(asyncio.wait_for(self._aguardar_vazia(), timeout))
+            return True
+        except Exception:
+            print("⚠️  Fila do Telegram não foi totalmente entregue antes de encerrar")
+            return False
+
+
+_fila = None
+
+
+def fila_compartilhada():
+    """
+    Fila de envio única do processo (usa o notificador compartilhado)
+
+    Returns:
+        FilaEnvio: Fila criada no primeiro uso; entregue antes de o processo encerrar
+    """
+    global _fila
+    with _lock_notificador:
+        if _fila is None:
+            _fila = FilaEnvio(notificador_compartilhado())
+            # Registrado depois de laco.encerrar: o atexit roda na ordem inversa
+            atexit.register(_fila.esvaziar)
+        return _fila
+
+
 def run_async(coro):
     """
     Helper para executar funções async de forma síncrona
     
+    A coroutine roda no loop persistente do processo (ver LacoAssincrono)
+    
     Args:
         coro: Coroutine a ser executada
     
     Returns:
         Resultado da coroutine
     """
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(coro)
+    return laco.executar(coro)
 
 
 # Exemplo de uso
@@ -0,0 +1,46 @@
+"""Testes do índice de regras dos assinantes"""
+import unittest
+
+from assinantes import IndiceRegras, Regra, TODA_WATCHLIST
+from estado_alertas import ACIMA, ABAIXO
+
+
+def _ids(regras):
+    return sorted(r.id for r in regras)
+
+
+class TestIndiceRegras(unittest.TestCase):
+
+    def setUp(self):
+        regras = [
+            Regra(1, 'a', 'MXRF11.SA', 'dy', ACIMA, 10.0),
+            Regra(2, 'a', 'MXRF11.SA', 'dy', ACIMA, 12.0),
+            Regra(3, 'b', 'MXRF11.SA', 'dy', ABAIXO, 8.0),
+            Regra(4, 'b', 'MXRF11.SA', 'pvp', ABAIXO, 0.9),
+            Regra(5, 'c', TODA_WATCHLIST, 'dy', ACIMA, 11.0),
+        ]
+        watchlists = {'c': {'HGLG11.SA', 'MXRF11.SA'}}
+        self.indice = IndiceRegras(regras, watchlists)
+
+    def test_limites_inclusivos(self):
+        self.assertEqual(_ids(self.indice.disparadas('MXRF11.SA', {'dy': 10.0})), [1])
+        self.assertEqual(_ids(self.indice.disparadas('MXRF11.SA', {'dy': 12.0})), [1, 2, 5])
+        self.assertEqual(_ids(self.indice.disparadas('MXRF11.SA', {'dy': 8.0})), [3])
+        self.assertEqual(_ids(self.indice.disparadas('MXRF11.SA', {'dy': 9.0})), [])
+
+    def test_watchlist_inteira(self):
+        self.assertIn('HGLG11.SA', self.indice)
+        self.assertEqual(_ids(self.indice.disparadas('HGLG11.SA', {'dy': 11.5})), [5])
+        self.assertNotIn('KNRI11.SA', self.indice)
+        self.assertEqual(self.indice.total, 6)
+
+    def test_campo_ausente_ou_nan_nao_dispara(self):
+        self.assertEqual(_ids(self.indice.disparadas('MXRF11.SA', {'dy': None, 'pvp': 0.85})), [4])
+        self.assertEqual(self.indice.disparadas('MXRF11.SA', {'dy': float('nan'), 'pvp': float('nan')}), [])
+
+    def test_ticker_sem_regras(self):
+        self.assertEqual(self.indice.disparadas('KNRI11.SA', {'dy': 50.0}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
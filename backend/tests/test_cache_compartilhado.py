@@ -0,0 +1,65 @@
+"""Testes do despejo do cache local (LRU segmentado com orçamento de bytes)"""
+import time
+import unittest
+
+from cache_compartilhado import CacheLocal, SOBRECARGA_ENTRADA
+
+VALOR = b'x' * 800
+
+
+class TestCacheLocal(unittest.TestCase):
+
+    def setUp(self):
+        # Cabem ~10 entradas de VALOR
+        self.tamanho = CacheLocal._tamanho('chave:00', VALOR)
+        self.cache = CacheLocal(limite_bytes=self.tamanho * 10, rotulo='teste')
+
+    def test_respeita_o_orcamento(self):
+        for i in range(50):
+            self.cache.guardar(f'chave:{i:02d}', VALOR, ttl=60)
+            self.assertLessEqual(self.cache.bytes_usados, self.cache.limite_bytes)
+        self.assertEqual(len(self.cache), 10)
+        # As mais antigas saíram primeiro
+        self.assertIsNone(self.cache.obter('chave:00'))
+        self.assertEqual(self.cache.obter('chave:49'), VALOR)
+
+    def test_varredura_nao_expulsa_entradas_lidas_de_novo(self):
+        self.cache.guardar('chave:quente', VALOR, ttl=60)
+        self.assertEqual(self.cache.obter('chave:quente'), VALOR)  # Promovida ao protegido
+        for i in range(100):
+            self.cache.guardar(f'chave:{i:02d}', VALOR, ttl=60)
+        self.assertEqual(self.cache.obter('chave:quente'), VALOR)
+
+    def test_expirada_nao_e_devolvida(self):
+        self.cache.guardar('chave:00', VALOR, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.obter('chave:00'))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.bytes_usados, 0)
+
+    def test_entrada_grande_demais_nao_e_guardada(self):
+        self.cache.guardar('grande', b'x' * self.cache.limite_bytes, ttl=60)
+        self.assertIsNone(self.cache.obter('grande'))
+        self.assertEqual(self.cache.bytes_usados, 0)
+
+    def test_substituir_nao_duplica_os_bytes(self):
+        self.cache.guardar('chave:00', VALOR, ttl=60)
+        self.cache.guardar('chave:00', VALOR, ttl=60)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.bytes_usados, self.tamanho)
+        self.assertGreater(self.tamanho, len(VALOR) + SOBRECARGA_ENTRADA - 1)
+
+    def test_snapshot_mantem_a_expiracao_original(self):
+        self.cache.guardar('chave:00', VALOR, ttl=60)
+        self.cache.guardar('chave:01', VALOR, ttl=0.01)
+        time.sleep(0.02)
+        estado = self.cache.exportar_estado()
+        self.assertEqual(list(estado), ['chave:00'])
+
+        outro = CacheLocal(limite_bytes=self.cache.limite_bytes, rotulo='teste')
+        self.assertEqual(outro.importar_estado(estado), 1)
+        self.assertEqual(outro.obter('chave:00'), VALOR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Testes do calendário de pregões da B3 e do agendador do monitor"""
+import unittest
+from datetime import date, datetime, time as dt_time, timedelta
+
+from calendario_pregao import (
+    CalendarioB3, AgendadorPregao, FUSO_B3, domingo_de_pascoa, feriados_b3,
+)
+
+
+def _momento(ano, mes, dia, hora=12, minuto=0):
+    return datetime(ano, mes, dia, hora, minuto, tzinfo=FUSO_B3)
+
+
+class TestFeriados(unittest.TestCase):
+
+    def test_domingo_de_pascoa(self):
+        self.assertEqual(domingo_de_pascoa(2024), date(2024, 3, 31))
+        self.assertEqual(domingo_de_pascoa(2025), date(2025, 4, 20))
+        self.assertEqual(domingo_de_pascoa(2026), date(2026, 4, 5))
+
+    def test_feriados_moveis_de_2025(self):
+        feriados = feriados_b3(2025)
+        self.assertEqual(feriados[date(2025, 3, 3)], 'Carnaval')
+        self.assertEqual(feriados[date(2025, 3, 4)], 'Carnaval')
+        self.assertEqual(feriados[date(2025, 4, 18)], 'Sexta-feira Santa')
+        self.assertEqual(feriados[date(2025, 6, 19)], 'Corpus Christi')
+
+    def test_feriados_fixos_e_fim_de_ano(self):
+        feriados = feriados_b3(2025)
+        for dia in (date(2025, 1, 1), date(2025, 4, 21), date(2025, 12, 24), date(2025, 12, 31)):
+            self.assertIn(dia, feriados)
+
+    def test_consciencia_negra_a_partir_de_2024(self):
+        self.assertNotIn(date(2023, 11, 20), feriados_b3(2023))
+        self.assertIn(date(2024, 11, 20), feriados_b3(2024))
+
+
+class TestCalendarioB3(unittest.TestCase):
+
+    def setUp(self):
+        self.calendario = CalendarioB3(abertura=dt_time(10), fechamento=dt_time(17))
+
+    def test_fim_de_semana_e_feriado_sem_pregao(self):
+        self.assertIsNone(self.calendario.sessao(date(2025, 3, 8)))   # sábado
+        self.assertIsNone(self.calendario.sessao(date(2025, 4, 18)))  # Sexta-feira Santa
+        self.assertIsNotNone(self.calendario.sessao(date(2025, 4, 17)))
+
+    def test_quarta_feira_de_cinzas_abre_as_13h(self):
+        abertura, fechamento = self.calendario.sessao(date(2025, 3, 5))
+        self.assertEqual(abertura.time(), dt_time(13))
+        self.assertEqual(fechamento.time(), dt_time(17))
+
+    def test_em_pregao(self):
+        self.assertTrue(self.calendario.em_pregao(_momento(2025, 3, 6, 10, 0)))
+        self.assertFalse(self.calendario.em_pregao(_momento(2025, 3, 6, 17, 0)))
+        self.assertFalse(self.calendario.em_pregao(_momento(2025, 3, 5, 11, 0)))  # cinzas, antes das 13h
+
+    def test_proximo_pregao_pula_fim_de_semana_e_feriado(self):
+        # Quinta-feira santa à noite: sexta é feriado e segunda (21/04) é Tiradentes
+        abertura, _ = self.calendario.proximo_pregao(_momento(2025, 4, 17, 18))
+        self.assertEqual(abertura, _momento(2025, 4, 22, 10))
+
+    def test_proximo_pregao_durante_a_sessao_e_a_propria(self):
+        abertura, _ = self.calendario.proximo_pregao(_momento(2025, 3, 6, 15))
+        self.assertEqual(abertura, _momento(2025, 3, 6, 10))
+
+
+class TestAgendadorPregao(unittest.TestCase):
+
+    def setUp(self):
+        self.agendador = AgendadorPregao(
+            lambda: None, CalendarioB3(abertura=dt_time(10), fechamento=dt_time(17)),
+            cadencia_abertura=5, cadencia_sessao=60, cadencia_fechamento=10,
+            janela_abertura=15, janela_fechamento=30,
+        )
+
+    def test_grade_por_fase(self):
+        abertura, fechamento = _momento(2025, 3, 6, 10), _momento(2025, 3, 6, 17)
+        horarios = [h.strftime('%H:%M') for h in self.agendador.horarios(abertura, fechamento)]
+        self.assertEqual(horarios[:4], ['10:00', '10:05', '10:10', '10:15'])
+        self.assertIn('16:30', horarios)  # Entra na fase de fechamento no horário exato
+        self.assertEqual(horarios[-3:], ['16:40', '16:50', '17:00'])
+
+    def test_proxima_execucao_depois_do_fechamento(self):
+        proxima = self.agendador.proxima_execucao(_momento(2025, 3, 7, 17, 1))  # sexta
+        self.assertEqual(proxima, _momento(2025, 3, 10, 10))
+
+    def test_cadencia_zero_e_rejeitada(self):
+        with self.assertRaises(ValueError):
+            AgendadorPregao(lambda: None, cadencia_sessao=0)
+
+    def test_grade_sempre_avanca(self):
+        abertura = _momento(2025, 3, 6, 10)
+        horarios = list(self.agendador.horarios(abertura, abertura + timedelta(hours=7)))
+        self.assertEqual(horarios, sorted(set(horarios)))
+
+
+if __name__ == '__main__':
+    unittest.main()
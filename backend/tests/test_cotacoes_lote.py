@@ -0,0 +1,94 @@
+"""Testes da rota /api/cotacoes (séries de vários FIIs alinhadas por data)"""
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import app
+import fontes_dados
+from armazem_cotacoes import ArmazemCotacoes, normalizar_base_100
+
+
+def _download_falso(fechamentos):
+    """download() que devolve colunas (Close, ticker) como o yfinance com group_by='column'"""
+    def download(tickers, **kwargs):
+        presentes = [t for t in tickers if t in fechamentos]
+        if not presentes:
+            return pd.DataFrame()
+        dados = pd.DataFrame({t: fechamentos[t] for t in presentes})
+        dados.columns = pd.MultiIndex.from_product([['Close'], dados.columns])
+        return dados
+    return mock.Mock(side_effect=download)
+
+
+# Horários distintos no mesmo dia (fuso e pregões diferentes) e um pregão faltante em HGLG11
+MXRF = pd.Series([10.0, 10.5, 11.0], index=pd.DatetimeIndex(
+    ['2025-03-05 13:00', '2025-03-06 13:00', '2025-03-07 13:00']).tz_localize('America/Sao_Paulo'))
+HGLG = pd.Series([160.0, 168.0], index=pd.DatetimeIndex(
+    ['2025-03-05 16:00', '2025-03-07 16:00']).tz_localize('UTC'))
+
+
+class TestCotacoesLote(unittest.TestCase):
+
+    def setUp(self):
+        self.download = _download_falso({'MXRF11.SA': MXRF, 'HGLG11.SA': HGLG})
+        self.patches = [
+            mock.patch.object(app, 'armazem', ArmazemCotacoes()),
+            mock.patch.object(fontes_dados, 'download', self.download),
+        ]
+        for patch in self.patches:
+            patch.start()
+        app.limpar_caches()
+        self.cliente = app.app.test_client()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def test_series_alinhadas_por_data(self):
+        dados = self.cliente.get('/api/cotacoes?tickers=mxrf11,HGLG11.SA,mxrf11&periodo=1mo').get_json()
+        self.assertEqual(dados['tickers'], ['MXRF11.SA', 'HGLG11.SA'])
+        self.assertEqual(dados['datas'], ['2025-03-05', '2025-03-06', '2025-03-07'])
+        self.assertEqual(dados['series']['MXRF11.SA'], [10.0, 10.5, 11.0])
+        self.assertEqual(dados['series']['HGLG11.SA'], [160.0, None, 168.0])
+
+    def test_um_unico_download_e_depois_o_armazem(self):
+        self.cliente.get('/api/cotacoes?tickers=MXRF11,HGLG11&periodo=1mo')
+        self.assertEqual(self.download.call_count, 1)
+        self.assertEqual(sorted(self.download.call_args[0][0]), ['HGLG11.SA', 'MXRF11.SA'])
+
+        # Outra ordem (outra URL): servida do armazém, sem novo download
+        self.cliente.get('/api/cotacoes?tickers=HGLG11,MXRF11&periodo=1mo')
+        self.assertEqual(self.download.call_count, 1)
+
+    def test_normalizacao_base_100(self):
+        dados = self.cliente.get('/api/cotacoes?tickers=MXRF11,HGLG11&periodo=1mo&normalizar=true').get_json()
+        self.assertTrue(dados['normalizado'])
+        np.testing.assert_allclose(dados['series']['MXRF11.SA'], [100.0, 105.0, 110.0])
+        self.assertEqual(dados['series']['HGLG11.SA'][1], None)
+        np.testing.assert_allclose(dados['series']['HGLG11.SA'][::2], [100.0, 105.0])
+
+    def test_ausentes_e_erros(self):
+        dados = self.cliente.get('/api/cotacoes?tickers=MXRF11,XXXX11&periodo=1mo').get_json()
+        self.assertEqual(dados['ausentes'], ['XXXX11.SA'])
+        self.assertEqual(self.cliente.get('/api/cotacoes?periodo=1mo').status_code, 400)
+        self.assertEqual(self.cliente.get('/api/cotacoes?tickers=MXRF11&periodo=2h').status_code, 400)
+        self.assertEqual(self.cliente.get('/api/cotacoes?tickers=XXXX11&periodo=1y').status_code, 404)
+
+
+class TestNormalizarBase100(unittest.TestCase):
+
+    def test_parte_do_primeiro_valor_disponivel(self):
+        tabela = pd.DataFrame({'A': [np.nan, 20.0, 30.0], 'B': [4.0, np.nan, 5.0]})
+        normalizada = normalizar_base_100(tabela)
+        self.assertTrue(np.isnan(normalizada['A'][0]))
+        self.assertEqual(normalizada['A'].tolist()[1:], [100.0, 150.0])
+        self.assertEqual(normalizada['B'][2], 125.0)
+
+    def test_tabela_vazia(self):
+        self.assertTrue(normalizar_base_100(pd.DataFrame()).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Testes do disjuntor (circuit breaker)"""
+import time
+import unittest
+
+from disjuntor import Disjuntor, CircuitoAberto, FECHADO, ABERTO
+
+
+def _falhar():
+    raise ConnectionError('fonte fora do ar')
+
+
+class TestDisjuntor(unittest.TestCase):
+
+    def setUp(self):
+        self.disjuntor = Disjuntor('teste', falhas_para_abrir=2, limite_lento=1.0, tempo_aberto=0.05)
+
+    def _abrir(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.disjuntor.chamar(_falhar)
+
+    def test_abre_apos_falhas_consecutivas(self):
+        self._abrir()
+        self.assertEqual(self.disjuntor.estado, ABERTO)
+        self.assertTrue(self.disjuntor.rejeitando())
+        with self.assertRaises(CircuitoAberto):
+            self.disjuntor.chamar(lambda: 1)
+
+    def test_sucesso_zera_as_falhas(self):
+        with self.assertRaises(ConnectionError):
+            self.disjuntor.chamar(_falhar)
+        self.assertEqual(self.disjuntor.chamar(lambda: 1), 1)
+        with self.assertRaises(ConnectionError):
+            self.disjuntor.chamar(_falhar)
+        self.assertEqual(self.disjuntor.estado, FECHADO)
+
+    def test_sondagem_fecha_o_circuito(self):
+        self._abrir()
+        time.sleep(0.06)
+        self.assertFalse(self.disjuntor.rejeitando())
+        self.assertEqual(self.disjuntor.chamar(lambda: 'ok'), 'ok')
+        self.assertEqual(self.disjuntor.estado, FECHADO)
+
+    def test_sondagem_com_falha_reabre(self):
+        self._abrir()
+        time.sleep(0.06)
+        with self.assertRaises(ConnectionError):
+            self.disjuntor.chamar(_falhar)
+        self.assertEqual(self.disjuntor.estado, ABERTO)
+        self.assertTrue(self.disjuntor.rejeitando())
+
+    def test_uma_sondagem_por_vez(self):
+        self._abrir()
+        time.sleep(0.06)
+        self.assertTrue(self.disjuntor._liberar())
+        self.assertFalse(self.disjuntor._liberar())
+        self.assertTrue(self.disjuntor.rejeitando())
+
+    def test_chamada_lenta_conta_como_falha(self):
+        self.disjuntor.registrar_sucesso(duracao=2.0)
+        self.disjuntor.registrar_sucesso(duracao=2.0)
+        self.assertEqual(self.disjuntor.estado, ABERTO)
+
+
+if __name__ == '__main__':
+    unittest.main()
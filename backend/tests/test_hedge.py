@@ -0,0 +1,108 @@
+"""Testes do histórico com requisições especulativas (fontes_dados.historico_com_hedge)"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import fontes_dados
+
+ATRASO = 0.05
+
+
+class FonteFalsa:
+    """historico() com atraso e resposta por período, contando chamadas simultâneas"""
+
+    def __init__(self, respostas):
+        self.respostas = respostas  # period -> (segundos, 'dados' | 'vazio' | 'erro')
+        self.chamadas = []
+        self.em_voo = 0
+        self.max_em_voo = 0
+        self._lock = threading.Lock()
+
+    def historico(self, ticker, **kwargs):
+        periodo = kwargs['period']
+        with self._lock:
+            self.chamadas.append(periodo)
+            self.em_voo += 1
+            self.max_em_voo = max(self.max_em_voo, self.em_voo)
+        try:
+            segundos, resposta = self.respostas[periodo]
+            time.sleep(segundos)
+            if resposta == 'erro':
+                raise ConnectionError(f'falha em {periodo}')
+            if resposta == 'vazio':
+                return pd.DataFrame(columns=['Close'])
+            return pd.DataFrame({'Close': [10.0]}, index=[pd.Timestamp('2025-01-02')]).assign(periodo=periodo)
+        finally:
+            with self._lock:
+                self.em_voo -= 1
+
+
+class TestHistoricoComHedge(unittest.TestCase):
+
+    def _executar(self, respostas, tentativas, reserva=None):
+        fonte = FonteFalsa(respostas)
+        with mock.patch.object(fontes_dados, 'historico', fonte.historico), \
+                mock.patch.object(fontes_dados, '_atraso_hedge', lambda kwargs: ATRASO):
+            resultado = fontes_dados.historico_com_hedge('MXRF11.SA', tentativas, reserva)
+        return resultado, fonte
+
+    def test_primeira_rapida_nao_lanca_especulativa(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}]
+        (hist, usada), fonte = self._executar({'a': (0, 'dados'), 'b': (0, 'dados')}, tentativas)
+        self.assertEqual(usada, 0)
+        self.assertEqual(fonte.chamadas, ['a'])
+
+    def test_primeira_lenta_vence_a_especulativa(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}, {'period': 'c'}]
+        respostas = {'a': (0.5, 'dados'), 'b': (0, 'dados'), 'c': (0, 'dados')}
+        (hist, usada), fonte = self._executar(respostas, tentativas)
+        self.assertEqual(usada, 1)
+        # Com um resultado em mãos, a terceira (menos prioritária) não é lançada
+        self.assertEqual(fonte.chamadas, ['a', 'b'])
+
+    def test_no_maximo_uma_especulativa_em_voo(self):
+        tentativas = [{'period': p} for p in 'abcd']
+        respostas = {p: (0.3, 'dados') for p in 'abcd'}
+        (hist, usada), fonte = self._executar(respostas, tentativas)
+        self.assertEqual(usada, 0)
+        self.assertLessEqual(fonte.max_em_voo, 2)
+
+    def test_vazia_libera_a_proxima_na_hora(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}]
+        inicio = time.monotonic()
+        (hist, usada), fonte = self._executar({'a': (0, 'vazio'), 'b': (0, 'dados')}, tentativas)
+        self.assertEqual(usada, 1)
+        self.assertLess(time.monotonic() - inicio, ATRASO)
+
+    def test_reserva_so_depois_de_todas_terminarem(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}]
+        respostas = {'a': (0.1, 'vazio'), 'b': (0, 'vazio'), '5d': (0, 'dados')}
+        (hist, usada), fonte = self._executar(respostas, tentativas, reserva={'period': '5d'})
+        self.assertEqual(usada, len(tentativas))
+        self.assertEqual(fonte.chamadas[-1], '5d')
+        self.assertEqual(fonte.chamadas.count('5d'), 1)
+
+    def test_reserva_nao_usada_quando_uma_tentativa_responde(self):
+        tentativas = [{'period': 'a'}]
+        (hist, usada), fonte = self._executar({'a': (0.2, 'dados'), '5d': (0, 'dados')}, tentativas,
+                                              reserva={'period': '5d'})
+        self.assertEqual(usada, 0)
+        self.assertNotIn('5d', fonte.chamadas)
+
+    def test_todas_vazias_sem_reserva(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}]
+        (hist, usada), _ = self._executar({'a': (0, 'vazio'), 'b': (0, 'vazio')}, tentativas)
+        self.assertIsNone(usada)
+        self.assertTrue(hist.empty)
+
+    def test_todas_com_erro_propagam_o_ultimo(self):
+        tentativas = [{'period': 'a'}, {'period': 'b'}]
+        with self.assertRaises(ConnectionError):
+            self._executar({'a': (0, 'erro'), 'b': (0, 'erro')}, tentativas)
+
+
+if __name__ == '__main__':
+    unittest.main()
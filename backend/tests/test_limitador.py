@@ -0,0 +1,73 @@
+"""Testes do limitador de taxa (token bucket)"""
+import threading
+import unittest
+
+from limitador import BaldeTokens, LimitadorTaxa, EsperaCancelada
+
+
+class TestBaldeTokens(unittest.TestCase):
+
+    def test_rajada_sem_espera_e_divida_paga_com_espera(self):
+        balde = BaldeTokens(taxa=10, capacidade=2)
+        self.assertEqual(balde.reservar(), 0)
+        self.assertEqual(balde.reservar(), 0)
+        # Terceiro token: 1 / 10 req/s de espera (tolerância para a reposição entre as chamadas)
+        self.assertAlmostEqual(balde.reservar(), 0.1, delta=0.01)
+
+    def test_custo_maior_que_um(self):
+        balde = BaldeTokens(taxa=10, capacidade=5)
+        self.assertEqual(balde.reservar(custo=5), 0)
+        self.assertAlmostEqual(balde.reservar(custo=3), 0.3, delta=0.01)
+
+    def test_espera_cancelada_devolve_os_tokens(self):
+        balde = BaldeTokens(taxa=1, capacidade=1)
+        balde.reservar()
+        cancelado = threading.Event()
+        threading.Timer(0.05, cancelado.set).start()
+        with self.assertRaises(EsperaCancelada):
+            balde.aguardar(cancelado=cancelado)
+        # O token devolvido não fica como dívida: a próxima reserva espera ~1 token, não ~2
+        self.assertLess(balde.reservar(), 1.0)
+
+    def test_cancelado_antes_nao_reserva(self):
+        balde = BaldeTokens(taxa=1, capacidade=1)
+        cancelado = threading.Event()
+        cancelado.set()
+        with self.assertRaises(EsperaCancelada):
+            balde.aguardar(cancelado=cancelado)
+        self.assertEqual(balde.reservar(), 0)
+
+    def test_limite_excedido_reduz_a_taxa_e_sucessos_recuperam(self):
+        balde = BaldeTokens(taxa=4, capacidade=1)
+        balde.registrar_limite_excedido(retry_after=0.01)
+        self.assertEqual(balde.taxa, 2)
+        for _ in range(20):
+            balde.registrar_sucesso()
+        self.assertEqual(balde.taxa, 4)
+
+
+class TestLimitadorTaxa(unittest.TestCase):
+
+    def test_processos_dividem_taxa_e_rajada(self):
+        limitador = LimitadorTaxa(limites={'yahoo': (2.0, 5)}, processos=4)
+        balde = limitador.balde('yahoo')
+        self.assertEqual(balde.taxa, 0.5)
+        self.assertEqual(balde.capacidade, 1.25)
+
+    def test_rajada_da_frota_nao_passa_da_configurada(self):
+        processos = 8
+        baldes = [LimitadorTaxa(limites={'yahoo': (2.0, 5)}, processos=processos).balde('yahoo')
+                  for _ in range(processos)]
+        self.assertAlmostEqual(sum(b.capacidade for b in baldes), 5)
+        # Cada processo com 5/8 de token: nenhuma requisição sai sem espera
+        self.assertTrue(all(b.reservar() > 0 for b in baldes))
+
+    def test_host_sem_limite_usa_o_padrao(self):
+        limitador = LimitadorTaxa(limites={}, limite_padrao=(3.0, 6))
+        balde = limitador.balde('exemplo.com')
+        self.assertEqual((balde.taxa, balde.capacidade), (3.0, 6))
+        self.assertIs(limitador.balde('exemplo.com'), balde)
+
+
+if __name__ == '__main__':
+    unittest.main()
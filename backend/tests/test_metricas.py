@@ -0,0 +1,28 @@
+"""Testes das métricas no formato Prometheus"""
+import unittest
+
+from metricas import Histograma
+
+
+class TestHistograma(unittest.TestCase):
+
+    def test_faixas_cumulativas(self):
+        histograma = Histograma('teste_segundos', 'Teste', limites=(0.1, 1))
+        for valor in (0.05, 0.1, 0.5, 5):
+            histograma.observar(valor)
+        linhas = histograma.exportar().splitlines()[2:]
+        self.assertEqual([linha.split()[-1] for linha in linhas[:3]], ['2', '3', '4'])
+        self.assertEqual(linhas[-1], 'teste_segundos_count 4')
+
+    def test_valores_nao_finitos_sao_ignorados(self):
+        histograma = Histograma('teste_segundos', 'Teste', limites=(1,))
+        histograma.observar(0.5)
+        histograma.observar(float('nan'))
+        histograma.observar(float('inf'))
+        linhas = histograma.exportar().splitlines()
+        self.assertIn('teste_segundos_sum 0.5', linhas)
+        self.assertIn('teste_segundos_count 1', linhas)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Testes do quadro colunar de cotações"""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from quadro_cotacoes import QuadroCotacoes
+
+
+def _atualizar(quadro, ticker, momento, variacao=0.0):
+    with mock.patch('quadro_cotacoes.time.time', return_value=momento):
+        quadro.atualizar(ticker, 10.0, variacao)
+
+
+class TestQuadroCotacoes(unittest.TestCase):
+
+    def test_teto_despeja_o_mais_desatualizado(self):
+        quadro = QuadroCotacoes(capacidade=2, max_tickers=3)
+        for momento, ticker in enumerate(['A.SA', 'B.SA', 'C.SA']):
+            _atualizar(quadro, ticker, 100 + momento)
+        _atualizar(quadro, 'A.SA', 200)
+        _atualizar(quadro, 'D.SA', 201)
+        self.assertNotIn('B.SA', quadro)
+        self.assertEqual(len(quadro), 3)
+        self.assertEqual(quadro.tickers(quadro.linhas(['D.SA'])), ['D.SA'])
+
+    def test_retrato_nao_ve_despejos_posteriores(self):
+        quadro = QuadroCotacoes(max_tickers=2)
+        _atualizar(quadro, 'A.SA', 100, variacao=1.0)
+        _atualizar(quadro, 'B.SA', 101, variacao=2.0)
+        retrato = quadro.retrato()
+        linhas = retrato.linhas(['A.SA'])
+
+        _atualizar(quadro, 'C.SA', 102, variacao=-5.0)  # Toma a linha de A.SA no quadro vivo
+        self.assertEqual(quadro.tickers(linhas), ['C.SA'])
+        self.assertEqual(retrato.registros(linhas)[0]['ticker'], 'A.SA')
+        self.assertEqual(retrato.registros(linhas)[0]['variacao'], 1.0)
+
+    def test_retrato_e_somente_leitura(self):
+        quadro = QuadroCotacoes()
+        self.assertEqual(len(quadro.retrato()), 0)
+        _atualizar(quadro, 'A.SA', 100)
+        retrato = quadro.retrato()
+        with self.assertRaises(ValueError):
+            retrato.coluna('preco')[0] = 1.0
+        self.assertEqual(retrato.ranking('preco', 1).tolist(), [0])
+
+    def test_volume_nan_vira_zero(self):
+        quadro = QuadroCotacoes()
+        quadro.atualizar('A.SA', 10.0, 0.0, volume=None)
+        self.assertEqual(quadro.registros()[0]['volume'], 0)
+        self.assertTrue(np.isnan(quadro.coluna('volume')[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
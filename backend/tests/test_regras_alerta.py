@@ -0,0 +1,73 @@
+"""Testes do compilador e do motor de regras de alerta"""
+import unittest
+
+import numpy as np
+
+from benchmark_regras import montar_regras, montar_quadro, avaliar_em_laco
+from regras_alerta import (
+    RegraAlerta, MotorRegras, ContextoColunar, COLUNAS_NUMERICAS, interpretar_regras,
+)
+from setores_fiis import get_setor_info
+
+
+def _contexto(**valores):
+    """Contexto só com colunas numéricas (as demais ficam NaN)"""
+    tamanho = len(next(iter(valores.values())))
+    colunas = {c: np.array(valores.get(c, [np.nan] * tamanho), dtype=float) for c in COLUNAS_NUMERICAS}
+    return ContextoColunar([f'T{i}11.SA' for i in range(tamanho)], colunas)
+
+
+class TestMotorRegras(unittest.TestCase):
+
+    def test_igual_ao_laco_python(self):
+        regras = montar_regras(40)
+        motor = MotorRegras(regras)
+        quadro, tickers = montar_quadro(300)
+        contexto = ContextoColunar.do_quadro(quadro, tickers)
+
+        registros = []
+        for registro in quadro.registros():
+            info = get_setor_info(registro['ticker'])
+            registro['pvp'] = float('nan') if registro['pvp'] is None else registro['pvp']
+            registros.append({**registro, 'setor': info['setor'], 'tipo': info['tipo']})
+        vetorizadas = {nome: np.flatnonzero(m).tolist() for nome, m in motor.mascaras(contexto).items()}
+        self.assertEqual(vetorizadas, avaliar_em_laco(regras, registros))
+
+    def test_negacao_mantem_nan_falso(self):
+        motor = MotorRegras([RegraAlerta('farto', 'not dy < 8'), RegraAlerta('diferente', 'dy != 8')])
+        mascaras = motor.mascaras(_contexto(dy=[7.0, 9.0, np.nan]))
+        self.assertEqual(mascaras['farto'].tolist(), [False, True, False])
+        self.assertEqual(mascaras['diferente'].tolist(), [True, True, False])
+
+    def test_histerese_mantem_perto_do_limite(self):
+        motor = MotorRegras([RegraAlerta('alta', 'variacao >= 2')], histereses={'variacao': 0.5})
+        linhas, mantidas = motor.avaliar(_contexto(variacao=[2.5, 1.8, 1.2, 3.0]))['alta']
+        self.assertEqual(linhas.tolist(), [3, 0])  # Mais extremas primeiro
+        self.assertEqual(mantidas.tolist(), [True, True, False, True])
+
+    def test_nomes_repetidos_rejeitados(self):
+        with self.assertRaises(ValueError):
+            MotorRegras([RegraAlerta('alta', 'variacao >= 2'), RegraAlerta('alta', 'variacao >= 3')])
+
+
+class TestInterpretarRegras(unittest.TestCase):
+
+    def test_le_varias_regras(self):
+        regras = interpretar_regras('barato: pvp < 0.9; farto: dy >= 12;')
+        self.assertEqual([r.nome for r in regras], ['barato', 'farto'])
+
+    def test_nomes_invalidos(self):
+        for texto in ('pvp < 0.9', 'meu alerta: pvp < 0.9', 'a: pvp < 1; a: dy > 1'):
+            with self.subTest(texto=texto), self.assertRaises(ValueError):
+                interpretar_regras(texto)
+        with self.assertRaises(ValueError):
+            interpretar_regras('alta: variacao >= 2', reservados=('alta',))
+
+    def test_expressao_invalida(self):
+        for expressao in ('__import__("os")', 'pvp < dy', 'preco.real > 1', 'coluna_nova > 1'):
+            with self.subTest(expressao=expressao), self.assertRaises(ValueError):
+                RegraAlerta('r', expressao)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Testes das consultas da série intradiária"""
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+from calendario_pregao import FUSO_B3
+from quadro_cotacoes import QuadroCotacoes
+from serie_intradiaria import SerieIntradiaria
+
+T0 = datetime(2025, 3, 6, 13, 0, tzinfo=FUSO_B3).timestamp()
+
+# (segundos depois de T0, ticker, preço)
+PONTOS = [
+    (0, 'AAAA11.SA', 10.0),
+    (60, 'AAAA11.SA', 11.0),
+    (60, 'BBBB11.SA', 20.0),
+    (120, 'AAAA11.SA', 12.0),
+    (180, 'BBBB11.SA', 22.0),
+]
+
+
+class TestDiaIntradiario(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        serie = SerieIntradiaria(self.diretorio, retencao_dias=0, habilitada=True)
+        quadro = QuadroCotacoes()
+        for segundos, ticker, preco in PONTOS:
+            with mock.patch('quadro_cotacoes.time.time', return_value=T0 + segundos):
+                quadro.atualizar(ticker, preco, 0.0)
+            serie.registrar(quadro, [ticker], momento=T0 + segundos)
+        self.dia = serie.dia(datetime.fromtimestamp(T0, FUSO_B3).date())
+        self.a, self.b = self.dia.codigos(['AAAA11.SA', 'BBBB11.SA'])[1]
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def _preco_ate(self, codigo, segundos):
+        posicoes = self.dia._ate(np.array([codigo]), T0 + segundos)
+        return self.dia._valores(posicoes, 'preco')[0]
+
+    def test_ate_antes_do_primeiro_ponto(self):
+        self.assertEqual(self.dia._ate(np.array([self.a]), T0 - 3600).tolist(), [-1])
+        # BBBB ainda não tinha cotação: a busca não pode devolver o ponto de AAAA
+        self.assertEqual(self.dia._ate(np.array([self.b]), T0 + 30).tolist(), [-1])
+        self.assertTrue(np.isnan(self._preco_ate(self.b, 30)))
+
+    def test_ate_inclui_o_instante_exato(self):
+        self.assertEqual(self._preco_ate(self.a, 0), 10.0)
+        self.assertEqual(self._preco_ate(self.a, 60), 11.0)
+        self.assertEqual(self._preco_ate(self.a, 59.9), 10.0)
+        self.assertEqual(self._preco_ate(self.b, 60), 20.0)
+
+    def test_ate_depois_do_ultimo_ponto(self):
+        self.assertEqual(self._preco_ate(self.a, 7200), 12.0)
+        self.assertEqual(self._preco_ate(self.b, 7200), 22.0)
+
+    def test_ate_com_broadcasting(self):
+        codigos = np.array([self.a, self.b])[:, None]
+        instantes = T0 + np.array([-1.0, 60.0, 200.0])[None, :]
+        posicoes = self.dia._ate(codigos, instantes)
+        self.assertEqual(posicoes.shape, (2, 3))
+        self.assertEqual(posicoes[:, 0].tolist(), [-1, -1])
+
+    def test_amostrar_ignora_ticker_ausente(self):
+        tickers, matriz = self.dia.amostrar([T0 + 90, T0 + 300], ['BBBB11.SA', 'ZZZZ11.SA'])
+        self.assertEqual(tickers, ['BBBB11.SA'])
+        self.assertEqual(matriz.tolist(), [[20.0, 22.0]])
+
+    def test_variacoes_na_janela(self):
+        resultado = self.dia.variacoes(janela=60, agora=T0 + 120, tickers=['AAAA11.SA', 'BBBB11.SA'])
+        self.assertAlmostEqual(resultado['variacao'][0], (12.0 / 11.0 - 1) * 100, places=4)
+        self.assertEqual(resultado['pontos'].tolist(), [2, 1])
+        self.assertEqual(resultado['desde'][0], T0 + 60)
+        self.assertEqual(resultado['ate'][0], T0 + 120)
+
+    def test_variacoes_com_ponto_inicial_antigo_demais(self):
+        resultado = self.dia.variacoes(janela=30, agora=T0 + 7200, tickers=['AAAA11.SA'], tolerancia=600)
+        self.assertTrue(np.isnan(resultado['variacao'][0]))
+        self.assertTrue(np.isnan(resultado['desde'][0]))
+        sem_limite = self.dia.variacoes(janela=30, agora=T0 + 7200, tickers=['AAAA11.SA'], tolerancia=None)
+        self.assertEqual(sem_limite['variacao'][0], 0.0)
+
+    def test_serie_de_um_ticker(self):
+        momentos, precos = self.dia.serie('AAAA11.SA')
+        self.assertEqual((momentos - T0).tolist(), [0.0, 60.0, 120.0])
+        self.assertEqual(precos.tolist(), [10.0, 11.0, 12.0])
+        self.assertEqual(len(self.dia.serie('ZZZZ11.SA')[0]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
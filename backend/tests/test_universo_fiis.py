@@ -0,0 +1,81 @@
+"""Testes do rodízio do universo de FIIs"""
+import unittest
+from unittest import mock
+
+from quadro_cotacoes import QuadroCotacoes
+from universo_fiis import RodizioUniverso
+
+UNIVERSO = [f'T{i:03d}11.SA' for i in range(200)]
+INICIO = 1_000_000.0
+CICLO = 60.0
+
+
+def _atualizar(quadro, tickers, momento, variacao=0.0):
+    with mock.patch('quadro_cotacoes.time.time', return_value=momento):
+        for ticker in tickers:
+            quadro.atualizar(ticker, 10.0, variacao)
+
+
+class TestRodizioUniverso(unittest.TestCase):
+
+    def setUp(self):
+        self.quadro = QuadroCotacoes()
+        self.rodizio = RodizioUniverso(UNIVERSO, fatias=10, idade_maxima=900, limiar_volatil=3.0, max_volateis=5)
+
+    def _ciclos(self, quantidade, inicio):
+        """Executa ciclos buscando (e gravando no quadro) o que cada plano pede"""
+        planos = []
+        for i in range(quantidade):
+            agora = inicio + i * CICLO
+            plano = self.rodizio.planejar(self.quadro, agora=agora)
+            _atualizar(self.quadro, plano['tickers'], agora)
+            planos.append(plano)
+        return planos
+
+    def test_fatias_cobrem_o_universo_sem_repetir(self):
+        tickers = [t for fatia in self.rodizio.fatias for t in fatia]
+        self.assertEqual(sorted(tickers), sorted(UNIVERSO))
+
+    def test_ticker_novo_nao_embaralha_as_fatias(self):
+        antes = {t: i for i, fatia in enumerate(self.rodizio.fatias) for t in fatia}
+        self.rodizio.definir_universo(UNIVERSO + ['NOVO11.SA'])
+        depois = {t: i for i, fatia in enumerate(self.rodizio.fatias) for t in fatia}
+        self.assertTrue(all(depois[t] == i for t, i in antes.items()))
+
+    def test_uma_volta_atualiza_todo_o_universo(self):
+        planos = self._ciclos(10, INICIO)
+        buscados = {t for plano in planos for t in plano['tickers']}
+        self.assertEqual(buscados, set(UNIVERSO))
+        self.assertEqual([p['fatia'] for p in planos], list(range(10)))
+
+    def test_nada_passa_da_idade_maxima(self):
+        self._ciclos(40, INICIO)
+        agora = INICIO + 40 * CICLO
+        self.assertLessEqual(self.rodizio.idade_maxima_atual(self.quadro, agora), 900)
+
+    def test_abertura_depois_de_uma_pausa_nao_busca_tudo(self):
+        self._ciclos(10, INICIO)
+        # Noite: a próxima sessão começa 16h depois, com o quadro inteiro velho
+        planos = self._ciclos(10, INICIO + 16 * 3600)
+        self.assertEqual([p['vencendo'] for p in planos], [0] * 10)
+        self.assertLess(max(p['total'] for p in planos), len(UNIVERSO) / 2)
+
+    def test_cotacao_velha_dentro_da_sessao_vence(self):
+        self._ciclos(12, INICIO)
+        # Um ticker que ficou para trás (ex.: falhou na sua fatia) entra como vencendo
+        _atualizar(self.quadro, [UNIVERSO[0]], INICIO - 3600)
+        plano = self.rodizio.planejar(self.quadro, agora=INICIO + 12 * CICLO)
+        self.assertIn(UNIVERSO[0], plano['tickers'])
+        self.assertGreaterEqual(plano['vencendo'], 1)
+
+    def test_prioritarios_e_volateis_primeiro(self):
+        _atualizar(self.quadro, UNIVERSO, INICIO)
+        _atualizar(self.quadro, UNIVERSO[5:7], INICIO, variacao=-4.0)
+        plano = self.rodizio.planejar(self.quadro, prioritarios=['t10011'], agora=INICIO + CICLO)
+        # Prioritários sem o sufixo .SA são normalizados
+        self.assertEqual(plano['tickers'][:3], ['T10011.SA', UNIVERSO[5], UNIVERSO[6]])
+        self.assertEqual(plano['prioritarios'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+"""
+Universo de FIIs monitorados e rodízio de atualização em fatias
+O universo vem de uma fonte configurável (UNIVERSO_FIIS): a lista de populares,
+os tickers de SETORES_FIIS, o universo da fonte de dados ativa (ex.: mercado
+sintético), um arquivo local ou uma URL com a lista de FIIs listados.
+
+Com centenas de tickers, cada ciclo do monitor não busca tudo: o universo é
+dividido em fatias atualizadas em rodízio, com prioridade para os tickers da
+watchlist e os mais voláteis, e nenhum ticker fica mais velho que
+UNIVERSO_IDADE_MAXIMA no quadro de cotações.
+"""
+import os
+import re
+import time
+import statistics
+import zlib
+from collections import deque
+
+import numpy as np
+from dotenv import load_dotenv
+
+import fontes_dados
+from setores_fiis import SETORES_FIIS
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# populares, setores, fonte, caminho de arquivo (um ticker por linha) ou URL
+UNIVERSO_FIIS = os.getenv('UNIVERSO_FIIS', 'populares')
+# Cópia local da última lista obtida por URL (usada se a URL falhar)
+UNIVERSO_FIIS_CACHE = os.getenv(
+    'UNIVERSO_FIIS_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universo_fiis.txt')
+)
+# Horas até recarregar a lista de uma URL
+UNIVERSO_ATUALIZACAO_HORAS = float(os.getenv('UNIVERSO_ATUALIZACAO_HORAS', '24'))
+
+# Fatias do rodízio: cada ciclo atualiza uma fatia além dos prioritários
+UNIVERSO_FATIAS = int(os.getenv('UNIVERSO_FATIAS', '4'))
+# Idade máxima (segundos) de qualquer cotação do quadro
+UNIVERSO_IDADE_MAXIMA = float(os.getenv('UNIVERSO_IDADE_MAXIMA', str(2 * 60 * 60)))
+# Variação absoluta (%) a partir da qual o ticker é atualizado em todo ciclo
+UNIVERSO_LIMIAR_VOLATIL = float(os.getenv('UNIVERSO_LIMIAR_VOLATIL', '1.0'))
+# Teto de tickers voláteis priorizados por ciclo (os de maior variação absoluta)
+UNIVERSO_MAX_VOLATEIS = int(os.getenv('UNIVERSO_MAX_VOLATEIS', '32'))
+
+# Código de FII na B3: 4 letras + 11 (ou outro sufixo de classe)
+PADRAO_TICKER = re.compile(r'\b([A-Z]{4}1[1-9])\b')
+
+
+def _normalizar(tickers):
+    """Tickers sem repetição, em maiúsculas e com o sufixo .SA"""
+    normalizados = (t.strip().upper() for t in tickers if t and t.strip())
+    return list(dict.fromkeys(t if t.endswith('.SA') else f'{t}.SA' for t in normalizados))
+
+
+def _extrair_tickers(texto):
+    return _normalizar(PADRAO_TICKER.findall(texto))
+
+
+def _ler_arquivo(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return _extrair_tickers(arquivo.read().upper())
+
+
+def _baixar_lista(url):
+    """
+    Lista de FIIs de uma URL (página HTML ou texto), com cópia em UNIVERSO_FIIS_CACHE
+
+    Returns:
+        list: Tickers encontrados ou None se a busca falhar
+    """
+    try:
+        if os.path.exists(UNIVERSO_FIIS_CACHE) and \
+                time.time() - os.path.getmtime(UNIVERSO_FIIS_CACHE) < UNIVERSO_ATUALIZACAO_HORAS * 60 * 60:
+            return _ler_arquivo(UNIVERSO_FIIS_CACHE)
+
+        resposta = fontes_dados.pagina(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=15)
+        if resposta.status_code != 200:
+            raise ValueError(f"HTTP {resposta.status_code}")
+        tickers = _extrair_tickers(resposta.text)
+        if not tickers:
+            raise ValueError("nenhum ticker na página")
+
+        with open(UNIVERSO_FIIS_CACHE, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('\n'.join(t.replace('.SA', '') for t in tickers) + '\n')
+        return tickers
+    except Exception as e:
+        print(f"⚠️  Erro ao baixar universo de FIIs de {url}: {str(e)}")
+        if os.path.exists(UNIVERSO_FIIS_CACHE):
+            print(f"  ↩️  Usando a cópia local {UNIVERSO_FIIS_CACHE}")
+            return _ler_arquivo(UNIVERSO_FIIS_CACHE)
+        return None
+
+
+def carregar_universo(populares, origem=UNIVERSO_FIIS):
+    """
+    Carrega a lista de FIIs a monitorar
+
+    Args:
+        populares (list): Lista padrão (e recurso se a origem falhar)
+        origem (str): populares, setores, fonte, caminho de arquivo ou URL
+
+    Returns:
+        list: Tickers com sufixo .SA (os populares sempre incluídos)
+    """
+    if origem == 'populares':
+        tickers = []
+    elif origem == 'setores':
+        tickers = _normalizar(SETORES_FIIS)
+    elif origem == 'fonte':
+        tickers = list(getattr(fontes_dados.fonte, 'universo', []))
+    elif origem.startswith(('http://', 'https://')):
+        tickers = _baixar_lista(origem) or []
+    else:
+        try:
+            tickers = _ler_arquivo(origem)
+        except OSError as e:
+            print(f"⚠️  Erro ao ler universo de FIIs de {origem}: {str(e)}")
+            tickers = []
+
+    universo = _normalizar(list(populares) + tickers)
+    print(f"🌐 Universo de FIIs ({origem}): {len(universo)} tickers")
+    return universo
+
+
+class RodizioUniverso:
+    """
+    Escolhe, a cada ciclo, quais tickers do universo buscar
+
+    Um ciclo busca os prioritários (watchlist e voláteis), os tickers que
+    passariam da idade máxima antes do próximo ciclo e a próxima fatia do
+    rodízio. A fatia de cada ticker vem de um hash estável do código, então
+    um ticker novo no universo não embaralha as demais fatias.
+
+    Depois de uma pausa (noite, fim de semana) todo o quadro está velho; as
+    cotações anteriores à pausa não contam como vencendo até o rodízio dar
+    uma volta completa, senão o primeiro ciclo do pregão buscaria o universo
+    inteiro de uma vez.
+    """
+
+    def __init__(self, universo, fatias=UNIVERSO_FATIAS, idade_maxima=UNIVERSO_IDADE_MAXIMA,
+                 limiar_volatil=UNIVERSO_LIMIAR_VOLATIL, max_volateis=UNIVERSO_MAX_VOLATEIS):
+        """
+        Args:
+            universo (list): Tickers monitorados
+            fatias (int): Quantidade de fatias do rodízio
+            idade_maxima (float): Idade máxima (segundos) de uma cotação no quadro
+            limiar_volatil (float): Variação absoluta (%) que torna o ticker prioritário
+            max_volateis (int): Teto de voláteis priorizados por ciclo
+        """
+        self.idade_maxima = idade_maxima
+        self.limiar_volatil = limiar_volatil
+        self.max_volateis = max_volateis
+        self.quantidade_fatias = max(1, fatias)
+        self.definir_universo(universo)
+        self._proxima = 0
+        self._ultimo_ciclo = None
+        self._abertura = None  # Primeiro ciclo depois da última pausa
+        self._ciclos_desde_abertura = 0
+        self._intervalos = deque(maxlen=8)  # Intervalos recentes entre ciclos (segundos)
+
+    def definir_universo(self, universo):
+        """Troca a lista de tickers, mantendo a posição do rodízio"""
+        self.universo = list(universo)
+        self.fatias = [[] for _ in range(self.quantidade_fatias)]
+        for ticker in self.universo:
+            self.fatias[zlib.crc32(ticker.encode('utf-8')) % self.quantidade_fatias].append(ticker)
+
+    def _volateis(self, quadro):
+        variacoes = np.abs(quadro.coluna('variacao'))
+        with np.errstate(invalid='ignore'):
+            mascara = variacoes >= self.limiar_volatil
+        if not mascara.any():
+            return []
+        return quadro.tickers(_maiores_absolutos(variacoes, mascara, self.max_volateis))
+
+    def planejar(self, quadro, prioritarios=(), agora=None):
+        """
+        Monta o plano de busca do ciclo e avança o rodízio
+
+        Args:
+            quadro (QuadroCotacoes): Cotações já conhecidas (idade e variação)
+            prioritarios (list): Tickers buscados em todo ciclo (ex.: watchlist)
+            agora (float): Horário do ciclo (padrão: time.time())
+
+        Returns:
+            dict: 'tickers' (ordem: prioritários, vencendo, fatia), 'prioritarios',
+                  'vencendo', 'fatia' (índice) e 'total'
+        """
+        agora = agora or time.time()
+        if self._ultimo_ciclo is not None and agora - self._ultimo_ciclo <= self.idade_maxima:
+            # Pausas maiores (noite, fim de semana) não representam a cadência
+            self._intervalos.append(agora - self._ultimo_ciclo)
+            self._ciclos_desde_abertura += 1
+        else:
+            self._abertura = agora
+            self._ciclos_desde_abertura = 0
+        self._ultimo_ciclo = agora
+        intervalo = statistics.median(self._intervalos) if self._intervalos else 0.0
+
+        no_universo = set(self.universo)
+        prioritarios = [t for t in _normalizar(prioritarios) if t in no_universo]
+        prioritarios += [t for t in self._volateis(quadro) if t in no_universo]
+
+        # Buscados agora os que estourariam a idade máxima antes do próximo ciclo
+        vencendo = []
+        if len(quadro):
+            atualizados = quadro.coluna('atualizado_em')
+            with np.errstate(invalid='ignore'):
+                mascara = agora - atualizados + intervalo > self.idade_maxima
+                if self._ciclos_desde_abertura < len(self.fatias):
+                    # Cotações de antes da pausa ficam para a fatia de cada uma
+                    mascara &= atualizados >= self._abertura
+            linhas = np.flatnonzero(mascara)
+            vencendo = [t for t in quadro.tickers(linhas) if t in no_universo]
+
+        indice = self._proxima
+        self._proxima = (self._proxima + 1) % len(self.fatias)
+
+        tickers = list(dict.fromkeys(prioritarios + vencendo + self.fatias[indice]))
+        return {
+            'tickers': tickers,
+            'prioritarios': len(dict.fromkeys(prioritarios)),
+            'vencendo': len(vencendo),
+            'fatia': indice,
+            'total': len(tickers),
+        }
+
+    def idade_maxima_atual(self, quadro, agora=None):
+        """
+        Returns:
+            float: Idade (segundos) da cotação mais antiga do universo no quadro, ou None se faltar algum ticker
+        """
+        linhas = quadro.linhas(self.universo)
+        if len(linhas) < len(self.universo):
+            return None
+        atualizados = quadro.coluna('atualizado_em')[linhas]
+        return float((agora or time.time()) - np.nanmin(atualizados)) if len(atualizados) else 0.0
+
+
+def _maiores_absolutos(valores, mascara, n):
+    """Linhas da máscara com os n maiores valores"""
+    candidatas = np.flatnonzero(mascara)
+    if n is not None and n < len(candidatas):
+        candidatas = candidatas[np.argpartition(-valores[candidatas], n)[:n]]
+    return candidatas[np.argsort(-valores[candidatas], kind='stable')]
@@ -80,7 +80,7 @@ if [ -d "venv" ]; then
     
     # Instala dependências se necessário
     echo "📦 Verificando dependências..."
-    pip install -q python-telegram-bot==20.8 schedule==1.2.0
+    pip install -q python-telegram-bot==20.8
     
     echo ""
     echo "🧪 Testando conexão com o Telegram..."
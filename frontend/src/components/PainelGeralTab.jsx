@@ -16,6 +16,7 @@ function PainelGeralTab() {
   const [analiseIA, setAnaliseIA] = useState(null)
   const [loadingIA, setLoadingIA] = useState(false)
   const [errorIA, setErrorIA] = useState(null)
+  const [intradiario, setIntradiario] = useState(null)
 
   useEffect(() => {
     buscarPainelGeral()
@@ -46,6 +47,8 @@ function PainelGeralTab() {
       
       // Gera análise de IA automaticamente
       gerarAnaliseIA(processados)
+
+      buscarIntradiario()
     } catch (err) {
       setError(err.message)
       console.error('Erro:', err)
@@ -54,6 +57,17 @@ function PainelGeralTab() {
     }
   }
   
+  const buscarIntradiario = async () => {
+    try {
+      // 404 = série intradiária ainda vazia (monitor não rodou hoje)
+      const response = await fetch('http://localhost:5001/api/intradiario?janela=60&n=5&pontos=24')
+      setIntradiario(response.ok ? await response.json() : null)
+    } catch (err) {
+      console.error('Erro ao buscar série intradiária:', err)
+      setIntradiario(null)
+    }
+  }
+
   const gerarAnaliseIA = async (dadosProcessados) => {
     if (!dadosProcessados) return
     
@@ -447,6 +461,42 @@ function PainelGeralTab() {
         </div>
       </div>
 
+      {/* Movimentos da última hora (série intradiária do monitor) */}
+      {intradiario && (intradiario.maiores_altas.length > 0 || intradiario.maiores_baixas.length > 0) && (
+        <div className="secao-analise">
+          <div className="secao-header intradiario">
+            <Activity size={24} />
+            <h4>⏱️ Movimentos da Última Hora</h4>
+          </div>
+
+          <div className="cards-grid">
+            {[...intradiario.maiores_altas, ...intradiario.maiores_baixas].map((fii) => (
+              <div key={fii.ticker} className={`fii-opportunity-card ${fii.variacao_janela >= 0 ? 'alta' : 'baixa'}`}>
+                <div className="card-content">
+                  <h5 className="card-ticker">{fii.ticker.replace('.SA', '')}</h5>
+                  <Sparkline
+                    valores={intradiario.sparklines[fii.ticker] || []}
+                    positivo={fii.variacao_janela >= 0}
+                  />
+                  <div className="card-metrics">
+                    <div className="metric">
+                      <span className="metric-label">Em {Math.round(fii.minutos)} min</span>
+                      <span className={`metric-value ${fii.variacao_janela >= 0 ? 'positive' : 'negative'}`}>
+                        {formatPercent(fii.variacao_janela)}
+                      </span>
+                    </div>
+                    <div className="metric">
+                      <span className="metric-label">Preço</span>
+                      <span className="metric-value">{formatCurrency(fii.preco)}</span>
+                    </div>
+                  </div>
+                </div>
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
+
       {/* Oportunidades P/VP (TOP 5 Maiores Baixas) */}
       {dados.maioresDescontos && dados.maioresDescontos.length > 0 && (
         <div className="secao-analise">
@@ -681,5 +731,31 @@ function PainelGeralTab() {
   )
 }
 
-export default PainelGeralTab
+function Sparkline({ valores, positivo }) {
+  if (valores.length < 2) return null
+
+  const largura = 200
+  const altura = 40
+  const minimo = Math.min(...valores)
+  const amplitude = Math.max(...valores) - minimo || 1
+  const pontos = valores
+    .map((valor, i) => {
+      const x = (i / (valores.length - 1)) * largura
+      const y = altura - ((valor - minimo) / amplitude) * altura
+      return `${x.toFixed(1)},${y.toFixed(1)}`
+    })
+    .join(' ')
+
+  return (
+    <svg className="sparkline" viewBox={`0 0 ${largura} ${altura}`} preserveAspectRatio="none">
+      <polyline
+        points={pontos}
+        fill="none"
+        stroke={positivo ? 'var(--bull-primary)' : 'var(--bear-primary)'}
+        strokeWidth="2"
+      />
+    </svg>
+  )
+}
 
+export default PainelGeralTab
@@ -4,6 +4,14 @@ echo "🚀 Iniciando Monitor de FIIs - Premium Edition"
 echo "=============================================="
 echo ""
 
+# Modo do backend: dev (servidor Flask com debug) ou prod (gunicorn com vários workers)
+# Uso: ./iniciar.sh [dev|prod]
+MODO=${1:-${MODO:-dev}}
+if [ "$MODO" != "dev" ] && [ "$MODO" != "prod" ]; then
+    echo "❌ Modo inválido: $MODO (use dev ou prod)"
+    exit 1
+fi
+
 # Cores para output
 GREEN='\033[0;32m'
 BLUE='\033[0;34m'
@@ -16,6 +24,7 @@ cleanup() {
     echo ""
     echo -e "${YELLOW}🛑 Encerrando servidores...${NC}"
     pkill -f "python.*app.py" 2>/dev/null
+    pkill -f "gunicorn.*app:app" 2>/dev/null
     pkill -f "vite" 2>/dev/null
     lsof -ti:$BACKEND_PORT 2>/dev/null | xargs kill -9 2>/dev/null
     lsof -ti:$FRONTEND_PORT 2>/dev/null | xargs kill -9 2>/dev/null
@@ -117,10 +126,15 @@ if [ $BACKEND_PORT -ne 5001 ]; then
 fi
 
 # Iniciar o backend em background
-echo -e "${GREEN}🐍 Backend iniciando na porta $BACKEND_PORT...${NC}"
+echo -e "${GREEN}🐍 Backend iniciando na porta $BACKEND_PORT (modo $MODO)...${NC}"
 cd backend
 source venv/bin/activate
-FLASK_RUN_PORT=$BACKEND_PORT python app.py > ../backend.log 2>&1 &
+if [ "$MODO" = "prod" ]; then
+    # Workers compartilham o cache de dados de mercado via SQLite (ou Redis, se configurado)
+    CACHE_BACKEND=${CACHE_BACKEND:-sqlite} FLASK_RUN_PORT=$BACKEND_PORT gunicorn -c gunicorn.conf.py app:app > ../backend.log 2>&1 &
+else
+    FLASK_RUN_PORT=$BACKEND_PORT python app.py > ../backend.log 2>&1 &
+fi
 BACKEND_PID=$!
 cd ..
 
@@ -61,7 +61,7 @@ echo "🔄 Ativando ambiente virtual..."
 source venv/bin/activate
 
 echo "📦 Instalando dependências do Telegram..."
-pip install -q python-telegram-bot==20.8 schedule==1.2.0
+pip install -q python-telegram-bot==20.8
 
 if [ $? -eq 0 ]; then
     echo "✅ Dependências instaladas!"
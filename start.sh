@@ -2,6 +2,14 @@
 
 echo "🚀 Iniciando Monitor de FIIs..."
 
+# Modo do backend: dev (servidor Flask com debug) ou prod (gunicorn com vários workers)
+# Uso: ./start.sh [dev|prod]
+MODO=${1:-${MODO:-dev}}
+if [ "$MODO" != "dev" ] && [ "$MODO" != "prod" ]; then
+    echo "❌ Modo inválido: $MODO (use dev ou prod)"
+    exit 1
+fi
+
 # Função para encontrar porta disponível
 find_available_port() {
     local start_port=$1
@@ -110,10 +118,15 @@ EOF
 fi
 
 # Inicia o backend em background
-echo "🐍 Iniciando backend na porta $BACKEND_PORT..."
+echo "🐍 Iniciando backend na porta $BACKEND_PORT (modo $MODO)..."
 cd backend
 source venv/bin/activate
-FLASK_RUN_PORT=$BACKEND_PORT python app.py &
+if [ "$MODO" = "prod" ]; then
+    # Workers compartilham o cache de dados de mercado via SQLite (ou Redis, se configurado)
+    CACHE_BACKEND=${CACHE_BACKEND:-sqlite} FLASK_RUN_PORT=$BACKEND_PORT gunicorn -c gunicorn.conf.py app:app &
+else
+    FLASK_RUN_PORT=$BACKEND_PORT python app.py &
+fi
 BACKEND_PID=$!
 cd ..
 
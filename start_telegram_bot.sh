@@ -29,7 +29,7 @@ source venv/bin/activate
 echo "🔍 Verificando dependências..."
 if ! python -c "import telegram" 2>/dev/null; then
     echo "📦 Instalando dependências do Telegram..."
-    pip install -q python-telegram-bot==20.8 schedule==1.2.0
+    pip install -q python-telegram-bot==20.8
     if [ $? -eq 0 ]; then
         echo "✅ Dependências instaladas com sucesso!"
     else